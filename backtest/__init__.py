@@ -0,0 +1 @@
+"""Offline backtesting for the TradingView moving-average strategy"""
@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+"""
+Backtesting engine for the TradingView moving-average crossover strategy
+Reproduces tradingview/moving-averages-strategy.pine over NumPy arrays: the same
+ma() variants, ta.crossover/ta.crossunder entries and strategy.exit percent TP/SL,
+filled the way TradingView's broker emulator fills them.
+
+Usage:
+    python -m backtest.engine run bars.csv --ma1 SMA:20 --ma2 EMA:50 --tp 2 --sl 1
+    python -m backtest.engine verify tradingview_export.csv --ma1 SMA:20 --ma2 EMA:50
+"""
+
+import argparse
+import csv
+import json
+import os
+import time
+from collections import namedtuple
+from typing import Dict, Optional
+
+import numpy as np
+
+from backtest.indicators import MA_TYPES, NUMBA_AVAILABLE, ma, njit
+
+Bars = namedtuple('Bars', ['time', 'open', 'high', 'low', 'close'])
+
+# Exit reasons recorded per trade
+EXIT_TAKE_PROFIT = 0
+EXIT_STOP_LOSS = 1
+EXIT_REVERSAL = 2
+EXIT_OPEN = 3
+EXIT_REASONS = ['take_profit', 'stop_loss', 'reversal', 'open']
+
+TRADE_FIELDS = ['direction', 'entry_bar', 'exit_bar', 'entry_price', 'exit_price', 'exit_reason']
+
+
+def load_store_bars(path: str) -> Bars:
+    """Memory-map a bar series directory written by mt5-bridge/history_store.py"""
+    with open(os.path.join(path, 'meta.json')) as f:
+        rows = json.load(f)['rows']
+
+    def column(name, dtype):
+        if not rows:
+            return np.empty(0, dtype=dtype)
+        # Plain ndarray views of the mapping: zero-copy, and numba sees ordinary arrays
+        return np.asarray(np.memmap(os.path.join(path, f'{name}.bin'), dtype=dtype, mode='r', shape=(rows,)))
+
+    return Bars(column('time', '<i8'), column('open', '<f8'), column('high', '<f8'),
+                column('low', '<f8'), column('close', '<f8'))
+
+
+def load_bars(path: str) -> Bars:
+    """Load OHLC bars from a CSV with time/open/high/low/close columns (TradingView or MT5 export),
+    or from a history store series directory such as mt5_data/history/EURUSD/M1"""
+    if os.path.isdir(path):
+        return load_store_bars(path)
+
+    with open(path, newline='') as f:
+        header_line = f.readline()
+        delimiter = '\t' if '\t' in header_line else ','
+        header = [name.strip().strip('<>').lower() for name in header_line.strip().split(delimiter)]
+        columns = {name: index for index, name in enumerate(header)}
+
+        missing = [name for name in ('open', 'high', 'low', 'close') if name not in columns]
+        if missing:
+            raise ValueError(f"{path} is missing columns: {', '.join(missing)}")
+
+        rows = list(csv.reader(f, delimiter=delimiter))
+
+    def column(name):
+        index = columns[name]
+        return np.array([float(row[index]) if row[index] not in ('', 'NaN') else np.nan for row in rows])
+
+    time_index = columns.get('time', columns.get('date', 0))
+    if 'date' in columns and 'time' in columns:
+        times = np.array([f"{row[columns['date']]} {row[columns['time']]}" for row in rows])
+    else:
+        times = np.array([row[time_index] for row in rows])
+
+    return Bars(times, column('open'), column('high'), column('low'), column('close'))
+
+
+def source_series(bars: Bars, source: str = 'close') -> np.ndarray:
+    """The strategy's src input: a price column or hl2/hlc3/ohlc4"""
+    if source == 'hl2':
+        return (bars.high + bars.low) / 2
+    if source == 'hlc3':
+        return (bars.high + bars.low + bars.close) / 3
+    if source == 'ohlc4':
+        return (bars.open + bars.high + bars.low + bars.close) / 4
+    return getattr(bars, source)
+
+
+def crossover(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """ta.crossover: a[0] > b[0] and a[1] <= b[1]"""
+    result = np.zeros(len(a), dtype=np.bool_)
+    with np.errstate(invalid='ignore'):
+        result[1:] = (a[1:] > b[1:]) & (a[:-1] <= b[:-1])
+    return result
+
+
+def crossunder(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """ta.crossunder: a[0] < b[0] and a[1] >= b[1]"""
+    result = np.zeros(len(a), dtype=np.bool_)
+    with np.errstate(invalid='ignore'):
+        result[1:] = (a[1:] < b[1:]) & (a[:-1] >= b[:-1])
+    return result
+
+
+@njit(cache=True)
+def _exit_fill(direction, open_, high, low, take_profit, stop_loss):
+    # Returns (price, reason) of the exit hit on this bar, or (nan, -1)
+    if direction > 0:
+        # A gap through a level fills at the open
+        if open_ <= stop_loss:
+            return open_, EXIT_STOP_LOSS
+        if open_ >= take_profit:
+            return open_, EXIT_TAKE_PROFIT
+        hit_tp = high >= take_profit
+        hit_sl = low <= stop_loss
+    else:
+        if open_ >= stop_loss:
+            return open_, EXIT_STOP_LOSS
+        if open_ <= take_profit:
+            return open_, EXIT_TAKE_PROFIT
+        hit_tp = low <= take_profit
+        hit_sl = high >= stop_loss
+
+    if hit_tp and hit_sl:
+        # TradingView assumes the extreme nearer to the open is reached first
+        high_first = (high - open_) <= (open_ - low)
+        tp_first = high_first if direction > 0 else not high_first
+        if tp_first:
+            return take_profit, EXIT_TAKE_PROFIT
+        return stop_loss, EXIT_STOP_LOSS
+    if hit_tp:
+        return take_profit, EXIT_TAKE_PROFIT
+    if hit_sl:
+        return stop_loss, EXIT_STOP_LOSS
+    return np.nan, -1
+
+
+@njit(cache=True)
+def simulate(open_, high, low, close, long_signal, short_signal, tp_percent, sl_percent):
+    """
+    Emulate strategy.entry/strategy.exit for the crossover signals.
+    Returns a (trades, 6) array with the columns of TRADE_FIELDS.
+    """
+    n = close.shape[0]
+    # A bar can hold a reversal and an exit of the new position
+    trades = np.empty((2 * n + 1, 6))
+    count = 0
+
+    position = 0
+    entry_bar = 0
+    entry_price = 0.0
+    pending = 0
+    pending_tp = np.nan
+    pending_sl = np.nan
+    take_profit = np.nan
+    stop_loss = np.nan
+
+    for i in range(n):
+        # Orders placed at the previous close fill at this bar's open
+        if pending != 0:
+            if pending != position:
+                if position != 0:
+                    trades[count, 0] = position
+                    trades[count, 1] = entry_bar
+                    trades[count, 2] = i
+                    trades[count, 3] = entry_price
+                    trades[count, 4] = open_[i]
+                    trades[count, 5] = EXIT_REVERSAL
+                    count += 1
+                position = pending
+                entry_bar = i
+                entry_price = open_[i]
+            # pyramiding=0 ignores a same-direction entry, but its strategy.exit call
+            # still replaces the exit levels
+            take_profit = pending_tp
+            stop_loss = pending_sl
+            pending = 0
+
+        if position != 0:
+            price, reason = _exit_fill(position, open_[i], high[i], low[i], take_profit, stop_loss)
+            if reason >= 0:
+                trades[count, 0] = position
+                trades[count, 1] = entry_bar
+                trades[count, 2] = i
+                trades[count, 3] = entry_price
+                trades[count, 4] = price
+                trades[count, 5] = reason
+                count += 1
+                position = 0
+
+        # The script runs at the bar close
+        if long_signal[i]:
+            pending = 1
+            pending_tp = close[i] * (1 + tp_percent / 100)
+            pending_sl = close[i] * (1 - sl_percent / 100)
+        elif short_signal[i]:
+            pending = -1
+            pending_tp = close[i] * (1 - tp_percent / 100)
+            pending_sl = close[i] * (1 + sl_percent / 100)
+
+    if position != 0:
+        trades[count, 0] = position
+        trades[count, 1] = entry_bar
+        trades[count, 2] = n - 1
+        trades[count, 3] = entry_price
+        trades[count, 4] = close[n - 1]
+        trades[count, 5] = EXIT_OPEN
+        count += 1
+
+    return trades[:count]
+
+
+def compute_metrics(trades: np.ndarray, qty: float = 1.0) -> Dict:
+    """Summary statistics over closed trades; a still-open trade is reported separately"""
+    closed = trades[trades[:, 5] != EXIT_OPEN] if len(trades) else trades
+    open_trades = trades[trades[:, 5] == EXIT_OPEN] if len(trades) else trades
+
+    direction = closed[:, 0]
+    pnl = direction * (closed[:, 4] - closed[:, 3]) * qty
+    returns = direction * (closed[:, 4] / closed[:, 3] - 1)
+
+    equity = np.cumsum(pnl)
+    drawdown = np.maximum.accumulate(np.concatenate(([0.0], equity)))[1:] - equity if len(equity) else equity
+    gross_profit = pnl[pnl > 0].sum()
+    gross_loss = -pnl[pnl < 0].sum()
+    std = returns.std(ddof=1) if len(returns) > 1 else 0.0
+
+    open_pnl = float((open_trades[:, 0] * (open_trades[:, 4] - open_trades[:, 3]) * qty).sum())
+
+    return {
+        'trades': int(len(closed)),
+        'net_profit': float(pnl.sum()),
+        'gross_profit': float(gross_profit),
+        'gross_loss': float(gross_loss),
+        'profit_factor': float(gross_profit / gross_loss) if gross_loss else None,
+        'win_rate': float((pnl > 0).mean()) if len(pnl) else None,
+        'avg_trade_return': float(returns.mean()) if len(returns) else None,
+        # Per-trade Sharpe, not annualised: trades are irregularly spaced
+        'sharpe': float(returns.mean() / std) if std else None,
+        'max_drawdown': float(drawdown.max()) if len(drawdown) else 0.0,
+        'open_profit': open_pnl
+    }
+
+
+def strategy_signals(src: np.ndarray, ma_type1: str, period1: int, ma_type2: str, period2: int):
+    """Both moving averages and the long/short crossover signals"""
+    price1 = ma(src, period1, ma_type1)
+    price2 = ma(src, period2, ma_type2)
+    return price1, price2, crossover(price1, price2), crossunder(price1, price2)
+
+
+def run_backtest(bars: Bars, ma_type1: str = 'SMA', period1: int = 20, ma_type2: str = 'EMA',
+                 period2: int = 50, tp_percent: float = 2.0, sl_percent: float = 1.0,
+                 source: str = 'close', qty: float = 1.0) -> Dict:
+    """Run the strategy over a bar series with the Pine script's inputs"""
+    src = source_series(bars, source)
+    price1, price2, long_signal, short_signal = strategy_signals(src, ma_type1, period1, ma_type2, period2)
+    trades = simulate(bars.open, bars.high, bars.low, bars.close, long_signal, short_signal,
+                      float(tp_percent), float(sl_percent))
+
+    return {
+        'price1': price1,
+        'price2': price2,
+        'long_signal': long_signal,
+        'short_signal': short_signal,
+        'trades': trades,
+        'metrics': compute_metrics(trades, qty)
+    }
+
+
+def trades_to_dicts(trades: np.ndarray, times: Optional[np.ndarray] = None):
+    """Readable trade list with bar times instead of indexes"""
+    result = []
+    for direction, entry_bar, exit_bar, entry_price, exit_price, reason in trades:
+        entry_bar, exit_bar = int(entry_bar), int(exit_bar)
+        result.append({
+            'direction': 'long' if direction > 0 else 'short',
+            'entry_time': str(times[entry_bar]) if times is not None else entry_bar,
+            'exit_time': str(times[exit_bar]) if times is not None else exit_bar,
+            'entry_price': float(entry_price),
+            'exit_price': float(exit_price),
+            'exit_reason': EXIT_REASONS[int(reason)]
+        })
+    return result
+
+
+def verify(export_path: str, ma_type1: str, period1: int, ma_type2: str, period2: int,
+           source: str = 'close', warmup: int = 0, tolerance: float = 1e-6,
+           column1: str = '1st ma', column2: str = '2nd ma') -> Dict:
+    """
+    Compare against a TradingView "Export chart data" CSV of the strategy.
+    The export carries both MA plots; signals are compared by deriving the crossovers
+    from the exported plots. Recursive MAs depend on history before the first
+    exported bar, so skip `warmup` bars before comparing.
+    """
+    bars = load_bars(export_path)
+    with open(export_path, newline='') as f:
+        reader = csv.reader(f, delimiter='\t' if '\t' in f.readline() else ',')
+        f.seek(0)
+        header = [name.strip().lower() for name in next(reader)]
+        rows = list(reader)
+
+    def plot(name):
+        index = header.index(name)
+        return np.array([float(row[index]) if row[index] not in ('', 'NaN') else np.nan for row in rows])
+
+    expected1, expected2 = plot(column1), plot(column2)
+    src = source_series(bars, source)
+    price1, price2, long_signal, short_signal = strategy_signals(src, ma_type1, period1, ma_type2, period2)
+
+    window = slice(warmup, None)
+    scale = np.nanmax(np.abs(src)) or 1.0
+
+    def max_error(actual, expected):
+        diff = np.abs(actual[window] - expected[window]) / scale
+        both_na = np.isnan(actual[window]) & np.isnan(expected[window])
+        diff = np.where(both_na, 0.0, diff)
+        return float(np.nan_to_num(diff, nan=np.inf).max()) if len(diff) else 0.0
+
+    expected_long = crossover(expected1, expected2)[window]
+    expected_short = crossunder(expected1, expected2)[window]
+    long_mismatch = np.flatnonzero(expected_long != long_signal[window]) + warmup
+    short_mismatch = np.flatnonzero(expected_short != short_signal[window]) + warmup
+
+    errors = {'ma1': max_error(price1, expected1), 'ma2': max_error(price2, expected2)}
+    return {
+        'bars': len(bars.close) - warmup,
+        'max_relative_error': errors,
+        'long_signals': int(expected_long.sum()),
+        'short_signals': int(expected_short.sum()),
+        'signal_mismatches': [str(bars.time[i]) for i in np.union1d(long_mismatch, short_mismatch)[:20]],
+        'passed': (errors['ma1'] <= tolerance and errors['ma2'] <= tolerance
+                   and not len(long_mismatch) and not len(short_mismatch))
+    }
+
+
+def parse_ma(spec: str):
+    """Parse 'EMA:50' into ('EMA', 50)"""
+    ma_type, _, period = spec.partition(':')
+    ma_type = ma_type.strip().upper()
+    if ma_type not in MA_TYPES:
+        raise argparse.ArgumentTypeError(f"Unknown MA type {ma_type}, expected one of {', '.join(MA_TYPES)}")
+    return ma_type, int(period)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Backtest the TradingView moving-average strategy')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    def add_strategy_args(sub):
+        sub.add_argument('csv', help='Bars CSV (time, open, high, low, close) or history store series directory')
+        sub.add_argument('--ma1', type=parse_ma, default=('SMA', 20), help='1st MA as TYPE:PERIOD')
+        sub.add_argument('--ma2', type=parse_ma, default=('EMA', 50), help='2nd MA as TYPE:PERIOD')
+        sub.add_argument('--source', default='close', choices=['open', 'high', 'low', 'close', 'hl2', 'hlc3', 'ohlc4'])
+
+    run_parser = subparsers.add_parser('run', help='Backtest one configuration')
+    add_strategy_args(run_parser)
+    run_parser.add_argument('--tp', type=float, default=2.0, help='Take profit percent')
+    run_parser.add_argument('--sl', type=float, default=1.0, help='Stop loss percent')
+    run_parser.add_argument('--qty', type=float, default=1.0, help='Position size in contracts')
+    run_parser.add_argument('--trades', help='Write the trade list as JSON to this file')
+
+    verify_parser = subparsers.add_parser('verify', help='Check against a TradingView chart export')
+    add_strategy_args(verify_parser)
+    verify_parser.add_argument('--warmup', type=int, default=0, help='Bars to skip before comparing')
+    verify_parser.add_argument('--tolerance', type=float, default=1e-6, help='Max relative MA error')
+
+    args = parser.parse_args()
+    (ma_type1, period1), (ma_type2, period2) = args.ma1, args.ma2
+
+    if args.command == 'verify':
+        report = verify(args.csv, ma_type1, period1, ma_type2, period2, args.source, args.warmup, args.tolerance)
+        print(json.dumps(report, indent=2))
+        raise SystemExit(0 if report['passed'] else 1)
+
+    load_start = time.perf_counter()
+    bars = load_bars(args.csv)
+    run_start = time.perf_counter()
+    result = run_backtest(bars, ma_type1, period1, ma_type2, period2, args.tp, args.sl, args.source, args.qty)
+    elapsed = time.perf_counter() - run_start
+
+    print(f"Bars: {len(bars.close)} (loaded in {run_start - load_start:.2f}s, "
+          f"backtest {elapsed:.3f}s, numba {'on' if NUMBA_AVAILABLE else 'off'})")
+    print(json.dumps(result['metrics'], indent=2))
+
+    if args.trades:
+        with open(args.trades, 'w') as f:
+            json.dump(trades_to_dicts(result['trades'], bars.time), f, indent=2)
+        print(f"Trades written to {args.trades}")
+
+
+if __name__ == '__main__':
+    main()
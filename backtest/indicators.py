@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Moving averages from tradingview/moving-averages-strategy.pine over NumPy arrays
+Window averages are vectorized; the recursive ones run in tight loops compiled with
+numba when it is installed.
+
+Every function follows Pine's na handling: bars without enough history are NaN.
+"""
+
+import math
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Try to import numba - loops fall back to plain Python without it
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+MA_TYPES = ['SMA', 'EMA', 'TEMA', 'HMA', 'KAMA', 'ALMA', 'FRAMA', 'VIDYA', 'JMA']
+
+
+def pine_round(value: float) -> int:
+    """math.round() in Pine rounds halves up, unlike Python's round()"""
+    return int(math.floor(value + 0.5))
+
+
+def _as_float(src) -> np.ndarray:
+    return np.ascontiguousarray(src, dtype=np.float64)
+
+
+def rolling_sum(src: np.ndarray, length: int) -> np.ndarray:
+    """math.sum(src, length), NaN until length values are available"""
+    src = _as_float(src)
+    out = np.full(src.shape, np.nan)
+    if length <= 0 or length > len(src):
+        return out
+    # Cumulative sums of the values and of the na count keep this O(n); a window
+    # holding any na is na, as in Pine
+    missing = np.isnan(src)
+    csum = np.cumsum(np.concatenate(([0.0], np.where(missing, 0.0, src))))
+    cmissing = np.cumsum(np.concatenate(([0], missing)))
+    window = csum[length:] - csum[:-length]
+    out[length - 1:] = np.where(cmissing[length:] - cmissing[:-length] > 0, np.nan, window)
+    return out
+
+
+def sma(src: np.ndarray, length: int) -> np.ndarray:
+    """ta.sma"""
+    return rolling_sum(src, length) / length
+
+
+def wma(src: np.ndarray, length: int) -> np.ndarray:
+    """ta.wma, weights length..1 from the current bar back"""
+    src = _as_float(src)
+    out = np.full(src.shape, np.nan)
+    if length <= 0 or length > len(src):
+        return out
+    weights = np.arange(1, length + 1, dtype=np.float64)
+    out[length - 1:] = sliding_window_view(src, length) @ weights / weights.sum()
+    return out
+
+
+def rolling_max(src: np.ndarray, length: int) -> np.ndarray:
+    """ta.highest"""
+    src = _as_float(src)
+    out = np.full(src.shape, np.nan)
+    if 0 < length <= len(src):
+        out[length - 1:] = sliding_window_view(src, length).max(axis=1)
+    return out
+
+
+def rolling_min(src: np.ndarray, length: int) -> np.ndarray:
+    """ta.lowest"""
+    src = _as_float(src)
+    out = np.full(src.shape, np.nan)
+    if 0 < length <= len(src):
+        out[length - 1:] = sliding_window_view(src, length).min(axis=1)
+    return out
+
+
+@njit(cache=True)
+def _ema_kernel(src, length):
+    # Pine seeds ta.ema with the SMA of length consecutive non-na values,
+    # and reseeds the same way after an na
+    n = src.shape[0]
+    out = np.full(n, np.nan)
+    alpha = 2.0 / (length + 1)
+    seed_sum = 0.0
+    seed_count = 0
+    prev = np.nan
+    for i in range(n):
+        value = src[i]
+        if np.isnan(value):
+            seed_sum = 0.0
+            seed_count = 0
+            prev = np.nan
+        elif np.isnan(prev):
+            seed_sum += value
+            seed_count += 1
+            if seed_count == length:
+                prev = seed_sum / length
+                out[i] = prev
+        else:
+            prev = alpha * value + (1.0 - alpha) * prev
+            out[i] = prev
+    return out
+
+
+@njit(cache=True)
+def _adaptive_kernel(src, alpha):
+    # x := nz(x[1], src) + alpha * (src - nz(x[1], src)), the shape of KAMA/FRAMA/VIDYA/JMA
+    n = src.shape[0]
+    out = np.full(n, np.nan)
+    prev = np.nan
+    for i in range(n):
+        base = src[i] if np.isnan(prev) else prev
+        prev = base + alpha[i] * (src[i] - base)
+        out[i] = prev
+    return out
+
+
+def ema(src: np.ndarray, length: int) -> np.ndarray:
+    """ta.ema"""
+    return _ema_kernel(_as_float(src), length)
+
+
+def tema(src: np.ndarray, length: int) -> np.ndarray:
+    """Triple exponential moving average"""
+    ema1 = ema(src, length)
+    ema2 = ema(ema1, length)
+    ema3 = ema(ema2, length)
+    return 3 * ema1 - 3 * ema2 + ema3
+
+
+def hma(src: np.ndarray, length: int) -> np.ndarray:
+    """Hull moving average"""
+    raw = 2 * wma(src, pine_round(length / 2)) - wma(src, length)
+    return wma(raw, pine_round(math.sqrt(length)))
+
+
+def kama(src: np.ndarray, length: int, fast_length: int = 2, slow_length: int = 30) -> np.ndarray:
+    """Kaufman's adaptive moving average"""
+    src = _as_float(src)
+    change = np.full(src.shape, np.nan)
+    change[length:] = np.abs(src[length:] - src[:-length])
+
+    abs_diff = np.full(src.shape, np.nan)
+    abs_diff[1:] = np.abs(np.diff(src))
+    volatility = rolling_sum(abs_diff, length)
+
+    # Pine treats a na condition as false, so er is 0 until history is available
+    with np.errstate(invalid='ignore', divide='ignore'):
+        er = np.where(np.isnan(volatility) | (volatility == 0), 0.0, change / volatility)
+
+    fast_sc = 2 / (fast_length + 1)
+    slow_sc = 2 / (slow_length + 1)
+    sc = (er * (fast_sc - slow_sc) + slow_sc) ** 2
+    return _adaptive_kernel(src, sc)
+
+
+def alma(src: np.ndarray, length: int, offset: float = 0.85, sigma: float = 6) -> np.ndarray:
+    """Arnaud Legoux moving average, as written in the Pine script"""
+    src = _as_float(src)
+    out = np.full(src.shape, np.nan)
+    if length <= 0 or length > len(src):
+        return out
+    m = offset * (length - 1)
+    s = length / sigma
+    i = np.arange(length, dtype=np.float64)
+    weights = np.exp(-((i - m) ** 2) / (2 * s * s))
+    # Weight i applies to src[length - 1 - i], i.e. position i of the oldest-first window
+    out[length - 1:] = sliding_window_view(src, length) @ weights / weights.sum()
+    return out
+
+
+def frama(src: np.ndarray, length: int) -> np.ndarray:
+    """Fractal adaptive moving average, as written in the Pine script"""
+    src = _as_float(src)
+    half = length / 2
+    # ta.highest/ta.lowest truncate the fractional length / 2 of an odd length
+    half_window = max(1, int(half))
+
+    n1 = (rolling_max(src, length) - rolling_min(src, length)) / length
+    n2 = (rolling_max(src, half_window) - rolling_min(src, half_window)) / half
+    n3 = n2  # the script computes n3 exactly like n2
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        dimen = (np.log(n1 + n2) - np.log(n3)) / math.log(2)
+        alpha = np.exp(-4.6 * (dimen - 1))
+    alpha = np.where(alpha < 0.01, 0.01, np.where(alpha > 1, 1.0, alpha))
+    return _adaptive_kernel(src, alpha)
+
+
+def vidya(src: np.ndarray, length: int) -> np.ndarray:
+    """Variable index dynamic average, CMO over the previous length bars"""
+    src = _as_float(src)
+    diff = np.full(src.shape, np.nan)
+    diff[1:] = np.diff(src)
+    up = rolling_sum(np.where(diff > 0, diff, 0.0), length)
+    down = rolling_sum(np.where(diff > 0, 0.0, -diff), length)
+
+    # The Pine loop reads src[1]..src[length + 1], excluding the current bar
+    up = np.concatenate(([np.nan], up[:-1]))
+    down = np.concatenate(([np.nan], down[:-1]))
+
+    total = up + down
+    with np.errstate(invalid='ignore', divide='ignore'):
+        abs_cmo = np.where(np.isnan(total) | (total == 0), 0.0, np.abs(up - down) / total)
+    return _adaptive_kernel(src, abs_cmo * 2 / (length + 1))
+
+
+def jma(src: np.ndarray, length: int, power: float = 2) -> np.ndarray:
+    """Simplified Jurik moving average from the Pine script"""
+    src = _as_float(src)
+    return _adaptive_kernel(src, np.full(src.shape, power / length))
+
+
+def ma(src: np.ndarray, length: int, ma_type: str) -> np.ndarray:
+    """Equivalent of the script's ma(src, length, type), falling back to SMA"""
+    ma_type = ma_type.upper()
+    if ma_type == 'EMA':
+        return ema(src, length)
+    if ma_type == 'TEMA':
+        return tema(src, length)
+    if ma_type == 'HMA':
+        return hma(src, length)
+    if ma_type == 'KAMA':
+        return kama(src, length, 2, 30)
+    if ma_type == 'ALMA':
+        return alma(src, length, 0.85, 6)
+    if ma_type == 'FRAMA':
+        return frama(src, length)
+    if ma_type == 'VIDYA':
+        return vidya(src, length)
+    if ma_type == 'JMA':
+        return jma(src, length, 2)
+    return sma(src, length)
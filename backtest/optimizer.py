@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Parameter sweep optimizer for the TradingView moving-average strategy
+Runs a grid or random search over MA types, period pairs and TP/SL percentages on
+a process pool and ranks the results.
+
+Prices live in one shared memory block that every worker maps instead of receiving
+a pickled copy per task. Each (type, period) MA series is computed once per sweep
+into a memory-mapped cache file, and configurations that share an MA pair are
+batched so their crossover signals are derived once.
+
+Usage:
+    python -m backtest.optimizer bars.csv --period1 5:50:5 --period2 20:200:10 \\
+        --tp 1,2,3 --sl 0.5,1 --rank sharpe,-max_drawdown --top 20
+"""
+
+import argparse
+import csv
+import itertools
+import json
+import os
+import random
+import tempfile
+import time
+from collections import OrderedDict
+from multiprocessing import Pool, shared_memory
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from backtest.engine import Bars, compute_metrics, crossover, crossunder, load_bars, simulate, source_series
+from backtest.indicators import MA_TYPES, ma
+
+# Metrics that rank better when smaller; everything else ranks descending
+LOWER_IS_BETTER = {'max_drawdown'}
+RANKABLE_METRICS = ['net_profit', 'sharpe', 'max_drawdown', 'trades', 'win_rate', 'profit_factor',
+                    'avg_trade_return']
+
+# Per-process handles set by _init_worker
+_worker = {}
+
+
+def parse_values(spec: str, cast=float) -> List:
+    """Parse '5:50:5' (inclusive range) or '1,2,3' into a list of values"""
+    if ':' in spec:
+        start, stop, step = (cast(part) for part in spec.split(':'))
+        values = []
+        value = start
+        while value <= stop + 1e-9:
+            values.append(cast(round(value, 10)))
+            value += step
+        return values
+    return [cast(part) for part in spec.split(',') if part.strip()]
+
+
+def parse_rank(spec: str) -> List[Tuple[str, bool]]:
+    """Parse 'sharpe,-max_drawdown' into (metric, descending) keys; '-' flips the default order"""
+    keys = []
+    for part in spec.split(','):
+        part = part.strip()
+        flipped = part.startswith('-')
+        metric = part.lstrip('-')
+        if metric not in RANKABLE_METRICS:
+            raise argparse.ArgumentTypeError(
+                f"Unknown metric {metric}, expected one of {', '.join(RANKABLE_METRICS)}")
+        descending = metric not in LOWER_IS_BETTER
+        keys.append((metric, descending != flipped))
+    return keys
+
+
+def build_configs(ma_types1: Sequence[str], periods1: Sequence[int], ma_types2: Sequence[str],
+                  periods2: Sequence[int], tp_values: Sequence[float], sl_values: Sequence[float],
+                  samples: int = 0, seed=None, require_faster: bool = True) -> List[Tuple]:
+    """Every (type1, period1, type2, period2, tp, sl) of the grid, or a random sample of it"""
+    configs = [
+        (type1, period1, type2, period2, tp, sl)
+        for type1, period1, type2, period2 in itertools.product(ma_types1, periods1, ma_types2, periods2)
+        if not require_faster or period1 < period2
+        for tp, sl in itertools.product(tp_values, sl_values)
+    ]
+    if samples and samples < len(configs):
+        configs = random.Random(seed).sample(configs, samples)
+    return configs
+
+
+def rank_results(results: List[Dict], rank_keys: List[Tuple[str, bool]], min_trades: int = 0) -> List[Dict]:
+    """Sort results by the rank keys in order, dropping runs with too few trades"""
+    ranked = [r for r in results if r['metrics']['trades'] >= min_trades]
+    # Stable sorts applied from the last key to the first; None always ranks last
+    for metric, descending in reversed(rank_keys):
+        present = [r for r in ranked if r['metrics'][metric] is not None]
+        missing = [r for r in ranked if r['metrics'][metric] is None]
+        present.sort(key=lambda r: r['metrics'][metric], reverse=descending)
+        ranked = present + missing
+    return ranked
+
+
+def _init_worker(shm_name: str, shape: Tuple[int, int], cache_path: str, cache_shape: Tuple[int, int]):
+    """Map the shared prices and the MA cache once per worker process"""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    _worker['shm'] = shm
+    _worker['ohlc'] = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+    _worker['cache_path'] = cache_path
+    _worker['cache_shape'] = cache_shape
+    _worker['cache'] = None
+
+
+def _ma_cache(mode: str = 'r') -> np.memmap:
+    if mode != 'r':
+        return np.memmap(_worker['cache_path'], dtype=np.float64, mode=mode, shape=_worker['cache_shape'])
+    # Opened lazily: the file is complete only once the MA phase has finished
+    if _worker['cache'] is None:
+        _worker['cache'] = np.memmap(_worker['cache_path'], dtype=np.float64, mode='r',
+                                     shape=_worker['cache_shape'])
+    return _worker['cache']
+
+
+def _compute_ma(task: Tuple[int, str, int, str]):
+    """Fill one row of the MA cache"""
+    row, ma_type, period, source = task
+    open_, high, low, close = _worker['ohlc']
+    src = source_series(Bars(None, open_, high, low, close), source)
+    cache = _ma_cache('r+')
+    cache[row] = ma(src, period, ma_type)
+    cache.flush()
+    del cache
+
+
+def _run_batch(batch: List[Tuple[int, int, Tuple, List[Tuple[float, float]]]]) -> List[Dict]:
+    """Backtest every TP/SL pair of each MA pair in the batch"""
+    open_, high, low, close = _worker['ohlc']
+    cache = _ma_cache()
+    results = []
+    for row1, row2, ma_pair, exits in batch:
+        price1, price2 = cache[row1], cache[row2]
+        long_signal = crossover(price1, price2)
+        short_signal = crossunder(price1, price2)
+        for tp, sl in exits:
+            trades = simulate(open_, high, low, close, long_signal, short_signal, float(tp), float(sl))
+            type1, period1, type2, period2 = ma_pair
+            results.append({
+                'ma_type1': type1, 'period1': period1, 'ma_type2': type2, 'period2': period2,
+                'tp_percent': tp, 'sl_percent': sl,
+                'metrics': compute_metrics(trades)
+            })
+    return results
+
+
+def optimize(bars, configs: List[Tuple], source: str = 'close', workers: int = None,
+             batch_size: int = 8, cache_dir: str = None) -> Tuple[List[Dict], Dict]:
+    """Run every configuration over the bars; returns (results, timing stats)"""
+    workers = workers or os.cpu_count() or 1
+    ohlc = np.stack([bars.open, bars.high, bars.low, bars.close])
+
+    # Each MA series the sweep needs gets one row of the cache
+    rows = OrderedDict()
+    for type1, period1, type2, period2, _, _ in configs:
+        rows.setdefault((type1, period1), len(rows))
+        rows.setdefault((type2, period2), len(rows))
+
+    # Group configurations by MA pair so crossover signals are computed once per pair
+    pairs = OrderedDict()
+    for type1, period1, type2, period2, tp, sl in configs:
+        pairs.setdefault((type1, period1, type2, period2), []).append((tp, sl))
+    batches = [[]]
+    for ma_pair, exits in pairs.items():
+        if len(batches[-1]) >= batch_size:
+            batches.append([])
+        batches[-1].append((rows[ma_pair[:2]], rows[ma_pair[2:]], ma_pair, exits))
+
+    shm = shared_memory.SharedMemory(create=True, size=ohlc.nbytes)
+    cache_file = tempfile.NamedTemporaryFile(prefix='ma_cache_', suffix='.f64', dir=cache_dir, delete=False)
+    cache_file.close()
+    cache_shape = (max(len(rows), 1), ohlc.shape[1])
+    stats = {'configs': len(configs), 'ma_series': len(rows), 'ma_pairs': len(pairs), 'workers': workers}
+
+    try:
+        np.ndarray(ohlc.shape, dtype=np.float64, buffer=shm.buf)[:] = ohlc
+        # Size the cache file up front so workers can map it
+        np.memmap(cache_file.name, dtype=np.float64, mode='w+', shape=cache_shape).flush()
+
+        with Pool(workers, initializer=_init_worker,
+                  initargs=(shm.name, ohlc.shape, cache_file.name, cache_shape)) as pool:
+            start = time.perf_counter()
+            pool.map(_compute_ma, [(row, ma_type, period, source) for (ma_type, period), row in rows.items()])
+            stats['ma_seconds'] = round(time.perf_counter() - start, 3)
+
+            start = time.perf_counter()
+            results = []
+            for batch_results in pool.imap_unordered(_run_batch, batches):
+                results.extend(batch_results)
+            stats['backtest_seconds'] = round(time.perf_counter() - start, 3)
+    finally:
+        shm.close()
+        shm.unlink()
+        os.unlink(cache_file.name)
+
+    return results, stats
+
+
+def write_results(path: str, ranked: List[Dict]):
+    """Write ranked results as CSV or JSON depending on the extension"""
+    if path.endswith('.json'):
+        with open(path, 'w') as f:
+            json.dump(ranked, f, indent=2)
+        return
+
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        params = ['ma_type1', 'period1', 'ma_type2', 'period2', 'tp_percent', 'sl_percent']
+        metric_names = list(ranked[0]['metrics']) if ranked else []
+        writer.writerow(['rank'] + params + metric_names)
+        for rank, result in enumerate(ranked, 1):
+            writer.writerow([rank] + [result[p] for p in params] + [result['metrics'][m] for m in metric_names])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Optimize the TradingView moving-average strategy')
+    parser.add_argument('csv', help='Bars CSV (time, open, high, low, close) or history store series directory')
+    parser.add_argument('--ma-types1', default=','.join(MA_TYPES), help='1st MA types to try')
+    parser.add_argument('--ma-types2', default=','.join(MA_TYPES), help='2nd MA types to try')
+    parser.add_argument('--period1', default='5:50:5', help='1st MA periods, start:stop:step or a list')
+    parser.add_argument('--period2', default='20:200:10', help='2nd MA periods, start:stop:step or a list')
+    parser.add_argument('--tp', default='2.0', help='Take profit percents')
+    parser.add_argument('--sl', default='1.0', help='Stop loss percents')
+    parser.add_argument('--source', default='close', choices=['open', 'high', 'low', 'close', 'hl2', 'hlc3', 'ohlc4'])
+    parser.add_argument('--allow-slower-first', action='store_true', help='Also try period1 >= period2')
+    parser.add_argument('--random', type=int, default=0, help='Random search: sample this many configurations')
+    parser.add_argument('--seed', type=int, help='Random search seed')
+    parser.add_argument('--rank', type=parse_rank, default=parse_rank('net_profit'),
+                        help=f"Rank keys in order, prefix '-' to reverse ({', '.join(RANKABLE_METRICS)})")
+    parser.add_argument('--min-trades', type=int, default=0, help='Ignore configurations with fewer trades')
+    parser.add_argument('--top', type=int, default=20, help='Configurations to print')
+    parser.add_argument('--workers', type=int, help='Worker processes (default: CPU count)')
+    parser.add_argument('--cache-dir', help='Directory for the memory-mapped MA cache (default: temp dir)')
+    parser.add_argument('--output', help='Write all ranked results to a .csv or .json file')
+    args = parser.parse_args()
+
+    ma_types1 = [t.strip().upper() for t in args.ma_types1.split(',')]
+    ma_types2 = [t.strip().upper() for t in args.ma_types2.split(',')]
+    unknown = sorted(set(ma_types1 + ma_types2) - set(MA_TYPES))
+    if unknown:
+        parser.error(f"Unknown MA types: {', '.join(unknown)}")
+
+    configs = build_configs(
+        ma_types1, parse_values(args.period1, int), ma_types2, parse_values(args.period2, int),
+        parse_values(args.tp), parse_values(args.sl),
+        samples=args.random, seed=args.seed, require_faster=not args.allow_slower_first
+    )
+    if not configs:
+        parser.error('The parameter ranges produce no configurations')
+
+    bars = load_bars(args.csv)
+    print(f"Sweeping {len(configs)} configurations over {len(bars.close)} bars...")
+    results, stats = optimize(bars, configs, args.source, args.workers, cache_dir=args.cache_dir)
+    ranked = rank_results(results, args.rank, args.min_trades)
+
+    print(f"{stats['ma_series']} MA series in {stats['ma_seconds']}s, {stats['configs']} backtests in "
+          f"{stats['backtest_seconds']}s on {stats['workers']} workers")
+    print(f"\n{'#':>4}  {'MA 1':<10} {'MA 2':<10} {'TP':>5} {'SL':>5} {'Net P&L':>12} {'Sharpe':>8} "
+          f"{'Max DD':>10} {'Trades':>7} {'Win %':>6}")
+    for rank, result in enumerate(ranked[:args.top], 1):
+        m = result['metrics']
+        sharpe = f"{m['sharpe']:.3f}" if m['sharpe'] is not None else '-'
+        win_rate = f"{m['win_rate'] * 100:.1f}" if m['win_rate'] is not None else '-'
+        print(f"{rank:>4}  {result['ma_type1'] + ':' + str(result['period1']):<10} "
+              f"{result['ma_type2'] + ':' + str(result['period2']):<10} {result['tp_percent']:>5} "
+              f"{result['sl_percent']:>5} {m['net_profit']:>12.5f} {sharpe:>8} {m['max_drawdown']:>10.5f} "
+              f"{m['trades']:>7} {win_rate:>6}")
+
+    if args.output:
+        write_results(args.output, ranked)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Bar-by-bar reference of the Pine script's recursive moving averages
+This is a second, deliberately plain implementation used to generate the golden fixture
+fixtures/eurusd_h1_reference_mas.csv. It shares no code with backtest/indicators.py: every
+function walks the bars in order and reads history with Pine's src[offset] semantics,
+following the script line by line and TradingView's documented definitions of ta.sma,
+ta.ema, ta.wma, ta.highest and ta.lowest. Plain Python floats, no NumPy.
+
+The fixture is NOT a TradingView export. It guards indicators.py against regressions and
+against drifting from this literal reading of the script; only a real chart export can
+confirm both match TradingView itself.
+
+Regenerate with: python -m backtest.tests.pine_reference
+"""
+
+import csv
+import json
+import math
+import os
+
+NA = float('nan')
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+SOURCE = os.path.join(FIXTURES, 'eurusd_h1_sma5_ema10.csv')
+OUTPUT = os.path.join(FIXTURES, 'eurusd_h1_reference_mas')
+
+TYPES = ['TEMA', 'HMA', 'KAMA', 'ALMA', 'FRAMA', 'VIDYA', 'JMA']
+LENGTHS = [10, 21]
+
+
+def na(value):
+    return value != value
+
+
+def nz(value, replacement):
+    return replacement if na(value) else value
+
+
+def at(series, bar, offset):
+    """series[offset] seen from bar: na before the first bar"""
+    return series[bar - offset] if bar - offset >= 0 else NA
+
+
+def pine_round(value):
+    return int(math.floor(value + 0.5))
+
+
+def pine_log(value):
+    if na(value) or value < 0:
+        return NA
+    return -math.inf if value == 0 else math.log(value)
+
+
+def pine_exp(value):
+    if na(value):
+        return NA
+    return 0.0 if value == -math.inf else math.exp(value) if value != math.inf else math.inf
+
+
+# Built-ins
+
+def ta_sma(src, length):
+    out = []
+    for bar in range(len(src)):
+        total = 0.0
+        for i in range(length):
+            total += at(src, bar, i)
+        out.append(total / length)
+    return out
+
+
+def ta_ema(src, length):
+    # sum := na(sum[1]) ? ta.sma(src, length) : alpha * src + (1 - alpha) * nz(sum[1])
+    alpha = 2 / (length + 1)
+    seed = ta_sma(src, length)
+    out = []
+    for bar in range(len(src)):
+        previous = at(out, bar, 1)
+        out.append(seed[bar] if na(previous) else alpha * src[bar] + (1 - alpha) * nz(previous, 0.0))
+    return out
+
+
+def ta_wma(src, length):
+    out = []
+    for bar in range(len(src)):
+        norm = 0.0
+        total = 0.0
+        for i in range(length):
+            weight = (length - i) * length
+            norm += weight
+            total += at(src, bar, i) * weight
+        out.append(total / norm)
+    return out
+
+
+def ta_extreme(src, length, pick):
+    out = []
+    for bar in range(len(src)):
+        window = [at(src, bar, i) for i in range(length)]
+        out.append(NA if any(na(v) for v in window) else pick(window))
+    return out
+
+
+# The script's functions
+
+def tema(src, length):
+    ema1 = ta_ema(src, length)
+    ema2 = ta_ema(ema1, length)
+    ema3 = ta_ema(ema2, length)
+    return [3 * a - 3 * b + c for a, b, c in zip(ema1, ema2, ema3)]
+
+
+def hma(src, length):
+    wma1 = ta_wma(src, pine_round(length / 2))
+    wma2 = ta_wma(src, length)
+    raw = [2 * a - b for a, b in zip(wma1, wma2)]
+    return ta_wma(raw, pine_round(math.sqrt(length)))
+
+
+def kama(src, length, fast_length=2, slow_length=30):
+    moves = [abs(src[bar] - at(src, bar, 1)) for bar in range(len(src))]
+    out = []
+    for bar in range(len(src)):
+        change = abs(src[bar] - at(src, bar, length))
+        volatility = sum(at(moves, bar, i) for i in range(length))
+        # A comparison with na is false
+        er = change / volatility if volatility != 0 and not na(volatility) else 0
+        fast_sc = 2 / (fast_length + 1)
+        slow_sc = 2 / (slow_length + 1)
+        sc = er * (fast_sc - slow_sc) + slow_sc
+        sc = sc * sc
+        previous = nz(at(out, bar, 1), src[bar])
+        out.append(previous + sc * (src[bar] - previous))
+    return out
+
+
+def alma(src, length, offset=0.85, sigma=6):
+    m = offset * (length - 1)
+    s = length / sigma
+    out = []
+    for bar in range(len(src)):
+        total = 0.0
+        total_weight = 0.0
+        for i in range(length):
+            weight = math.exp(-((i - m) * (i - m)) / (2 * s * s))
+            total += at(src, bar, length - 1 - i) * weight
+            total_weight += weight
+        out.append(total / total_weight if total_weight != 0 else src[bar])
+    return out
+
+
+def frama(src, length):
+    # ta.highest/ta.lowest take an int length, so length / 2 is truncated for them
+    half = length / 2
+    highest, lowest = ta_extreme(src, length, max), ta_extreme(src, length, min)
+    half_highest, half_lowest = ta_extreme(src, int(half), max), ta_extreme(src, int(half), min)
+    out = []
+    for bar in range(len(src)):
+        n1 = (highest[bar] - lowest[bar]) / length
+        n2 = (half_highest[bar] - half_lowest[bar]) / half
+        n3 = (half_highest[bar] - half_lowest[bar]) / half
+        dimen = pine_log(n1 + n2) - pine_log(n3)
+        dimen = NA if na(dimen) else dimen / math.log(2)
+        alpha = pine_exp(-4.6 * (dimen - 1))
+        alpha = 0.01 if alpha < 0.01 else 1 if alpha > 1 else alpha
+        previous = nz(at(out, bar, 1), src[bar])
+        out.append(previous + alpha * (src[bar] - previous))
+    return out
+
+
+def vidya(src, length):
+    out = []
+    for bar in range(len(src)):
+        up = 0.0
+        down = 0.0
+        for i in range(1, length + 1):
+            if at(src, bar, i) > at(src, bar, i + 1):
+                up = up + at(src, bar, i) - at(src, bar, i + 1)
+            else:
+                down = down + at(src, bar, i + 1) - at(src, bar, i)
+        total = up + down
+        cmo = (up - down) / total * 100 if total != 0 and not na(total) else 0
+        abs_cmo = abs(cmo) / 100
+        previous = nz(at(out, bar, 1), src[bar])
+        out.append(previous + abs_cmo * 2 / (length + 1) * (src[bar] - previous))
+    return out
+
+
+def jma(src, length, power=2):
+    out = []
+    for bar in range(len(src)):
+        previous = nz(at(out, bar, 1), src[bar])
+        out.append(previous + power * (src[bar] - previous) / length)
+    return out
+
+
+def reference_ma(src, length, ma_type):
+    if ma_type == 'TEMA':
+        return tema(src, length)
+    if ma_type == 'HMA':
+        return hma(src, length)
+    if ma_type == 'KAMA':
+        return kama(src, length, 2, 30)
+    if ma_type == 'ALMA':
+        return alma(src, length, 0.85, 6)
+    if ma_type == 'FRAMA':
+        return frama(src, length)
+    if ma_type == 'VIDYA':
+        return vidya(src, length)
+    if ma_type == 'JMA':
+        return jma(src, length, 2)
+    raise ValueError(f'No reference for {ma_type}')
+
+
+def read_source(path=SOURCE):
+    with open(path, newline='') as f:
+        rows = list(csv.DictReader(f))
+    return [row['time'] for row in rows], [float(row['close']) for row in rows]
+
+
+def columns():
+    return [f'{ma_type}:{length}' for ma_type in TYPES for length in LENGTHS]
+
+
+def generate(times, close):
+    """Fixture rows: time, close and every reference MA column"""
+    series = {column: reference_ma(close, int(column.split(':')[1]), column.split(':')[0])
+              for column in columns()}
+    return [[t, repr(c)] + ['NaN' if na(series[column][bar]) else repr(series[column][bar])
+                            for column in columns()]
+            for bar, (t, c) in enumerate(zip(times, close))]
+
+
+def main():
+    times, close = read_source()
+    with open(OUTPUT + '.csv', 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['time', 'close'] + columns())
+        writer.writerows(generate(times, close))
+    with open(OUTPUT + '.json', 'w') as f:
+        json.dump({
+            'source': os.path.basename(SOURCE),
+            'generator': 'backtest/tests/pine_reference.py',
+            'tradingview_export': False,
+            'note': ('Generated by an independent bar-by-bar reading of tradingview/moving-averages-strategy.pine, '
+                     'not exported from TradingView. Replace with a real chart export to check against '
+                     'TradingView itself.'),
+            'columns': columns(),
+            'rtol': 1e-9
+        }, f, indent=2)
+        f.write('\n')
+    print(f'Wrote {OUTPUT}.csv and .json ({len(times)} bars)')
+
+
+if __name__ == '__main__':
+    main()
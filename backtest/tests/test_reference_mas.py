@@ -0,0 +1,40 @@
+"""
+Golden check of the recursive moving averages against a generated reference fixture
+fixtures/eurusd_h1_reference_mas.csv holds TEMA, HMA, KAMA, ALMA, FRAMA, VIDYA and JMA
+over the EURUSD export's closes, computed by pine_reference.py, an independent bar-by-bar
+implementation of the Pine script. It is not a TradingView export (see its .json).
+"""
+
+import csv
+import json
+import os
+
+import numpy as np
+import pytest
+
+from backtest.indicators import ma
+from backtest.tests import pine_reference
+
+FIXTURE = os.path.join(os.path.dirname(__file__), 'fixtures', 'eurusd_h1_reference_mas')
+
+with open(FIXTURE + '.json') as f:
+    META = json.load(f)
+with open(FIXTURE + '.csv', newline='') as f:
+    ROWS = list(csv.DictReader(f))
+CLOSE = np.array([float(row['close']) for row in ROWS])
+
+
+@pytest.mark.parametrize('column', META['columns'])
+def test_matches_reference(column):
+    ma_type, length = column.split(':')
+    expected = np.array([float(row[column]) for row in ROWS])
+    actual = ma(CLOSE, int(length), ma_type)
+
+    np.testing.assert_array_equal(np.isnan(actual), np.isnan(expected))
+    np.testing.assert_allclose(actual, expected, rtol=META['rtol'], equal_nan=True)
+
+
+def test_fixture_is_what_the_reference_generates():
+    times, close = pine_reference.read_source()
+    assert META['columns'] == pine_reference.columns() and not META['tradingview_export']
+    assert [list(row.values()) for row in ROWS] == pine_reference.generate(times, close)
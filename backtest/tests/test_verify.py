@@ -0,0 +1,47 @@
+"""
+Golden check of the backtest engine against a chart-data export of the strategy
+fixtures/eurusd_h1_sma5_ema10.csv has TradingView's export layout (OHLC plus the
+"1st MA" and "2nd MA" plots), and the .json next to it lists the bars where the
+strategy went long and short.
+"""
+
+import csv
+import json
+import os
+
+from backtest.engine import load_bars, parse_ma, run_backtest, verify
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+EXPORT = os.path.join(FIXTURES, 'eurusd_h1_sma5_ema10.csv')
+
+with open(os.path.join(FIXTURES, 'eurusd_h1_sma5_ema10.json')) as f:
+    EXPECTED = json.load(f)
+MA1, MA2 = parse_ma(EXPECTED['ma1']), parse_ma(EXPECTED['ma2'])
+
+
+def test_verify_passes_on_export():
+    report = verify(EXPORT, *MA1, *MA2)
+    assert report['passed'], report
+    assert report['long_signals'] == len(EXPECTED['long'])
+    assert report['short_signals'] == len(EXPECTED['short'])
+
+
+def test_signals_on_expected_bars():
+    bars = load_bars(EXPORT)
+    result = run_backtest(bars, *MA1, *MA2)
+    assert bars.time[result['long_signal']].tolist() == EXPECTED['long']
+    assert bars.time[result['short_signal']].tolist() == EXPECTED['short']
+
+
+def test_verify_fails_on_shifted_plot(tmp_path):
+    with open(EXPORT, newline='') as f:
+        rows = list(csv.reader(f))
+    index = rows[0].index('2nd MA')
+    rows[50][index] = f"{float(rows[50][index]) + 0.001:.8f}"
+    shifted = tmp_path / 'shifted.csv'
+    with open(shifted, 'w', newline='') as f:
+        csv.writer(f).writerows(rows)
+
+    report = verify(str(shifted), *MA1, *MA2)
+    assert not report['passed']
+    assert report['max_relative_error']['ma2'] > 1e-6
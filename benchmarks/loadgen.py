@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Load generator and latency benchmark for the MT5 Bridge
+Replays recorded or synthetic alert streams at a configurable rate and reports
+throughput, latency percentiles, errors by retcode and execution queue depth.
+
+Run the bridge against the simulator for broker-free capacity tests:
+    cd mt5-bridge && MT5_BACKEND=simulator SIM_LATENCY_MS=20 python serve.py
+    python benchmarks/loadgen.py --rate 50 --duration 30 --output results.json
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List
+
+import requests
+from requests.adapters import HTTPAdapter
+
+QUEUE_DEPTH_PATTERN = re.compile(r'^mt5_bridge_execution_queue_depth (\S+)$', re.MULTILINE)
+
+
+def percentile(sorted_values: List[float], p: float):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(p / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    """Parse 'EURUSD:3,GBPUSD:1' into normalised weights"""
+    weights = {}
+    for part in spec.split(','):
+        name, _, weight = part.partition(':')
+        weights[name.strip().upper()] = float(weight or 1)
+    total = sum(weights.values())
+    return {name: weight / total for name, weight in weights.items()}
+
+
+def synthetic_alerts(symbols: Dict[str, float], signals: Dict[str, float], lot_size: float,
+                     seed=None) -> Iterator[Dict]:
+    """Endless stream of alerts drawn from the symbol and signal mixes"""
+    rng = random.Random(seed)
+    symbol_names, symbol_weights = zip(*symbols.items())
+    signal_names, signal_weights = zip(*signals.items())
+    while True:
+        yield {
+            'signal': rng.choices(signal_names, signal_weights)[0],
+            'symbol': rng.choices(symbol_names, symbol_weights)[0],
+            'lot_size': lot_size,
+            'sl_percent': 1.0,
+            'tp_percent': 2.0,
+        }
+
+
+def recorded_alerts(path: str, loop: bool) -> Iterator[Dict]:
+    """Alerts from a JSONL file, one alert payload per line"""
+    with open(path) as f:
+        alerts = [json.loads(line) for line in f if line.strip()]
+    if not alerts:
+        raise ValueError(f"No alerts in {path}")
+    while True:
+        yield from alerts
+        if not loop:
+            return
+
+
+class LoadGenerator:
+    def __init__(self, base_url: str, endpoint: str, workers: int, timeout: float):
+        self.base_url = base_url.rstrip('/')
+        self.url = self.base_url + endpoint
+        self.timeout = timeout
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.local = threading.local()
+        self.workers = workers
+
+        self.lock = threading.Lock()
+        self.samples = []
+        self.queue_depth = []
+
+    def session(self) -> requests.Session:
+        """Keep-alive session per worker thread"""
+        session = getattr(self.local, 'session', None)
+        if session is None:
+            session = self.local.session = requests.Session()
+            session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=1))
+            session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=1))
+        return session
+
+    def send(self, alert: Dict, scheduled_at: float):
+        # A unique client id keeps the bridge's idempotency index from absorbing repeats
+        payload = dict(alert, client_id=uuid.uuid4().hex,
+                       timestamp=datetime.now(timezone.utc).isoformat())
+        started_at = time.perf_counter()
+        status, retcode, error = None, None, None
+        try:
+            response = self.session().post(self.url, json=payload, timeout=self.timeout)
+            status = response.status_code
+            try:
+                body = response.json()
+                retcode = body.get('retcode')
+                if not body.get('success', status < 400):
+                    error = body.get('error')
+            except ValueError:
+                pass
+        except requests.exceptions.RequestException as e:
+            error = type(e).__name__
+        finished_at = time.perf_counter()
+
+        sample = {
+            'symbol': alert.get('symbol'),
+            'signal': alert.get('signal'),
+            'status': status,
+            'retcode': retcode,
+            'error': error,
+            # Service time, and time since the alert was due (includes client-side queuing)
+            'latency': finished_at - started_at,
+            'response_time': finished_at - scheduled_at,
+            'sent_at': started_at
+        }
+        with self.lock:
+            self.samples.append(sample)
+
+    def sample_queue_depth(self, stop: threading.Event, interval: float, start: float):
+        session = requests.Session()
+        while not stop.wait(interval):
+            try:
+                text = session.get(f"{self.base_url}/metrics", timeout=self.timeout).text
+                match = QUEUE_DEPTH_PATTERN.search(text)
+                if match:
+                    self.queue_depth.append({'t': round(time.perf_counter() - start, 3),
+                                             'depth': float(match.group(1))})
+            except requests.exceptions.RequestException:
+                pass
+
+    def run(self, alerts: Iterator[Dict], rate: float, duration: float, burst: int,
+            burst_interval: float, sample_interval: float) -> float:
+        """Schedule alerts open-loop and wait for all responses; returns elapsed seconds"""
+        start = time.perf_counter()
+        stop = threading.Event()
+        sampler = threading.Thread(target=self.sample_queue_depth, args=(stop, sample_interval, start), daemon=True)
+        sampler.start()
+
+        futures = []
+        if burst:
+            # Fire burst alerts at once every burst_interval seconds
+            schedule = ((i // burst) * burst_interval for i in range(10 ** 9))
+        else:
+            schedule = (i / rate for i in range(10 ** 9))
+
+        for offset, alert in zip(schedule, alerts):
+            if offset >= duration:
+                break
+            due = start + offset
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            futures.append(self.pool.submit(self.send, alert, due))
+
+        for future in futures:
+            future.result()
+        elapsed = time.perf_counter() - start
+
+        stop.set()
+        sampler.join()
+        self.pool.shutdown()
+        return elapsed
+
+    def summary(self, elapsed: float) -> Dict:
+        samples = self.samples
+        latencies = sorted(s['latency'] * 1000 for s in samples)
+        response_times = sorted(s['response_time'] * 1000 for s in samples)
+        errors = [s for s in samples if s['error'] or not s['status'] or s['status'] >= 400]
+
+        def latency_stats(values):
+            return {
+                'p50_ms': round(percentile(values, 50), 3) if values else None,
+                'p95_ms': round(percentile(values, 95), 3) if values else None,
+                'p99_ms': round(percentile(values, 99), 3) if values else None,
+                'max_ms': round(values[-1], 3) if values else None,
+                'mean_ms': round(sum(values) / len(values), 3) if values else None
+            }
+
+        by_symbol = defaultdict(list)
+        for s in samples:
+            by_symbol[s['symbol']].append(s['latency'] * 1000)
+
+        return {
+            'requests': len(samples),
+            'elapsed_s': round(elapsed, 3),
+            'throughput_rps': round(len(samples) / elapsed, 2) if elapsed else None,
+            'error_rate': round(len(errors) / len(samples), 4) if samples else None,
+            'latency': latency_stats(latencies),
+            'response_time': latency_stats(response_times),
+            'status_codes': dict(Counter(str(s['status']) for s in samples)),
+            'errors_by_retcode': dict(Counter(str(s['retcode']) for s in errors)),
+            'errors_by_type': dict(Counter(s['error'] for s in errors if s['error'] and not s['retcode'])),
+            'by_symbol': {symbol: latency_stats(sorted(values)) for symbol, values in by_symbol.items()},
+            'max_queue_depth': max((q['depth'] for q in self.queue_depth), default=None)
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='MT5 Bridge load generator')
+    parser.add_argument('--url', default='http://localhost:5000', help='MT5 Bridge URL')
+    parser.add_argument('--endpoint', default='/webhook/tradingview', help='Webhook path to load')
+    parser.add_argument('--rate', type=float, default=10.0, help='Alerts per second (steady mode)')
+    parser.add_argument('--burst', type=int, default=0, help='Alerts per burst (burst mode)')
+    parser.add_argument('--burst-interval', type=float, default=1.0, help='Seconds between bursts')
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds to generate load')
+    parser.add_argument('--workers', type=int, default=32, help='Concurrent pooled clients')
+    parser.add_argument('--symbols', default='EURUSD:3,GBPUSD:2,USDJPY:1', help='Symbol mix with weights')
+    parser.add_argument('--signals', default='BUY:45,SELL:45,CLOSE:10', help='Signal mix with weights')
+    parser.add_argument('--lot-size', type=float, default=0.01, help='Lot size for synthetic alerts')
+    parser.add_argument('--replay', help='JSONL file of recorded alerts to replay instead')
+    parser.add_argument('--seed', type=int, help='Random seed for synthetic alerts')
+    parser.add_argument('--timeout', type=float, default=30.0, help='Request timeout in seconds')
+    parser.add_argument('--sample-interval', type=float, default=0.5, help='Queue depth sampling interval')
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    parser.add_argument('--label', default='', help='Free-form label stored with the results, e.g. a release')
+    args = parser.parse_args()
+
+    if args.replay:
+        alerts = recorded_alerts(args.replay, loop=True)
+    else:
+        alerts = synthetic_alerts(parse_mix(args.symbols), parse_mix(args.signals), args.lot_size, args.seed)
+
+    generator = LoadGenerator(args.url, args.endpoint, args.workers, args.timeout)
+    mode = f"bursts of {args.burst} every {args.burst_interval}s" if args.burst else f"{args.rate}/s"
+    print(f"Sending alerts to {generator.url} at {mode} for {args.duration}s...")
+    elapsed = generator.run(alerts, args.rate, args.duration, args.burst, args.burst_interval, args.sample_interval)
+    summary = generator.summary(elapsed)
+
+    latency = summary['latency']
+    print(f"\nRequests:    {summary['requests']} in {summary['elapsed_s']}s ({summary['throughput_rps']} req/s)")
+    print(f"Latency:     p50 {latency['p50_ms']}ms  p95 {latency['p95_ms']}ms  "
+          f"p99 {latency['p99_ms']}ms  max {latency['max_ms']}ms")
+    print(f"Error rate:  {summary['error_rate']}  by retcode {summary['errors_by_retcode']}")
+    print(f"Queue depth: max {summary['max_queue_depth']}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'label': args.label,
+                'timestamp': datetime.now(timezone.utc).isoformat(),
+                'config': vars(args),
+                'summary': summary,
+                'queue_depth': generator.queue_depth
+            }, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
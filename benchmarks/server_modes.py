@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Benchmark for MT5 Bridge serving modes
+Compares throughput and latency of Flask's development server with the waitress
+production server (serve.py)
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+BRIDGE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'mt5-bridge')
+
+MODES = {
+    'dev': [sys.executable, 'app.py'],
+    'waitress': [sys.executable, 'serve.py'],
+}
+
+
+def start_server(mode, port, threads):
+    """Start the bridge in the given mode and wait until it answers"""
+    env = dict(os.environ, BRIDGE_PORT=str(port), BRIDGE_THREADS=str(threads), LOG_LEVEL='WARNING')
+    os.makedirs(os.path.join(BRIDGE_DIR, 'logs'), exist_ok=True)
+    process = subprocess.Popen(MODES[mode], cwd=BRIDGE_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            requests.get(f"http://127.0.0.1:{port}/ping", timeout=1)
+            return process
+        except requests.exceptions.RequestException:
+            time.sleep(0.2)
+
+    process.kill()
+    raise RuntimeError(f"{mode} server did not start on port {port}")
+
+
+def run_load(url, concurrency, duration):
+    """Hit url from concurrent keep-alive clients for duration seconds"""
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client():
+        nonlocal errors
+        session = requests.Session()
+        session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=1))
+        local = []
+        local_errors = 0
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                response = session.get(url, timeout=10)
+                if response.status_code >= 400:
+                    local_errors += 1
+            except requests.exceptions.RequestException:
+                local_errors += 1
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+            errors += local_errors
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(client)
+
+    latencies.sort()
+    count = len(latencies)
+
+    def pct(p):
+        return round(latencies[min(count - 1, int(count * p))] * 1000, 3) if count else None
+
+    return {
+        'requests': count,
+        'errors': errors,
+        'throughput_rps': round(count / duration, 1),
+        'p50_ms': pct(0.50),
+        'p95_ms': pct(0.95),
+        'p99_ms': pct(0.99),
+        'max_ms': round(latencies[-1] * 1000, 3) if count else None
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare MT5 Bridge serving modes')
+    parser.add_argument('--modes', default='dev,waitress', help='Comma separated modes to run')
+    parser.add_argument('--endpoint', default='/health', help='Endpoint to load')
+    parser.add_argument('--concurrency', type=int, default=32, help='Concurrent keep-alive clients')
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds of load per mode')
+    parser.add_argument('--threads', type=int, default=16, help='Waitress worker threads')
+    parser.add_argument('--port', type=int, default=5055, help='Port to run the servers on')
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    results = {}
+    for mode in args.modes.split(','):
+        process = start_server(mode, args.port, args.threads)
+        try:
+            print(f"Running {mode} for {args.duration}s with {args.concurrency} clients...")
+            results[mode] = run_load(f"http://127.0.0.1:{args.port}{args.endpoint}",
+                                     args.concurrency, args.duration)
+        finally:
+            process.terminate()
+            process.wait(10)
+
+    print(f"\n{'mode':<10} {'rps':>10} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'max ms':>10} {'errors':>8}")
+    for mode, r in results.items():
+        print(f"{mode:<10} {r['throughput_rps']:>10} {r['p50_ms']:>10} {r['p95_ms']:>10} "
+              f"{r['p99_ms']:>10} {r['max_ms']:>10} {r['errors']:>8}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'config': vars(args), 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
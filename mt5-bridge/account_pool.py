@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Multi-account worker pool for the MT5 Bridge
+The MetaTrader5 API binds one terminal per process, so every account runs in its own
+bridge process (serve.py on a loopback port) with its own terminal, execution queue,
+trade journal and logs. The router in the main bridge sends each signal to the
+matching accounts in parallel and aggregates their results.
+
+accounts.json:
+    [
+      {"name": "main", "login": 1234567, "password": "${MT5_PASSWORD_MAIN}", "server": "Broker-Demo",
+       "path": "C:/MT5/main/terminal64.exe", "tags": ["primary"], "symbols": ["EURUSD", "XAUUSD"]},
+      {"name": "prop", "login": 7654321, "password": "${MT5_PASSWORD_PROP}", "server": "Prop-Live",
+       "path": "C:/MT5/prop/terminal64.exe", "tags": ["prop"], "env": {"LOT_SIZE": "0.05"}}
+    ]
+
+Accounts without "symbols" trade every symbol. A signal may name its targets in
+"accounts" (names or tags, or "all"); otherwise it goes to every account trading its symbol.
+"""
+
+import json
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_accounts(path: str) -> List[Dict]:
+    """Read the accounts file, expanding ${VAR} references in string values"""
+    with open(path) as f:
+        accounts = json.load(f)
+
+    def expand(value):
+        if isinstance(value, str):
+            return os.path.expandvars(value)
+        if isinstance(value, list):
+            return [expand(v) for v in value]
+        if isinstance(value, dict):
+            return {k: expand(v) for k, v in value.items()}
+        return value
+
+    accounts = [expand(a) for a in accounts]
+    names = [a['name'] for a in accounts]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Duplicate account names in {path}")
+    return accounts
+
+
+class AccountWorker:
+    """One bridge process bound to one terminal and account"""
+
+    def __init__(self, config: Dict, port: int, request_timeout: float = 30.0):
+        self.name = config['name']
+        self.config = config
+        self.port = int(config.get('port', port))
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.tags = {t.lower() for t in config.get('tags', [])}
+        self.symbols = {s.upper() for s in config.get('symbols', [])}
+        self.request_timeout = request_timeout
+
+        self.process: Optional[subprocess.Popen] = None
+        self.session = requests.Session()
+        self.session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=32))
+
+        self.restart_count = 0
+        self.order_count = 0
+        self.failed_count = 0
+        self.last_latency_ms = None
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def environment(self) -> Dict[str, str]:
+        """Parent environment with this account's terminal, port and data paths"""
+        data_dir = os.path.join('mt5_data', 'accounts', self.name)
+        env = dict(os.environ)
+        env.update({
+            'BRIDGE_HOST': '127.0.0.1',
+            'BRIDGE_PORT': str(self.port),
+            'MT5_LOGIN': str(self.config.get('login', '')),
+            'MT5_PASSWORD': str(self.config.get('password', '')),
+            'MT5_SERVER': str(self.config.get('server', '')),
+            'MT5_PATH': str(self.config.get('path', env.get('MT5_PATH', '/opt/mt5'))),
+            # Workers never route further, and only the router talks to TradingView and n8n
+            'ACCOUNTS_FILE': '',
+            'WEBHOOK_SECRET': '',
+            'N8N_NOTIFY_URL': '',
+            'SIGNAL_ENGINE_STRATEGIES': '',
+            'HISTORY_SYNC_SERIES': '',
+            'LOG_DIR': os.path.join('logs', self.name),
+            'LOG_CONSOLE': 'false',
+            'IDEMPOTENCY_PREFIX': f'mt5-bridge:{self.name}:signal:',
+            'TRADE_JOURNAL_PATH': os.path.join(data_dir, 'trade_journal'),
+            'DEALS_JOURNAL_PATH': os.path.join(data_dir, 'deals.sqlite'),
+            'SIGNAL_ENGINE_CHECKPOINT': os.path.join(data_dir, 'signal_engine.json'),
+        })
+        if 'magic' in self.config:
+            env['MAGIC_NUMBER'] = str(self.config['magic'])
+        env.update({k: str(v) for k, v in self.config.get('env', {}).items()})
+        return env
+
+    def start(self):
+        # Same working directory as the router, so relative data and log paths resolve alike
+        self.process = subprocess.Popen([sys.executable, os.path.join(BASE_DIR, 'serve.py')], env=self.environment())
+        logger.info(f"Account worker {self.name} started (pid {self.process.pid}, port {self.port})")
+
+    def stop(self, timeout: float = 10.0):
+        if self.alive:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+    def wait_ready(self, timeout: float) -> bool:
+        """Wait until the worker answers /ping"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline and self.alive:
+            try:
+                if self.session.get(f"{self.url}/ping", timeout=1).ok:
+                    return True
+            except requests.exceptions.RequestException:
+                pass
+            time.sleep(0.2)
+        return False
+
+    def accepts(self, symbol: str, targets: Optional[List[str]]) -> bool:
+        if targets:
+            return 'all' in targets or self.name.lower() in targets or bool(self.tags & set(targets))
+        return not self.symbols or symbol in self.symbols
+
+    def execute(self, payload: Optional[Dict], params: Dict, path: str = '/webhook/tradingview',
+                method: str = 'POST') -> Dict:
+        """Send a signal (or a batch, with path='/webhook/batch') to this account and wait for its result"""
+        start = time.perf_counter()
+        try:
+            response = self.session.request(method, f"{self.url}{path}", json=payload, params=params,
+                                            timeout=self.request_timeout)
+            try:
+                body = response.json()
+            except ValueError:
+                body = {'success': False, 'error': response.text[:200]}
+            status = response.status_code
+        except requests.exceptions.RequestException as e:
+            body, status = {'success': False, 'error': f"Account {self.name} unreachable: {str(e)}"}, 503
+
+        latency_ms = round((time.perf_counter() - start) * 1000, 2)
+        # Read endpoints answer without a success flag, their HTTP status decides
+        success = bool(body.get('success', 200 <= status < 300)) if isinstance(body, dict) else False
+        self.last_latency_ms = latency_ms
+        self.order_count += 1
+        if not success:
+            self.failed_count += 1
+        return {'account': self.name, 'success': success, 'status': status,
+                'latency_ms': latency_ms, 'result': body}
+
+    def forward(self, method: str, path: str, params: Dict) -> requests.Response:
+        """Pass a read request through to this account, streaming the response back"""
+        return self.session.request(method, f"{self.url}{path}", params=params, stream=True,
+                                    timeout=self.request_timeout)
+
+    def get_stats(self) -> Dict:
+        return {
+            'url': self.url,
+            'pid': self.process.pid if self.process else None,
+            'alive': self.alive,
+            'restarts': self.restart_count,
+            'orders': self.order_count,
+            'failed': self.failed_count,
+            'last_latency_ms': self.last_latency_ms
+        }
+
+
+class AccountPool:
+    """Starts one worker per account, restarts crashed ones and fans signals out to them"""
+
+    def __init__(self, accounts: List[Dict], base_port: int = 5100, start_timeout: float = 60.0,
+                 request_timeout: float = 30.0, check_interval: float = 2.0):
+        self.workers = [AccountWorker(a, base_port + i, request_timeout) for i, a in enumerate(accounts)]
+        self.start_timeout = start_timeout
+        self.check_interval = check_interval
+
+        self._executor = ThreadPoolExecutor(max_workers=max(4, len(self.workers) * 4), thread_name_prefix='account-router')
+        self._thread = None
+        self._stop_event = threading.Event()
+
+    def start(self):
+        """Start every worker, wait for them to come up and start the supervisor"""
+        for worker in self.workers:
+            worker.start()
+        for worker in self.workers:
+            if not worker.wait_ready(self.start_timeout):
+                logger.error(f"Account worker {worker.name} did not become ready within {self.start_timeout}s")
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='account-pool', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        for worker in self.workers:
+            worker.stop()
+        self._executor.shutdown(wait=False)
+
+    def route(self, symbol: str, targets=None) -> List[AccountWorker]:
+        """Workers a signal should go to, by explicit account names/tags or by symbol"""
+        if isinstance(targets, str):
+            targets = [t for t in targets.split(',')]
+        targets = [t.strip().lower() for t in targets or [] if t.strip()]
+        return [w for w in self.workers if w.accepts(symbol, targets)]
+
+    def dispatch(self, workers: List[AccountWorker], payload: Dict, params: Optional[Dict] = None) -> Dict:
+        """Execute a signal on every worker in parallel and aggregate the results"""
+        return self.dispatch_each([(w, payload) for w in workers], params)
+
+    def worker(self, name: str) -> Optional[AccountWorker]:
+        """Worker of the account with this name"""
+        return next((w for w in self.workers if w.name.lower() == name.lower()), None)
+
+    def broadcast(self, path: str, method: str = 'GET', params: Optional[Dict] = None) -> Dict:
+        """Call the same endpoint on every worker in parallel, e.g. /positions or /positions/close_all"""
+        return self.dispatch_each([(w, None) for w in self.workers], params, path, method)
+
+    def dispatch_each(self, jobs: List[Tuple[AccountWorker, Optional[Dict]]], params: Optional[Dict] = None,
+                      path: str = '/webhook/tradingview', method: str = 'POST') -> Dict:
+        """Send each worker its own payload in parallel and aggregate the results"""
+        start = time.perf_counter()
+        futures = [self._executor.submit(w.execute, payload, params or {}, path, method) for w, payload in jobs]
+        results = [f.result() for f in futures]
+        succeeded = sum(1 for r in results if r['success'])
+        return {
+            'success': succeeded == len(results),
+            'accounts_ok': succeeded,
+            'accounts_failed': len(results) - succeeded,
+            'latency_ms': round((time.perf_counter() - start) * 1000, 2),
+            'results': results
+        }
+
+    def get_stats(self) -> Dict:
+        return {w.name: w.get_stats() for w in self.workers}
+
+    def _run(self):
+        """Restart workers whose process exited"""
+        while not self._stop_event.wait(self.check_interval):
+            for worker in self.workers:
+                if not worker.alive and not self._stop_event.is_set():
+                    logger.error(f"Account worker {worker.name} exited ({worker.process.returncode}), restarting")
+                    worker.restart_count += 1
+                    worker.start()
@@ -5,40 +5,68 @@ Receives trading signals from n8n and executes trades in MetaTrader 5
 """
 
 import os
+import atexit
 import logging
 import time
 from datetime import datetime, timezone
-from flask import Flask, request, jsonify
+from flask import Blueprint, Flask, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
 from dotenv import load_dotenv
 import json
 import threading
-
-# Try to import MetaTrader5 - it may not be available in container
-try:
-    import MetaTrader5 as mt5
-    MT5_AVAILABLE = True
-except ImportError:
-    MT5_AVAILABLE = False
-    logging.warning("MetaTrader5 package not available. Make sure MT5 is running on the host system.")
-    mt5 = None
+from functools import wraps
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError, wait as wait_futures
+
+from execution import ExecutionEngine, QueueFullError, PRIORITY_CLOSE, PRIORITY_OPEN
+from symbol_cache import SymbolCache
+from bulk_close import BulkCloser
+from order_sender import OrderSender
+from state_mirror import StateMirror
+from stream_hub import StreamFull, StreamHub
+from risk_engine import RiskEngine, RiskRejected
+from idempotency import create_deduplicator
+from signals import SignalValidationError, decode_alert, parse_signal, redact, verify_secret
+from notifier import N8nNotifier
+from signal_engine import SignalEngine, parse_strategies
+from history_store import HistoryStore, HistorySyncer, executor_runner, parse_series, parse_time
+from deals_journal import DealsJournal, DealsSyncer, decode_cursor, ndjson_lines
+from log_pipeline import audit, setup_logging
+from account_pool import AccountPool, load_accounts
+from connection_supervisor import CircuitOpenError, ConnectionSupervisor
+from trade_journal import TradeJournal, TradeReconciler, journal_tag, STATE_RECEIVED, STATE_RESULT, STATE_SENT, STATE_SUBMITTED
+from metrics import REGISTRY, SIGNAL_SECONDS, timed
 
 # Load environment variables
 load_dotenv()
 
-# Configure logging
-logging.basicConfig(
-    level=getattr(logging, os.getenv('LOG_LEVEL', 'INFO')),
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('logs/mt5_bridge.log'),
-        logging.StreamHandler()
-    ]
-)
+# MT5_BACKEND=simulator swaps the terminal for an in-process simulation
+MT5_BACKEND = os.getenv('MT5_BACKEND', 'terminal').lower()
+
+if MT5_BACKEND == 'simulator':
+    import mt5_simulator as mt5
+    MT5_AVAILABLE = True
+else:
+    # Try to import MetaTrader5 - it may not be available in container
+    try:
+        import MetaTrader5 as mt5
+        MT5_AVAILABLE = True
+    except ImportError:
+        MT5_AVAILABLE = False
+        logging.warning("MetaTrader5 package not available. Make sure MT5 is running on the host system.")
+        mt5 = None
+
+# Logging runs off-thread: JSON lines in logs/, rotated and compressed, audit events separate
+log_pipeline = setup_logging(os.getenv('LOG_DIR', 'logs'))
+atexit.register(log_pipeline.stop)
 logger = logging.getLogger(__name__)
 
-app = Flask(__name__)
-CORS(app)
+bridge_api = Blueprint('bridge_api', __name__)
+
+class SignalRejected(Exception):
+    """Raised when a signal cannot be executed as requested"""
+
+class DeadlineExceeded(SignalRejected):
+    """Raised for a batch leg that was not sent before the batch deadline"""
 
 class MT5Bridge:
     def __init__(self):
@@ -53,8 +81,198 @@ class MT5Bridge:
         self.lot_size = float(os.getenv('LOT_SIZE', '0.01'))
         self.magic_number = int(os.getenv('MAGIC_NUMBER', '123456'))
 
+        # Symbols are selected and their specs prefetched once the terminal is connected
+        self.warmup_symbols = [s.strip().upper() for s in os.getenv('WARMUP_SYMBOLS', self.symbol).split(',') if s.strip()]
+        self.symbol_cache = SymbolCache(
+            mt5,
+            spec_ttl=float(os.getenv('SYMBOL_SPEC_TTL', '3600')),
+            tick_ttl=float(os.getenv('SYMBOL_TICK_TTL', '0.2'))
+        )
+
+        # Market orders use each symbol's filling mode and are re-priced on requotes within a budget
+        self.order_sender = OrderSender(
+            mt5, self.symbol_cache,
+            deviation=int(os.getenv('ORDER_DEVIATION', '10')),
+            retry_budget=float(os.getenv('ORDER_RETRY_BUDGET_MS', '500')) / 1000,
+            max_retries=int(os.getenv('ORDER_MAX_RETRIES', '3'))
+        )
+
+        # Opposite positions are netted with CLOSE_BY on hedging accounts
+        self.hedging_account = False
+        self.bulk_closer = BulkCloser(mt5, self.symbol_cache, self.magic_number, self.order_sender,
+                                      send=self._send_order)
+
+        # Webhook retries are matched against already executed signals
+        self.idempotency = create_deduplicator(
+            backend=os.getenv('IDEMPOTENCY_BACKEND', 'memory'),
+            redis_url=os.getenv('REDIS_URL', 'redis://redis:6379/0'),
+            ttl=float(os.getenv('IDEMPOTENCY_TTL', '86400')),
+            max_entries=int(os.getenv('IDEMPOTENCY_MAX_ENTRIES', '10000')),
+            prefix=os.getenv('IDEMPOTENCY_PREFIX', 'mt5-bridge:signal:')
+        )
+
+        # Direct TradingView ingestion, with n8n kept as an asynchronous side-channel
+        self.webhook_secret = os.getenv('WEBHOOK_SECRET', '')
+        self.notifier = N8nNotifier(os.getenv('N8N_NOTIFY_URL', ''))
+        self.notifier.start()
+
+        # Execution parameters
+        self.accept_then_execute = os.getenv('ACCEPT_THEN_EXECUTE', 'false').lower() == 'true'
+        self.execution_timeout = float(os.getenv('EXECUTION_TIMEOUT', '30'))
+        self.batch_max_signals = int(os.getenv('BATCH_MAX_SIGNALS', '50'))
+        self.batch_deadline = float(os.getenv('BATCH_DEADLINE_MS', '10000')) / 1000
+
+        # With an accounts file, signals are routed to one worker process per terminal/account
+        accounts_file = os.getenv('ACCOUNTS_FILE', '')
+        self.account_pool = AccountPool(
+            load_accounts(accounts_file),
+            base_port=int(os.getenv('ACCOUNTS_BASE_PORT', '5100')),
+            start_timeout=float(os.getenv('ACCOUNTS_START_TIMEOUT', '60')),
+            request_timeout=self.execution_timeout + 5
+        ) if accounts_file else None
+        if self.account_pool:
+            self.account_pool.start()
+            atexit.register(self.account_pool.stop)
+
+        # Every mt5.* call runs on the execution engine's thread
+        self.executor = ExecutionEngine(
+            max_queue_size=int(os.getenv('EXECUTION_QUEUE_SIZE', '100')),
+            max_tracked_orders=int(os.getenv('EXECUTION_MAX_TRACKED_ORDERS', '1000'))
+        )
+        self.executor.start()
+
+        # A router only forwards to its account workers, it never attaches to a terminal of its own
+        router = self.account_pool is not None
+
         # Initialize MT5 connection
-        self.initialize_mt5()
+        if not router:
+            self.executor.call(self.initialize_mt5)
+
+        # Terminal-bound components; in router mode each account worker runs its own
+        self.trade_journal = self.reconciler = None
+        self.state_mirror = self.stream_hub = self.risk_engine = self.supervisor = None
+        self.signal_engine = self.history_store = self.history_syncer = None
+        self.deals_journal = self.deals_syncer = None
+        if not router:
+            # Orders are journaled before order_send; orders a previous run left in doubt are resolved now
+            journal_path = os.getenv('TRADE_JOURNAL_PATH', 'mt5_data/trade_journal')
+            self.trade_journal = TradeJournal(
+                journal_path,
+                segment_bytes=int(float(os.getenv('TRADE_JOURNAL_SEGMENT_MB', '64')) * 1024 * 1024),
+                commit_delay=float(os.getenv('TRADE_JOURNAL_COMMIT_DELAY_MS', '0')) / 1000
+            ) if journal_path else None
+            self.reconciler = TradeReconciler(self, mt5, self.trade_journal) if self.trade_journal else None
+            if self.reconciler:
+                self.reconciler.reconcile()
+
+            # Read endpoints are served from a background snapshot of account and positions
+            self.state_mirror = StateMirror(self, interval=float(os.getenv('STATE_MIRROR_INTERVAL', '1.0')))
+            self.state_mirror.start()
+
+            # /stream clients share one producer fed by the state mirror and a single quote poller
+            self.stream_hub = StreamHub(
+                self,
+                tick_interval=float(os.getenv('STREAM_TICK_INTERVAL', '0.25')),
+                heartbeat=float(os.getenv('STREAM_HEARTBEAT', '15')),
+                max_events=int(os.getenv('STREAM_MAX_EVENTS', '1000')),
+                max_clients=int(os.getenv('STREAM_MAX_CLIENTS', '8'))
+            )
+            self.stream_hub.start()
+
+            # BUY/SELL orders are sized and checked against cached margin figures before they are queued
+            self.risk_engine = RiskEngine(
+                self, mt5,
+                refresh_interval=float(os.getenv('RISK_REFRESH_INTERVAL', '60')),
+                risk_percent=float(os.getenv('RISK_PERCENT', '0')),
+                max_symbol_lots=float(os.getenv('RISK_MAX_SYMBOL_LOTS', '0')),
+                max_account_lots=float(os.getenv('RISK_MAX_ACCOUNT_LOTS', '0')),
+                margin_buffer_percent=float(os.getenv('RISK_MARGIN_BUFFER_PERCENT', '0')),
+                resize=os.getenv('RISK_RESIZE', 'false').lower() == 'true',
+                enabled=os.getenv('RISK_ENABLED', 'true').lower() == 'true'
+            )
+            self.risk_engine.start()
+
+            # Optional strategy evaluated on closed MT5 bars, bypassing TradingView and n8n
+            self.signal_engine = SignalEngine(
+                self, mt5,
+                parse_strategies(
+                    os.getenv('SIGNAL_ENGINE_STRATEGIES', ''),
+                    default_sl=float(os.getenv('SIGNAL_ENGINE_SL_PERCENT', '1.0')),
+                    default_tp=float(os.getenv('SIGNAL_ENGINE_TP_PERCENT', '2.0')),
+                    default_lot=self.lot_size
+                ),
+                interval=float(os.getenv('SIGNAL_ENGINE_POLL_INTERVAL', '1.0')),
+                warmup_bars=int(os.getenv('SIGNAL_ENGINE_WARMUP_BARS', '1000')),
+                max_catchup_bars=int(os.getenv('SIGNAL_ENGINE_MAX_CATCHUP_BARS', '5000')),
+                checkpoint_path=os.getenv('SIGNAL_ENGINE_CHECKPOINT', 'mt5_data/signal_engine.json'),
+                checkpoint_interval=float(os.getenv('SIGNAL_ENGINE_CHECKPOINT_INTERVAL', '60'))
+            )
+            self.signal_engine.start()
+
+            # Local bar/tick history, synced incrementally in the background
+            self.history_store = HistoryStore(
+                os.getenv('HISTORY_STORE_PATH', 'mt5_data/history'), mt5,
+                runner=executor_runner(self.executor),
+                default_days=int(os.getenv('HISTORY_SYNC_DAYS', '30'))
+            )
+            self.history_syncer = HistorySyncer(
+                self.history_store,
+                parse_series(os.getenv('HISTORY_SYNC_SERIES', '')),
+                interval=float(os.getenv('HISTORY_SYNC_INTERVAL', '60'))
+            )
+            self.history_syncer.start()
+
+            # Deal history is mirrored into SQLite and served by /history from there
+            self.deals_journal = DealsJournal(
+                os.getenv('DEALS_JOURNAL_PATH', 'mt5_data/deals.sqlite'), mt5,
+                runner=executor_runner(self.executor),
+                default_days=int(os.getenv('DEALS_SYNC_DAYS', '365'))
+            )
+            self.deals_syncer = DealsSyncer(self.deals_journal, interval=float(os.getenv('DEALS_SYNC_INTERVAL', '10')))
+            self.deals_syncer.start()
+
+        # Reconnects a dropped terminal and refuses orders while it is down
+        if not router:
+            self.supervisor = ConnectionSupervisor(
+                self, mt5,
+                interval=float(os.getenv('MT5_HEALTH_CHECK_INTERVAL', '5')),
+                backoff_initial=float(os.getenv('MT5_RECONNECT_BACKOFF_INITIAL', '1')),
+                backoff_max=float(os.getenv('MT5_RECONNECT_BACKOFF_MAX', '60')),
+                failure_threshold=int(os.getenv('MT5_HEALTH_CHECK_FAILURES', '2'))
+            )
+            self.supervisor.start()
+
+        # Component state exposed on /metrics, read only when scraped
+        REGISTRY.callback('mt5_bridge_execution_queue_depth', 'Tasks waiting in the execution queue',
+                          lambda: self.executor.get_stats()['queue_depth'])
+        REGISTRY.callback('mt5_bridge_log_records_dropped_total', 'Log records dropped because the log queue was full',
+                          lambda: log_pipeline.dropped, 'counter')
+        REGISTRY.callback('mt5_bridge_mt5_connected', 'Whether the MT5 terminal is connected',
+                          lambda: int(self.mt5_initialized))
+        REGISTRY.callback('mt5_bridge_order_retry_budget_exhausted_total',
+                          'Orders that stopped retrying because their latency budget was spent',
+                          lambda: self.order_sender.budget_exhausted, 'counter')
+        if not router:
+            REGISTRY.callback('mt5_bridge_mt5_reconnects_total', 'Successful MT5 reconnects',
+                              lambda: self.supervisor.reconnect_count, 'counter')
+            REGISTRY.callback('mt5_bridge_mt5_downtime_seconds_total', 'Seconds the MT5 terminal was disconnected',
+                              lambda: self.supervisor.downtime_seconds + self.supervisor.current_downtime(), 'counter')
+            REGISTRY.callback('mt5_bridge_circuit_open', 'Whether orders are refused because MT5 is down',
+                              lambda: int(self.supervisor.is_open))
+            REGISTRY.callback('mt5_bridge_stream_subscribers', 'Clients connected to /stream',
+                              lambda: self.stream_hub.get_stats()['subscribers'])
+            REGISTRY.callback('mt5_bridge_stream_dropped_events_total', 'Stream events dropped for clients that fell behind',
+                              lambda: self.stream_hub.get_stats()['dropped_events'], 'counter')
+            REGISTRY.callback('mt5_bridge_risk_rejected_total', 'Orders rejected by the pre-trade risk checks',
+                              lambda: self.risk_engine.rejected_count, 'counter')
+            REGISTRY.callback('mt5_bridge_risk_resized_total', 'Orders resized by the pre-trade risk checks',
+                              lambda: self.risk_engine.resized_count, 'counter')
+        REGISTRY.callback('mt5_bridge_symbol_cache_hits_total', 'Symbol cache hits',
+                          lambda: self.symbol_cache.stats['spec_hits'] + self.symbol_cache.stats['tick_hits'], 'counter')
+        REGISTRY.callback('mt5_bridge_symbol_cache_misses_total', 'Symbol cache misses',
+                          lambda: self.symbol_cache.stats['spec_misses'] + self.symbol_cache.stats['tick_misses'], 'counter')
+        REGISTRY.callback('mt5_bridge_symbol_cache_terminal_calls_total', 'Terminal calls made by the symbol cache',
+                          lambda: self.symbol_cache.stats['terminal_calls'], 'counter')
 
     def initialize_mt5(self):
         """Initialize MT5 connection"""
@@ -64,6 +282,11 @@ class MT5Bridge:
             self.mt5_initialized = False
             return False
 
+        with timed('initialize'):
+            return self._connect_mt5()
+
+    def _connect_mt5(self):
+        """Connect and log in to the MT5 terminal"""
         try:
             # Try to initialize MT5 connection
             # Note: MT5 terminal must be running on the same system
@@ -84,6 +307,9 @@ class MT5Bridge:
             if account_info:
                 logger.info(f"MT5 connected successfully. Account: {account_info.login}, Balance: {account_info.balance}")
                 self.mt5_initialized = True
+                self.hedging_account = account_info.margin_mode == mt5.ACCOUNT_MARGIN_MODE_RETAIL_HEDGING
+                self.symbol_cache.invalidate()
+                self.symbol_cache.warm_up(self.warmup_symbols)
                 return True
             else:
                 logger.warning("MT5 login succeeded but account info not available")
@@ -110,6 +336,7 @@ class MT5Bridge:
                     'equity': account.equity,
                     'margin': account.margin,
                     'margin_free': account.margin_free,
+                    'margin_level': account.margin_level,
                     'profit': account.profit
                 }
             return None
@@ -117,23 +344,41 @@ class MT5Bridge:
             logger.error(f"Error getting account info: {str(e)}")
             return None
 
+    def symbol_label(self, symbol):
+        """Metric label for a symbol: its name once it resolves to a spec, else one shared placeholder"""
+        return symbol if self.symbol_cache.has_spec(symbol) else 'INVALID'
+
+    def check_risk(self, signal, symbol, lot_size, sl_percent, risk_percent=None):
+        """Pre-trade risk decision for a BUY/SELL, or None when no check applies"""
+        if signal == 'CLOSE' or not self.risk_engine.enabled:
+            return None
+        try:
+            risk_percent = float(risk_percent) if risk_percent is not None else None
+        except (TypeError, ValueError):
+            raise RiskRejected('risk_percent must be a number')
+        with timed('risk', symbol=self.symbol_label(symbol), signal=signal):
+            return self.risk_engine.check(signal, symbol, lot_size, sl_percent, risk_percent)
+
     def get_symbol_info(self, symbol):
         """Get symbol information"""
         if not self.mt5_initialized:
             return None
 
         try:
-            symbol_info = mt5.symbol_info(symbol)
-            if symbol_info:
+            with timed('price_fetch') as labels:
+                spec = self.symbol_cache.get_spec(symbol)
+                tick = self.symbol_cache.get_tick(symbol) if spec else None
+                labels['symbol'] = self.symbol_label(symbol)
+            if spec and tick:
                 return {
-                    'symbol': symbol_info.name,
-                    'bid': symbol_info.bid,
-                    'ask': symbol_info.ask,
-                    'spread': symbol_info.spread,
-                    'volume_min': symbol_info.volume_min,
-                    'volume_max': symbol_info.volume_max,
-                    'point': symbol_info.point,
-                    'digits': symbol_info.digits
+                    'symbol': spec['symbol'],
+                    'bid': tick['bid'],
+                    'ask': tick['ask'],
+                    'spread': int(round((tick['ask'] - tick['bid']) / spec['point'])) if spec['point'] else 0,
+                    'volume_min': spec['volume_min'],
+                    'volume_max': spec['volume_max'],
+                    'point': spec['point'],
+                    'digits': spec['digits']
                 }
             return None
         except Exception as e:
@@ -146,22 +391,24 @@ class MT5Bridge:
             return {'success': False, 'error': 'MT5 not initialized', 'mt5_status': 'disconnected'}
 
         try:
-            # Get current prices
-            symbol_info = mt5.symbol_info(symbol)
-            if not symbol_info:
-                return {'success': False, 'error': f'Symbol {symbol} not found'}
+            # Symbol is selected on first use, prices come from the tick cache
+            with timed('price_fetch', signal=direction.upper()) as labels:
+                spec = self.symbol_cache.get_spec(symbol)
+                tick = self.symbol_cache.get_tick(symbol) if spec else None
+                labels['symbol'] = self.symbol_label(symbol)
 
-            # Select symbol
-            if not mt5.symbol_select(symbol, True):
-                return {'success': False, 'error': f'Failed to select symbol {symbol}'}
+            if not spec:
+                return {'success': False, 'error': f'Symbol {symbol} not found'}
+            if not tick:
+                return {'success': False, 'error': f'No prices available for {symbol}'}
 
             # Determine order type
             if direction.upper() == 'BUY':
                 order_type = mt5.ORDER_TYPE_BUY
-                price = symbol_info.ask
+                price = tick['ask']
             elif direction.upper() == 'SELL':
                 order_type = mt5.ORDER_TYPE_SELL
-                price = symbol_info.bid
+                price = tick['bid']
             else:
                 return {'success': False, 'error': 'Invalid direction. Use BUY or SELL'}
 
@@ -174,34 +421,66 @@ class MT5Bridge:
                 "price": price,
                 "sl": sl_price,
                 "tp": tp_price,
-                "deviation": 10,
+                "deviation": self.order_sender.deviation,
                 "magic": self.magic_number,
                 "comment": comment,
                 "type_time": mt5.ORDER_TIME_GTC,
-                "type_filling": mt5.ORDER_FILLING_IOC,
+                "type_filling": self.order_sender.filling_type(symbol),
             }
 
             # Send order
-            result = mt5.order_send(request)
+            result, retries = self._send_order(request, symbol, direction.upper())
 
             if result.retcode == mt5.TRADE_RETCODE_DONE:
                 logger.info(f"Position opened successfully: {direction} {symbol} {lot_size} lots")
-                return {
+                response = {
                     'success': True,
                     'ticket': result.order,
                     'price': result.price,
-                    'volume': result.volume
+                    'volume': result.volume,
+                    'retcode': result.retcode
                 }
             else:
                 error_msg = f"Order failed: {result.retcode} - {mt5.last_error()}"
                 logger.error(error_msg)
-                return {'success': False, 'error': error_msg}
+                response = {'success': False, 'error': error_msg, 'retcode': result.retcode}
+            if retries:
+                response['retries'] = retries
+            return response
 
         except Exception as e:
             error_msg = f"Error opening position: {str(e)}"
             logger.error(error_msg)
             return {'success': False, 'error': error_msg}
 
+    def journal_order(self, order_id, state, wait=False, **fields):
+        """Append an order lifecycle record to the trade journal, when enabled"""
+        if self.trade_journal and order_id:
+            self.trade_journal.append(order_id, state, wait=wait, **fields)
+
+    def _send_order(self, request, symbol, signal):
+        """Send an order request, recording its latency and retcode; returns the result and retry count"""
+        order_id = self.executor.current_order_id
+        leg = self.executor.next_leg() if order_id else None
+        if self.trade_journal and order_id:
+            # The tag lets a restart find this leg's deal if the reply below is lost
+            request = dict(request, comment=f"{request.get('comment', '')[:22]}-{journal_tag(order_id, leg)}")
+            self.journal_order(order_id, STATE_SUBMITTED, wait=True, leg=leg, request=request)
+
+        result, retries = self.order_sender.send(request, symbol, signal)
+        if result is None or result.retcode == getattr(mt5, 'TRADE_RETCODE_CONNECTION', 10031):
+            self.supervisor.report_failure(f"order_send: {mt5.last_error()}")
+        if result:
+            self.journal_order(order_id, STATE_SENT, leg=leg, retcode=result.retcode, order=result.order,
+                               deal=result.deal, price=result.price, volume=result.volume, retries=retries)
+        else:
+            self.journal_order(order_id, STATE_SENT, leg=leg, retcode=None, error=str(mt5.last_error()))
+        if result:
+            # Pick up the new deal and position without waiting for the next poll
+            self.deals_syncer.wake()
+            self.state_mirror.wake()
+        return result, retries
+
     def close_position(self, ticket, symbol, lot_size=None):
         """Close a trading position"""
         if not self.mt5_initialized:
@@ -215,13 +494,17 @@ class MT5Bridge:
 
             position = position[0]
 
+            tick = self.symbol_cache.get_tick(symbol)
+            if not tick:
+                return {'success': False, 'error': f'No prices available for {symbol}'}
+
             # Determine close type
             if position.type == mt5.POSITION_TYPE_BUY:
                 order_type = mt5.ORDER_TYPE_SELL
-                price = mt5.symbol_info(symbol).bid
+                price = tick['bid']
             else:
                 order_type = mt5.ORDER_TYPE_BUY
-                price = mt5.symbol_info(symbol).ask
+                price = tick['ask']
 
             # Use position volume if not specified
             if lot_size is None:
@@ -235,23 +518,26 @@ class MT5Bridge:
                 "type": order_type,
                 "position": ticket,
                 "price": price,
-                "deviation": 10,
+                "deviation": self.order_sender.deviation,
                 "magic": self.magic_number,
                 "comment": "Close position",
                 "type_time": mt5.ORDER_TIME_GTC,
-                "type_filling": mt5.ORDER_FILLING_IOC,
+                "type_filling": self.order_sender.filling_type(symbol),
             }
 
             # Send order
-            result = mt5.order_send(request)
+            result, retries = self._send_order(request, symbol, 'CLOSE')
 
             if result.retcode == mt5.TRADE_RETCODE_DONE:
                 logger.info(f"Position closed successfully: {ticket}")
-                return {'success': True, 'ticket': result.order}
+                response = {'success': True, 'ticket': result.order, 'retcode': result.retcode}
             else:
                 error_msg = f"Close order failed: {result.retcode} - {mt5.last_error()}"
                 logger.error(error_msg)
-                return {'success': False, 'error': error_msg}
+                response = {'success': False, 'error': error_msg, 'retcode': result.retcode}
+            if retries:
+                response['retries'] = retries
+            return response
 
         except Exception as e:
             error_msg = f"Error closing position: {str(e)}"
@@ -287,52 +573,46 @@ class MT5Bridge:
             logger.error(f"Error getting positions: {str(e)}")
             return []
 
-# Global MT5 bridge instance
-mt5_bridge = MT5Bridge()
-
-@app.route('/health', methods=['GET'])
-def health_check():
-    """Health check endpoint"""
-    # Service is healthy if Flask is running, regardless of MT5 status
-    # MT5 connectivity is checked separately
-    return jsonify({
-        'status': 'healthy',
-        'service': 'MT5 Bridge API',
-        'mt5_connected': mt5_bridge.mt5_initialized,
-        'mt5_available': MT5_AVAILABLE,
-        'timestamp': datetime.now(timezone.utc).isoformat()
-    }), 200
+    def get_orders(self):
+        """Get pending orders"""
+        if not self.mt5_initialized:
+            return []
 
-@app.route('/webhook/tradingview', methods=['POST'])
-def tradingview_webhook():
-    """Receive trading signals from TradingView via n8n"""
-    try:
-        data = request.get_json()
-        if not data:
-            return jsonify({'success': False, 'error': 'No data received'}), 400
+        try:
+            orders = mt5.orders_get()
+            if orders:
+                return [{
+                    'ticket': order.ticket,
+                    'symbol': order.symbol,
+                    'type': order.type,
+                    'volume': order.volume_current,
+                    'price_open': order.price_open,
+                    'sl': order.sl,
+                    'tp': order.tp
+                } for order in orders]
+            return []
 
-        logger.info(f"Received TradingView signal: {json.dumps(data)}")
+        except Exception as e:
+            logger.error(f"Error getting orders: {str(e)}")
+            return []
 
-        # Extract signal data
-        signal = data.get('signal', '').upper()
-        symbol = data.get('symbol', mt5_bridge.symbol).upper()
-        lot_size = float(data.get('lot_size', mt5_bridge.lot_size))
-        sl_percent = float(data.get('sl_percent', 1.0))
-        tp_percent = float(data.get('tp_percent', 2.0))
+    def close_positions(self, symbol=None):
+        """Close all positions for a symbol, or every symbol when none is given"""
+        if not self.mt5_initialized:
+            return {'success': False, 'error': 'MT5 not initialized'}
 
-        # Validate signal
-        if signal not in ['BUY', 'SELL', 'CLOSE']:
-            return jsonify({'success': False, 'error': 'Invalid signal. Use BUY, SELL, or CLOSE'}), 400
+        positions = mt5.positions_get(symbol=symbol) if symbol else mt5.positions_get()
+        return self.bulk_closer.close(positions, allow_close_by=self.hedging_account)
 
-        # Execute signal
+    def execute_signal(self, signal, symbol, lot_size, sl_percent, tp_percent):
+        """Execute a validated BUY, SELL or CLOSE signal"""
         if signal in ['BUY', 'SELL']:
             # Calculate SL and TP prices
-            symbol_info = mt5_bridge.get_symbol_info(symbol)
+            symbol_info = self.get_symbol_info(symbol)
             if not symbol_info:
-                return jsonify({'success': False, 'error': f'Symbol {symbol} not available'}), 400
+                raise SignalRejected(f'Symbol {symbol} not available')
 
             current_price = symbol_info['ask'] if signal == 'BUY' else symbol_info['bid']
-            point = symbol_info['point']
 
             if signal == 'BUY':
                 sl_price = current_price * (1 - sl_percent / 100)
@@ -342,7 +622,7 @@ def tradingview_webhook():
                 tp_price = current_price * (1 - tp_percent / 100)
 
             # Open position
-            result = mt5_bridge.open_position(
+            return self.open_position(
                 direction=signal,
                 symbol=symbol,
                 lot_size=lot_size,
@@ -351,39 +631,659 @@ def tradingview_webhook():
                 comment=f"TV-{signal}"
             )
 
-        elif signal == 'CLOSE':
-            # Close all positions for the symbol
-            positions = mt5_bridge.get_positions(symbol)
-            closed_positions = []
-
-            for pos in positions:
-                if pos['type'].upper() == 'BUY':
-                    close_signal = 'SELL'
-                else:
-                    close_signal = 'BUY'
-
-                close_result = mt5_bridge.close_position(
-                    ticket=pos['ticket'],
-                    symbol=symbol,
-                    lot_size=pos['volume']
-                )
-
-                if close_result['success']:
-                    closed_positions.append(pos['ticket'])
-
-            result = {
-                'success': True,
-                'message': f'Closed {len(closed_positions)} positions',
-                'closed_tickets': closed_positions
-            }
+        # Close all positions for the symbol
+        return self.close_positions(symbol)
 
+    def prefetch_symbols(self, symbols):
+        """Load specs and ticks for every symbol of a batch, rejecting it if any is unavailable"""
+        if not self.mt5_initialized:
+            return
+        with timed('price_fetch', signal='BATCH'):
+            missing = [symbol for symbol in symbols if not self.symbol_cache.get_spec(symbol)]
+            if missing:
+                raise SignalRejected(f"Symbols not available: {', '.join(missing)}")
+            for symbol in symbols:
+                self.symbol_cache.get_tick(symbol)
+
+    def execute_leg(self, deadline, signal, symbol, lot_size, sl_percent, tp_percent):
+        """Execute one leg of a batch unless the batch deadline has passed"""
+        if time.monotonic() > deadline:
+            raise DeadlineExceeded('Batch deadline passed before this leg was sent')
+        return self.execute_signal(signal, symbol, lot_size, sl_percent, tp_percent)
+
+# Process-wide MT5 bridge instance, created by create_app()
+mt5_bridge = None
+
+def snapshot_response(snapshot, body, status=200, account=False):
+    """Serve a pre-serialized snapshot body with ETag support
+
+    Positions and orders get a weak ETag on the snapshot version, which ignores moving prices
+    and floating profit. The account's ETag changes with any of its fields.
+    """
+    etag = f'{snapshot.version}-{snapshot.account_version}' if account else str(snapshot.version)
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        response = Response(body, status=status, mimetype='application/json')
+    response.set_etag(etag, weak=not account)
+    response.headers['X-Snapshot-Version'] = str(snapshot.version)
+    return response
+
+def record_signal_outcome(fingerprint, order_id, future):
+    """Store the execution outcome of a signal for later duplicates"""
+    if isinstance(future.exception(), DeadlineExceeded):
+        # Never reached the terminal, so a retry of the signal may execute
+        mt5_bridge.idempotency.release(fingerprint)
+        return
+    try:
+        record = {'status': 'done', 'order_id': order_id, 'result': future.result()}
+    except Exception as e:
+        record = {'status': 'failed', 'order_id': order_id, 'error': str(e)}
+    mt5_bridge.idempotency.update(fingerprint, record)
+
+def audit_order_result(order_id, future):
+    """Record the outcome of a queued order on the audit stream"""
+    try:
+        result = future.result()
+    except Exception as e:
+        result = {'success': False, 'error': str(e)}
+    audit('order_result', order_id=order_id, **result)
+    mt5_bridge.journal_order(order_id, STATE_RESULT, **result)
+
+def duplicate_result(record):
+    """The original execution outcome of a retried signal"""
+    if record.get('status') == 'done':
+        return dict(record['result'], order_id=record['order_id'], duplicate=True)
+    if record.get('status') == 'failed':
+        return {'success': False, 'error': record['error'], 'order_id': record['order_id'], 'duplicate': True}
+    return {
+        'success': True,
+        'status': 'accepted',
+        'order_id': record.get('order_id'),
+        'status_url': f"/orders/{record.get('order_id')}",
+        'duplicate': True
+    }
+
+def duplicate_response(record):
+    """Answer a retried signal with the original execution outcome"""
+    result = duplicate_result(record)
+    if record.get('status') == 'done':
         return jsonify(result), 200 if result['success'] else 500
+    return jsonify(result), 400 if record.get('status') == 'failed' else 202
+
+def route_signal(data, signal, symbol, lot_size, sl_percent, tp_percent, on_done=None):
+    """Execute a validated signal on every matching account worker and aggregate the results"""
+    workers = mt5_bridge.account_pool.route(symbol, data.get('accounts'))
+    if not workers:
+        return jsonify({'success': False, 'error': f'No account configured for {symbol}'}), 400
+
+    # Workers deduplicate and journal on their own, under their own idempotency prefix, and
+    # apply their own LOT_SIZE and SL/TP defaults to whatever the signal left out
+    payload = {key: value for key, value in data.items() if key != 'accounts'}
+    payload.update(signal=signal, symbol=symbol)
+    params = {'async': request.args['async']} if 'async' in request.args else None
+
+    audit('signal_routed', signal=signal, symbol=symbol, accounts=[w.name for w in workers])
+    result = mt5_bridge.account_pool.dispatch(workers, payload, params)
+    audit('routed_result', signal=signal, symbol=symbol, success=result['success'], latency_ms=result['latency_ms'],
+          accounts={r['account']: r['success'] for r in result['results']})
+
+    if on_done:
+        future = Future()
+        future.set_result(result)
+        on_done(None, future)
+    return routed_response(result)
+
+def routed_response(result):
+    """200 when every account succeeded, 207 when some did, 502 when none did"""
+    # Order ids belong to a worker, so status URLs go back through the router with its account
+    for routed in result['results']:
+        body = routed['result'] if isinstance(routed['result'], dict) else {}
+        for item in [body] + [r for r in body.get('results') or [] if isinstance(r, dict)]:
+            if item.get('status_url'):
+                item['status_url'] = f"{item['status_url']}?account={routed['account']}"
+    if result['success']:
+        return jsonify(result), 200
+    return jsonify(result), 207 if result['accounts_ok'] else 502
+
+def risk_summary(decision):
+    """Public part of a risk decision, reported when the lot size was changed"""
+    return {k: v for k, v in decision.items() if k != 'hold'}
+
+def submit_signal(data, signal, symbol, lot_size, sl_percent, tp_percent, on_done=None):
+    """Deduplicate, queue and (unless accepted asynchronously) await a validated signal"""
+    if mt5_bridge.account_pool:
+        return route_signal(data, signal, symbol, lot_size, sl_percent, tp_percent, on_done)
+    try:
+        mt5_bridge.supervisor.guard()
+    except CircuitOpenError as e:
+        return handle_circuit_open(e)
+
+    # Retries of an already received signal get the original outcome
+    fingerprint = mt5_bridge.idempotency.fingerprint(signal, symbol, data)
+    if fingerprint:
+        existing = mt5_bridge.idempotency.reserve(fingerprint)
+        if existing:
+            return duplicate_response(existing)
+
+    decision = None
+
+    def abandon():
+        """Nothing was queued, so a retry of the signal may execute"""
+        if fingerprint:
+            mt5_bridge.idempotency.release(fingerprint)
+        if decision:
+            mt5_bridge.risk_engine.release(decision)
+
+    try:
+        decision = mt5_bridge.check_risk(signal, symbol, lot_size, sl_percent, data.get('risk_percent'))
+        if decision:
+            lot_size = decision['lot_size']
+
+        # Durable before it is queued or acknowledged, and always ahead of the SUBMITTED record
+        order_id = mt5_bridge.executor.new_order_id()
+        mt5_bridge.journal_order(order_id, STATE_RECEIVED, wait=True, signal=signal, symbol=symbol,
+                                 lot_size=lot_size, sl_percent=sl_percent, tp_percent=tp_percent,
+                                 fingerprint=fingerprint)
+
+        # Execute signal on the MT5 thread, closes ahead of opens
+        priority = PRIORITY_CLOSE if signal == 'CLOSE' else PRIORITY_OPEN
+        try:
+            order_id, future = mt5_bridge.executor.submit_order(
+                mt5_bridge.execute_signal, signal, symbol, lot_size, sl_percent, tp_percent,
+                priority=priority, order_id=order_id
+            )
+        except QueueFullError as e:
+            mt5_bridge.journal_order(order_id, STATE_RESULT, success=False, error=str(e))
+            raise
+    except RiskRejected as e:
+        logger.warning(f"Risk check rejected {signal} {symbol}: {str(e)}")
+        audit('signal_rejected', signal=signal, symbol=symbol, error=str(e), risk=e.details)
+        abandon()
+        return jsonify({'success': False, 'error': str(e), 'risk': e.details}), 400
+    except QueueFullError as e:
+        logger.warning(f"Rejected {signal} {symbol}: {str(e)}")
+        audit('signal_rejected', signal=signal, symbol=symbol, error=str(e))
+        abandon()
+        return jsonify({'success': False, 'error': str(e)}), 503
+    except Exception:
+        abandon()
+        raise
+    adjusted = decision and decision['lot_size'] != decision['requested_lot_size']
+
+    if decision:
+        future.add_done_callback(lambda f: mt5_bridge.risk_engine.release(decision))
+    audit('order_submitted', order_id=order_id, signal=signal, symbol=symbol, lot_size=lot_size,
+          sl_percent=sl_percent, tp_percent=tp_percent, **({'risk': risk_summary(decision)} if adjusted else {}))
+    future.add_done_callback(lambda f: audit_order_result(order_id, f))
+    if fingerprint:
+        mt5_bridge.idempotency.update(fingerprint, {'status': 'pending', 'order_id': order_id})
+        future.add_done_callback(
+            lambda f: record_signal_outcome(fingerprint, order_id, f)
+        )
+    if on_done:
+        future.add_done_callback(lambda f: on_done(order_id, f))
+
+    accept_then_execute = request.args.get('async', str(mt5_bridge.accept_then_execute)).lower() in ['1', 'true']
+    if accept_then_execute:
+        response = {
+            'success': True,
+            'status': 'accepted',
+            'order_id': order_id,
+            'status_url': f'/orders/{order_id}'
+        }
+        if adjusted:
+            response['risk'] = risk_summary(decision)
+        return jsonify(response), 202
+
+    try:
+        result = future.result(timeout=mt5_bridge.execution_timeout)
+    except SignalRejected as e:
+        return jsonify({'success': False, 'error': str(e), 'order_id': order_id}), 400
+    except FutureTimeoutError:
+        return jsonify({
+            'success': False,
+            'error': f'Execution did not finish within {mt5_bridge.execution_timeout}s',
+            'order_id': order_id,
+            'status_url': f'/orders/{order_id}'
+        }), 504
+
+    result['order_id'] = order_id
+    if adjusted:
+        result['risk'] = risk_summary(decision)
+    with timed('serialization', symbol=mt5_bridge.symbol_label(symbol), signal=signal):
+        response = jsonify(result)
+    return response, 200 if result['success'] else 500
+
+def batch_response(results, start):
+    """Aggregate per-leg results: 200 when every leg succeeded, 207 when some did"""
+    succeeded = sum(1 for r in results if r.get('success'))
+    body = {
+        'success': succeeded == len(results),
+        'legs_ok': succeeded,
+        'legs_failed': len(results) - succeeded,
+        'latency_ms': round((time.monotonic() - start) * 1000, 2),
+        'results': results
+    }
+    if any(r.get('status') == 'pending' for r in results):
+        return jsonify(body), 504
+    if body['success']:
+        return jsonify(body), 200
+    return jsonify(body), 207 if succeeded else 500
+
+def route_batch(legs, deadline, start):
+    """Send each account worker the legs routed to it, in parallel"""
+    jobs = {}
+    for index, leg, parsed in legs:
+        workers = mt5_bridge.account_pool.route(parsed['symbol'], leg.get('accounts'))
+        if not workers:
+            return jsonify({'success': False, 'error': f"No account configured for {parsed['symbol']}",
+                            'index': index}), 400
+        payload = {key: value for key, value in leg.items() if key != 'accounts'}
+        payload.update(signal=parsed['signal'], symbol=parsed['symbol'])
+        for worker in workers:
+            jobs.setdefault(worker, []).append(payload)
+
+    remaining_ms = max(0.0, (deadline - time.monotonic()) * 1000)
+    params = {'async': request.args['async']} if 'async' in request.args else None
+    audit('signal_routed', signal='BATCH', legs=len(legs), accounts=[w.name for w in jobs])
+    result = mt5_bridge.account_pool.dispatch_each(
+        [(worker, {'signals': payloads, 'deadline_ms': remaining_ms}) for worker, payloads in jobs.items()],
+        params, path='/webhook/batch'
+    )
+    audit('routed_result', signal='BATCH', success=result['success'], latency_ms=result['latency_ms'],
+          accounts={r['account']: r['success'] for r in result['results']})
+    return routed_response(result)
+
+def submit_batch(legs, deadline, start):
+    """Queue the legs of a batch as one execution task and await their results"""
+    results = {}
+    queued = []
+    for index, leg, parsed in legs:
+        fingerprint = mt5_bridge.idempotency.fingerprint(parsed['signal'], parsed['symbol'], leg)
+        if fingerprint:
+            existing = mt5_bridge.idempotency.reserve(fingerprint)
+            if existing:
+                results[index] = dict(duplicate_result(existing), index=index, signal=parsed['signal'],
+                                      symbol=parsed['symbol'])
+                continue
+        queued.append((index, dict(parsed, risk_percent=leg.get('risk_percent')), fingerprint))
+
+    # Closes run first and free margin for the opens
+    queued.sort(key=lambda q: q[1]['signal'] != 'CLOSE')
+
+    # Each approved leg holds its volume and margin, so later legs are checked against it
+    decisions = {}
+    order_ids = []
+
+    def abandon():
+        """Nothing was queued, so a retry of any leg may execute"""
+        for index, _, fingerprint in queued:
+            if fingerprint:
+                mt5_bridge.idempotency.release(fingerprint)
+            if index in decisions:
+                mt5_bridge.risk_engine.release(decisions[index])
+
+    try:
+        for index, parsed, fingerprint in list(queued):
+            try:
+                decision = mt5_bridge.check_risk(parsed['signal'], parsed['symbol'], parsed['lot_size'],
+                                                 parsed['sl_percent'], parsed['risk_percent'])
+            except RiskRejected as e:
+                audit('signal_rejected', signal=parsed['signal'], symbol=parsed['symbol'], batch_index=index,
+                      error=str(e), risk=e.details)
+                if fingerprint:
+                    mt5_bridge.idempotency.release(fingerprint)
+                results[index] = {'index': index, 'signal': parsed['signal'], 'symbol': parsed['symbol'],
+                                  'success': False, 'error': str(e), 'risk': e.details}
+                queued.remove((index, parsed, fingerprint))
+                continue
+            if decision:
+                decisions[index] = decision
+                if decision['lot_size'] != decision['requested_lot_size']:
+                    parsed['risk'] = risk_summary(decision)
+                parsed['lot_size'] = decision['lot_size']
+
+        priority = PRIORITY_CLOSE if all(q[1]['signal'] == 'CLOSE' for q in queued) else PRIORITY_OPEN
+        symbols = sorted({q[1]['symbol'] for q in queued})
+
+        # Every leg is durable before the batch is queued; waiting on the last covers the others
+        for position, (index, parsed, fingerprint) in enumerate(queued):
+            order_ids.append(mt5_bridge.executor.new_order_id())
+            fields = {k: parsed[k] for k in ('signal', 'symbol', 'lot_size', 'sl_percent', 'tp_percent')}
+            mt5_bridge.journal_order(order_ids[-1], STATE_RECEIVED, wait=position == len(queued) - 1,
+                                     fingerprint=fingerprint, batch_index=index, **fields)
+        submitted = mt5_bridge.executor.submit_orders(
+            [(mt5_bridge.execute_leg, (deadline, p['signal'], p['symbol'], p['lot_size'], p['sl_percent'], p['tp_percent']))
+             for _, p, _ in queued],
+            priority=priority,
+            before=lambda: mt5_bridge.prefetch_symbols(symbols),
+            order_ids=order_ids
+        ) if queued else []
+    except QueueFullError as e:
+        logger.warning(f"Rejected batch of {len(queued)} signals: {str(e)}")
+        audit('signal_rejected', signal='BATCH', legs=len(queued), error=str(e))
+        for order_id in order_ids:
+            mt5_bridge.journal_order(order_id, STATE_RESULT, success=False, error=str(e))
+        abandon()
+        return jsonify({'success': False, 'error': str(e)}), 503
+    except Exception:
+        abandon()
+        raise
+
+    for (index, parsed, fingerprint), (order_id, future) in zip(queued, submitted):
+        fields = {k: parsed[k] for k in ('signal', 'symbol', 'lot_size', 'sl_percent', 'tp_percent')}
+        if 'risk' in parsed:
+            fields['risk'] = parsed['risk']
+        audit('order_submitted', order_id=order_id, batch_index=index, **fields)
+        if index in decisions:
+            future.add_done_callback(lambda f, d=decisions[index]: mt5_bridge.risk_engine.release(d))
+        future.add_done_callback(lambda f, o=order_id: audit_order_result(o, f))
+        if fingerprint:
+            mt5_bridge.idempotency.update(fingerprint, {'status': 'pending', 'order_id': order_id})
+            future.add_done_callback(lambda f, fp=fingerprint, o=order_id: record_signal_outcome(fp, o, f))
+
+    accept_then_execute = request.args.get('async', str(mt5_bridge.accept_then_execute)).lower() in ['1', 'true']
+    if accept_then_execute:
+        for (index, parsed, _), (order_id, _) in zip(queued, submitted):
+            results[index] = {'index': index, 'signal': parsed['signal'], 'symbol': parsed['symbol'],
+                              'success': True, 'status': 'accepted', 'order_id': order_id,
+                              'status_url': f'/orders/{order_id}'}
+            if 'risk' in parsed:
+                results[index]['risk'] = parsed['risk']
+        return jsonify({'success': True, 'status': 'accepted',
+                        'results': [results[i] for i in sorted(results)]}), 202
+
+    wait_futures([future for _, future in submitted], timeout=mt5_bridge.execution_timeout)
+    errors = [future.exception() for _, future in submitted if future.done()]
+    if len(errors) == len(submitted) and errors and isinstance(errors[0], SignalRejected) \
+            and all(e is errors[0] for e in errors):
+        # Rejected as a whole while prefetching, before any leg was sent
+        return jsonify({'success': False, 'error': str(errors[0]),
+                        'order_ids': [order_id for order_id, _ in submitted]}), 400
+    for (index, parsed, _), (order_id, future) in zip(queued, submitted):
+        leg = {'index': index, 'signal': parsed['signal'], 'symbol': parsed['symbol'], 'order_id': order_id}
+        if 'risk' in parsed:
+            leg['risk'] = parsed['risk']
+        if not future.done():
+            leg.update(success=False, status='pending', status_url=f'/orders/{order_id}',
+                       error=f'Execution did not finish within {mt5_bridge.execution_timeout}s')
+        elif future.exception():
+            leg.update(success=False, error=str(future.exception()))
+        else:
+            leg.update(future.result())
+        results[index] = leg
+
+    with timed('serialization', signal='BATCH'):
+        return batch_response([results[i] for i in sorted(results)], start)
+
+def observe_signal(endpoint):
+    """Record end-to-end webhook latency by signal and response status"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            response = func(*args, **kwargs)
+            status = response[1] if isinstance(response, tuple) else response.status_code
+            SIGNAL_SECONDS.observe(time.perf_counter() - start, endpoint=endpoint,
+                                   signal=g.get('signal', ''), status=status)
+            return response
+        return wrapper
+    return decorator
+
+@bridge_api.app_errorhandler(QueueFullError)
+def handle_queue_full(e):
+    """Reject requests while the execution queue is saturated"""
+    return jsonify({'success': False, 'error': str(e)}), 503
+
+@bridge_api.app_errorhandler(CircuitOpenError)
+def handle_circuit_open(e):
+    """Refuse orders immediately while the terminal is disconnected"""
+    return jsonify({'success': False, 'error': str(e), 'mt5_status': 'disconnected'}), 503
+
+@bridge_api.app_errorhandler(FutureTimeoutError)
+def handle_execution_timeout(e):
+    """Fail requests whose terminal call did not finish in time"""
+    return jsonify({'success': False, 'error': f'Execution did not finish within {mt5_bridge.execution_timeout}s'}), 504
+
+@bridge_api.route('/health', methods=['GET'])
+def health_check():
+    """Health check endpoint"""
+    # Service is healthy if Flask is running, regardless of MT5 status
+    # MT5 connectivity is checked separately
+    return jsonify({
+        'status': 'healthy',
+        'service': 'MT5 Bridge API',
+        'mt5_connected': mt5_bridge.mt5_initialized,
+        'mt5_available': MT5_AVAILABLE,
+        'mt5_backend': MT5_BACKEND,
+        'connection': mt5_bridge.supervisor.get_stats() if mt5_bridge.supervisor else None,
+        'execution': mt5_bridge.executor.get_stats(),
+        'symbol_cache': mt5_bridge.symbol_cache.get_stats(),
+        'state_mirror': mt5_bridge.state_mirror.get_stats() if mt5_bridge.state_mirror else None,
+        'stream': mt5_bridge.stream_hub.get_stats() if mt5_bridge.stream_hub else None,
+        'risk': mt5_bridge.risk_engine.get_stats() if mt5_bridge.risk_engine else None,
+        'order_sender': mt5_bridge.order_sender.get_stats(),
+        'idempotency': mt5_bridge.idempotency.get_stats(),
+        'notifier': mt5_bridge.notifier.get_stats(),
+        'signal_engine': mt5_bridge.signal_engine.get_stats() if mt5_bridge.signal_engine else None,
+        'history_sync': mt5_bridge.history_syncer.get_stats() if mt5_bridge.history_syncer else None,
+        'deals_journal': mt5_bridge.deals_syncer.get_stats() if mt5_bridge.deals_syncer else None,
+        'logging': log_pipeline.get_stats(),
+        'accounts': mt5_bridge.account_pool.get_stats() if mt5_bridge.account_pool else None,
+        'trade_journal': dict(mt5_bridge.trade_journal.get_stats(), reconciled=mt5_bridge.reconciler.reconciled_count)
+                         if mt5_bridge.trade_journal else {'enabled': False},
+        'timestamp': datetime.now(timezone.utc).isoformat()
+    }), 200
+
+@bridge_api.route('/status', methods=['GET'])
+def get_status():
+    """Health, account, positions and queue stats in one response, for monitors"""
+    if mt5_bridge.account_pool:
+        return routed_status()
+    snapshot = mt5_bridge.state_mirror.get_snapshot()
+    if snapshot:
+        account, positions, orders = snapshot.account, snapshot.positions, snapshot.orders
+    else:
+        account, positions, orders = mt5_bridge.executor.call(
+            lambda: (mt5_bridge.get_account_info(), mt5_bridge.get_positions(), mt5_bridge.get_orders()),
+            timeout=mt5_bridge.execution_timeout
+        )
+
+    by_symbol = {}
+    for position in positions:
+        by_symbol[position['symbol']] = by_symbol.get(position['symbol'], 0) + 1
+
+    return jsonify({
+        'status': 'healthy',
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'mt5_connected': mt5_bridge.mt5_initialized,
+        'mt5_backend': MT5_BACKEND,
+        'connection': mt5_bridge.supervisor.get_stats(),
+        'account': account,
+        'positions': {
+            'count': len(positions),
+            'volume': round(sum(p['volume'] for p in positions), 8),
+            'profit': round(sum(p['profit'] for p in positions), 2),
+            'by_symbol': by_symbol
+        },
+        'orders': {'count': len(orders)},
+        'snapshot': {'version': snapshot.version, 'updated_at': snapshot.updated_at} if snapshot else None,
+        'execution': mt5_bridge.executor.get_stats(),
+        'notifier': mt5_bridge.notifier.get_stats(),
+        'logging': log_pipeline.get_stats(),
+        'trade_journal': mt5_bridge.trade_journal.get_stats() if mt5_bridge.trade_journal else {'enabled': False},
+        'accounts': mt5_bridge.account_pool.get_stats() if mt5_bridge.account_pool else None
+    }), 200
+
+def forward_to_account(name, path):
+    """Pass the current read request through to one account worker"""
+    worker = mt5_bridge.account_pool.worker(name)
+    if not worker:
+        return jsonify({'error': f'Unknown account {name}'}), 404
+    params = {key: value for key, value in request.args.items() if key != 'account'}
+    try:
+        upstream = worker.forward('GET', path, params)
+    except Exception as e:
+        return jsonify({'error': f'Account {worker.name} unreachable: {str(e)}'}), 503
+    return Response(stream_with_context(upstream.iter_content(chunk_size=None)), status=upstream.status_code,
+                    content_type=upstream.headers.get('Content-Type'))
+
+def routed_status():
+    """Router /status: every worker's status, with positions summed across accounts"""
+    routed = mt5_bridge.account_pool.broadcast('/status')
+    statuses = {r['account']: r['result'] for r in routed['results']}
+    positions = [s.get('positions') or {} for s in statuses.values()]
+    by_symbol = {}
+    for summary in positions:
+        for symbol, count in (summary.get('by_symbol') or {}).items():
+            by_symbol[symbol] = by_symbol.get(symbol, 0) + count
+
+    return jsonify({
+        'status': 'healthy' if all(s.get('status') == 'healthy' for s in statuses.values()) else 'degraded',
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'mt5_connected': all(s.get('mt5_connected') for s in statuses.values()),
+        'mt5_backend': MT5_BACKEND,
+        'connection': None,
+        'account': None,
+        'positions': {
+            'count': sum(p.get('count', 0) for p in positions),
+            'volume': round(sum(p.get('volume', 0) for p in positions), 8),
+            'profit': round(sum(p.get('profit', 0) for p in positions), 2),
+            'by_symbol': by_symbol
+        },
+        'orders': {'count': sum((s.get('orders') or {}).get('count', 0) for s in statuses.values())},
+        'snapshot': None,
+        'execution': mt5_bridge.executor.get_stats(),
+        'notifier': mt5_bridge.notifier.get_stats(),
+        'logging': log_pipeline.get_stats(),
+        'trade_journal': {'enabled': False},
+        'accounts': {name: dict(stats, status=statuses.get(name)) for name, stats in mt5_bridge.account_pool.get_stats().items()}
+    }), 200
+
+@bridge_api.route('/webhook/tradingview', methods=['POST'])
+@observe_signal('tradingview')
+def tradingview_webhook():
+    """Receive trading signals from TradingView via n8n"""
+    try:
+        with timed('parse'):
+            data = request.get_json()
+        if not data:
+            return jsonify({'success': False, 'error': 'No data received'}), 400
+
+        audit('signal_received', source='tradingview', payload=redact(data))
+
+        # Extract signal data
+        with timed('validation') as labels:
+            signal = data.get('signal', '').upper()
+            symbol = data.get('symbol', mt5_bridge.symbol).upper()
+            # Only symbols the terminal knows get their own series, anything else shares one
+            labels['symbol'] = mt5_bridge.symbol_label(symbol)
+            # Unknown signals share one label so they cannot blow up series cardinality
+            labels['signal'] = g.signal = signal if signal in ['BUY', 'SELL', 'CLOSE'] else 'INVALID'
+            lot_size = float(data.get('lot_size', mt5_bridge.lot_size))
+            sl_percent = float(data.get('sl_percent', 1.0))
+            tp_percent = float(data.get('tp_percent', 2.0))
+
+        # Validate signal
+        if signal not in ['BUY', 'SELL', 'CLOSE']:
+            return jsonify({'success': False, 'error': 'Invalid signal. Use BUY, SELL, or CLOSE'}), 400
+
+        return submit_signal(data, signal, symbol, lot_size, sl_percent, tp_percent)
 
     except Exception as e:
         logger.error(f"Error processing webhook: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
-@app.route('/webhook/tradingview', methods=['GET'])
+@bridge_api.route('/webhook/direct', methods=['POST'])
+@observe_signal('direct')
+def direct_webhook():
+    """Receive trading signals straight from TradingView, without n8n"""
+    if not mt5_bridge.webhook_secret:
+        return jsonify({'success': False, 'error': 'Direct ingestion disabled, set WEBHOOK_SECRET'}), 503
+
+    try:
+        # TradingView posts text/plain unless the alert message is valid JSON
+        with timed('parse'):
+            data = decode_alert(request.get_data(as_text=True))
+
+        if not verify_secret(mt5_bridge.webhook_secret, data,
+                             header_value=request.headers.get('X-Webhook-Secret'),
+                             query_value=request.args.get('token')):
+            logger.warning(f"Rejected direct signal with invalid secret from {request.remote_addr}")
+            return jsonify({'success': False, 'error': 'Invalid secret'}), 401
+
+        data = redact(data)
+        with timed('validation') as labels:
+            parsed = parse_signal(data, mt5_bridge.symbol, mt5_bridge.lot_size)
+            labels.update(symbol=mt5_bridge.symbol_label(parsed['symbol']), signal=parsed['signal'])
+            g.signal = parsed['signal']
+    except SignalValidationError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    audit('signal_received', source='direct', payload=data)
+    received_at = datetime.now(timezone.utc).isoformat()
+
+    def notify_n8n(order_id, future):
+        try:
+            result = future.result()
+        except Exception as e:
+            result = {'success': False, 'error': str(e)}
+        mt5_bridge.notifier.notify(dict(parsed, order_id=order_id, received_at=received_at, mt5_response=result))
+
+    return submit_signal(data, parsed['signal'], parsed['symbol'], parsed['lot_size'],
+                         parsed['sl_percent'], parsed['tp_percent'], on_done=notify_n8n)
+
+@bridge_api.route('/webhook/batch', methods=['POST'])
+@observe_signal('batch')
+def batch_webhook():
+    """Execute a basket of BUY/SELL/CLOSE signals back to back under one deadline
+
+    {"signals": [{"signal": "BUY", "symbol": "EURUSD", "lot_size": 0.1}, ...], "deadline_ms": 5000}
+    Other top-level fields (sl_percent, client_id, strategy_time, ...) are defaults for every leg.
+    """
+    start = time.monotonic()
+    g.signal = 'BATCH'
+    with timed('parse'):
+        data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not isinstance(data.get('signals'), list) or not data['signals']:
+        return jsonify({'success': False, 'error': 'Expected {"signals": [...]} with at least one signal'}), 400
+    if len(data['signals']) > mt5_bridge.batch_max_signals:
+        return jsonify({'success': False,
+                        'error': f"At most {mt5_bridge.batch_max_signals} signals per batch"}), 400
+
+    audit('signal_received', source='batch', payload=redact(data))
+
+    # Every leg is validated before anything is queued
+    with timed('validation', signal='BATCH'):
+        defaults = {key: value for key, value in data.items() if key not in ('signals', 'deadline_ms')}
+        legs, errors = [], []
+        for index, leg in enumerate(data['signals']):
+            if not isinstance(leg, dict):
+                errors.append({'index': index, 'error': 'Each signal must be an object'})
+                continue
+            leg = dict(defaults, **leg)
+            try:
+                legs.append((index, leg, parse_signal(leg, mt5_bridge.symbol, mt5_bridge.lot_size)))
+            except SignalValidationError as e:
+                errors.append({'index': index, 'error': str(e)})
+        try:
+            deadline_ms = float(data.get('deadline_ms', mt5_bridge.batch_deadline * 1000))
+        except (TypeError, ValueError):
+            errors.append({'error': 'deadline_ms must be a number'})
+    if errors:
+        return jsonify({'success': False, 'error': 'Invalid signals, nothing was executed', 'errors': errors}), 400
+
+    deadline = start + min(deadline_ms / 1000, mt5_bridge.execution_timeout)
+    if mt5_bridge.account_pool:
+        return route_batch(legs, deadline, start)
+    try:
+        mt5_bridge.supervisor.guard()
+    except CircuitOpenError as e:
+        return handle_circuit_open(e)
+    return submit_batch(legs, deadline, start)
+
+@bridge_api.route('/webhook/tradingview', methods=['GET'])
 def test_webhook():
     """Test endpoint for webhook connectivity"""
     return jsonify({
@@ -392,63 +1292,211 @@ def test_webhook():
         'timestamp': datetime.now(timezone.utc).isoformat()
     }), 200
 
-@app.route('/positions', methods=['GET'])
+@bridge_api.route('/positions', methods=['GET'])
 def get_positions():
     """Get current positions"""
+    if mt5_bridge.account_pool:
+        return routed_response(mt5_bridge.account_pool.broadcast('/positions', params=request.args.to_dict()))
     symbol = request.args.get('symbol')
-    positions = mt5_bridge.get_positions(symbol)
-    return jsonify({'positions': positions}), 200
+    snapshot = mt5_bridge.state_mirror.get_snapshot()
+    if not snapshot:
+        positions = mt5_bridge.executor.call(mt5_bridge.get_positions, symbol, timeout=mt5_bridge.execution_timeout)
+        return jsonify({'positions': positions}), 200
+
+    if symbol:
+        positions = [p for p in snapshot.positions if p['symbol'] == symbol]
+        return snapshot_response(snapshot, json.dumps({'positions': positions}))
+    return snapshot_response(snapshot, snapshot.positions_json)
+
+@bridge_api.route('/orders', methods=['GET'])
+def get_pending_orders():
+    """Get pending orders"""
+    if mt5_bridge.account_pool:
+        return routed_response(mt5_bridge.account_pool.broadcast('/orders'))
+    snapshot = mt5_bridge.state_mirror.get_snapshot()
+    if not snapshot:
+        orders = mt5_bridge.executor.call(mt5_bridge.get_orders, timeout=mt5_bridge.execution_timeout)
+        return jsonify({'orders': orders}), 200
+    return snapshot_response(snapshot, snapshot.orders_json)
+
+@bridge_api.route('/positions/close_all', methods=['POST'])
+def close_all_positions():
+    """Emergency flatten: close every open position on every symbol"""
+    logger.warning("Close-all requested")
+    if mt5_bridge.account_pool:
+        result = mt5_bridge.account_pool.broadcast('/positions/close_all', 'POST')
+        audit('routed_result', signal='CLOSE_ALL', success=result['success'], latency_ms=result['latency_ms'],
+              accounts={r['account']: r['success'] for r in result['results']})
+        return routed_response(result)
+    mt5_bridge.supervisor.guard()
+
+    # Journaled like a signal, so a restart can reconcile every close it sent
+    order_id = mt5_bridge.executor.new_order_id()
+    mt5_bridge.journal_order(order_id, STATE_RECEIVED, wait=True, signal='CLOSE_ALL')
+    try:
+        order_id, future = mt5_bridge.executor.submit_order(mt5_bridge.close_positions, priority=PRIORITY_CLOSE,
+                                                            order_id=order_id)
+    except QueueFullError as e:
+        mt5_bridge.journal_order(order_id, STATE_RESULT, success=False, error=str(e))
+        raise
+    future.add_done_callback(lambda f: audit_order_result(order_id, f))
 
-@app.route('/account', methods=['GET'])
+    try:
+        result = future.result(timeout=mt5_bridge.execution_timeout)
+    except FutureTimeoutError:
+        return jsonify({
+            'success': False,
+            'error': f'Execution did not finish within {mt5_bridge.execution_timeout}s',
+            'order_id': order_id,
+            'status_url': f'/orders/{order_id}'
+        }), 504
+    result = dict(result, order_id=order_id)
+    return jsonify(result), 200 if result['success'] else 500
+
+@bridge_api.route('/account', methods=['GET'])
 def get_account():
     """Get account information"""
-    account_info = mt5_bridge.get_account_info()
+    if mt5_bridge.account_pool:
+        return routed_response(mt5_bridge.account_pool.broadcast('/account'))
+    snapshot = mt5_bridge.state_mirror.get_snapshot()
+    if snapshot:
+        if snapshot.account:
+            return snapshot_response(snapshot, snapshot.account_json, account=True)
+        return jsonify({'error': 'Failed to get account info'}), 500
+
+    account_info = mt5_bridge.executor.call(mt5_bridge.get_account_info, timeout=mt5_bridge.execution_timeout)
     if account_info:
         return jsonify(account_info), 200
     else:
         return jsonify({'error': 'Failed to get account info'}), 500
 
-@app.route('/symbol/<symbol>', methods=['GET'])
+@bridge_api.route('/symbol/<symbol>', methods=['GET'])
 def get_symbol(symbol):
     """Get symbol information"""
-    symbol_info = mt5_bridge.get_symbol_info(symbol.upper())
+    if mt5_bridge.account_pool:
+        workers = mt5_bridge.account_pool.route(symbol.upper())
+        if not workers:
+            return jsonify({'error': f'No account configured for {symbol}'}), 404
+        routed = mt5_bridge.account_pool.dispatch_each([(w, None) for w in workers],
+                                                       path=f'/symbol/{symbol}', method='GET')
+        if all(r['status'] == 404 for r in routed['results']):
+            return jsonify(dict(routed, error=f'Symbol {symbol} not found')), 404
+        return routed_response(routed)
+    symbol_info = mt5_bridge.executor.call(mt5_bridge.get_symbol_info, symbol.upper(), timeout=mt5_bridge.execution_timeout)
     if symbol_info:
         return jsonify(symbol_info), 200
     else:
         return jsonify({'error': f'Symbol {symbol} not found'}), 404
 
-@app.route('/history', methods=['GET'])
+@bridge_api.route('/history', methods=['GET'])
 def get_trade_history():
-    """Get recent trade history"""
+    """Get deal history from the local journal, newest first
+
+    Filters: from/to (unix time or ISO date, to is exclusive), symbol, magic.
+    Pages hold up to `limit` deals; pass `next_cursor` back as `cursor` for the next one.
+    format=ndjson streams every matching deal, one JSON object per line.
+    A router answers with each account's page, or passes the query to ?account=<name>.
+    """
+    args = request.args
+    if mt5_bridge.account_pool:
+        if args.get('account'):
+            return forward_to_account(args['account'], '/history')
+        if args.get('format') == 'ndjson' or args.get('cursor'):
+            return jsonify({'error': 'Streams and cursors are per account, pass account=<name>'}), 400
+        return routed_response(mt5_bridge.account_pool.broadcast('/history', params=args.to_dict()))
     try:
-        # Get last 100 deals
-        deals = mt5.history_deals_get("", 0, 100) if mt5_bridge.mt5_initialized else []
-
-        if deals:
-            history = [{
-                'ticket': deal.ticket,
-                'symbol': deal.symbol,
-                'type': 'BUY' if deal.type == 0 else 'SELL',  # DEAL_TYPE_BUY = 0, DEAL_TYPE_SELL = 1
-                'volume': deal.volume,
-                'price': deal.price,
-                'profit': deal.profit,
-                'time': deal.time,
-                'comment': deal.comment
-            } for deal in deals]
-            return jsonify({'history': history}), 200
-        else:
-            return jsonify({'history': [], 'message': 'No trade history available'}), 200
+        filters = {
+            'start': parse_time(args['from']) if args.get('from') else None,
+            'end': parse_time(args['to']) if args.get('to') else None,
+            'symbol': args['symbol'].upper() if args.get('symbol') else None,
+            'magic': int(args['magic']) if args.get('magic') else None,
+            'cursor': args.get('cursor') or None,
+            'descending': args.get('order', 'desc').lower() != 'asc'
+        }
+        if filters['cursor']:
+            decode_cursor(filters['cursor'])
+        limit = int(args.get('limit', '100'))
+    except ValueError as e:
+        return jsonify({'error': f'Invalid history query: {str(e)}'}), 400
+
+    try:
+        if args.get('format') == 'ndjson':
+            limit = int(args['limit']) if args.get('limit') else None
+            deals = mt5_bridge.deals_journal.query(limit=limit, **filters)
+            return Response(stream_with_context(ndjson_lines(deals)), mimetype='application/x-ndjson')
+
+        page = mt5_bridge.deals_journal.page(limit, **filters)
+        if not page['history'] and not filters['cursor']:
+            page['message'] = 'No trade history available'
+        return jsonify(page), 200
 
     except Exception as e:
         logger.error(f"Error getting trade history: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
-@app.route('/ping', methods=['GET'])
+@bridge_api.route('/orders/<order_id>', methods=['GET'])
+def get_order(order_id):
+    """Get the status and result of a submitted order"""
+    if mt5_bridge.account_pool:
+        if request.args.get('account'):
+            return forward_to_account(request.args['account'], f'/orders/{order_id}')
+        # Without an account, ask every worker and answer with the one that knows the order
+        routed = mt5_bridge.account_pool.broadcast(f'/orders/{order_id}')
+        found = next((r for r in routed['results'] if r['status'] == 200), None)
+        if found:
+            return jsonify(dict(found['result'], account=found['account'])), 200
+        return jsonify({'error': f'Order {order_id} not found'}), 404
+    order = mt5_bridge.executor.get_order(order_id)
+    if order:
+        return jsonify(order), 200
+    else:
+        return jsonify({'error': f'Order {order_id} not found'}), 404
+
+@bridge_api.route('/stream', methods=['GET'])
+def stream_events():
+    """Server-Sent Events: position opens/closes, account changes and quotes for ?symbols=EURUSD,XAUUSD"""
+    if not mt5_bridge.stream_hub:
+        return jsonify({'success': False, 'error': 'Streams are served by each account worker, not the router'}), 503
+    symbols = [s.strip().upper() for s in request.args.get('symbols', '').split(',') if s.strip()]
+    try:
+        subscriber = mt5_bridge.stream_hub.subscribe(symbols)
+    except StreamFull as e:
+        return jsonify({'success': False, 'error': str(e)}), 503
+
+    response = Response(mt5_bridge.stream_hub.stream(subscriber), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    # Stop nginx and similar proxies from buffering the stream
+    response.headers['X-Accel-Buffering'] = 'no'
+    response.call_on_close(lambda: mt5_bridge.stream_hub.unsubscribe(subscriber))
+    return response
+
+@bridge_api.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus metrics endpoint"""
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+@bridge_api.route('/ping', methods=['GET'])
 def ping():
     """Simple ping endpoint for health checks"""
     return jsonify({'status': 'pong', 'timestamp': datetime.now(timezone.utc).isoformat()}), 200
 
+def create_app(bridge=None):
+    """Create the Flask app bound to the process-wide MT5 bridge"""
+    global mt5_bridge
+
+    # One process owns the terminal, every app created in it shares the same bridge
+    if bridge is not None:
+        mt5_bridge = bridge
+    elif mt5_bridge is None:
+        mt5_bridge = MT5Bridge()
+
+    app = Flask(__name__)
+    CORS(app)
+    app.register_blueprint(bridge_api)
+    return app
+
 if __name__ == '__main__':
+    # Development server only, use serve.py in production
     port = int(os.getenv('BRIDGE_PORT', 5000))
-    logger.info(f"Starting MT5 Bridge Service on port {port}")
-    app.run(host='0.0.0.0', port=port, debug=False)
+    logger.info(f"Starting MT5 Bridge Service on port {port} (development server)")
+    create_app().run(host='0.0.0.0', port=port, debug=False)
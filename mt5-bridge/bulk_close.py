@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Bulk close engine for the MT5 Bridge
+Closes many positions from a single positions snapshot with one tick per symbol
+"""
+
+import logging
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+
+logger = logging.getLogger(__name__)
+
+# Flag in symbol_info.order_mode allowing TRADE_ACTION_CLOSE_BY
+SYMBOL_ORDER_CLOSEBY = 64
+
+
+class BulkCloser:
+    def __init__(self, mt5_module, symbol_cache, magic_number: int, sender, send: Optional[Callable] = None):
+        self.mt5 = mt5_module
+        self.symbol_cache = symbol_cache
+        self.magic_number = magic_number
+        self.sender = sender
+        # send(request, symbol, signal) -> (result, retries); the bridge passes its journaling send
+        self.send = send or sender.send
+
+    def close(self, positions, allow_close_by: bool = False) -> Dict:
+        """Close every position in a positions_get snapshot"""
+        start_time = time.perf_counter()
+
+        by_symbol = OrderedDict()
+        for position in positions or []:
+            by_symbol.setdefault(position.symbol, []).append(position)
+
+        results = []
+        for symbol, symbol_positions in by_symbol.items():
+            results.extend(self._close_symbol(symbol, symbol_positions, allow_close_by))
+
+        closed = [r['ticket'] for r in results if r['success']]
+        failed = [r['ticket'] for r in results if not r['success']]
+        latency_ms = (time.perf_counter() - start_time) * 1000
+
+        logger.info(f"Bulk close finished: {len(closed)} closed, {len(failed)} failed in {latency_ms:.1f}ms")
+
+        return {
+            'success': not failed,
+            'message': f'Closed {len(closed)} positions',
+            'closed_tickets': closed,
+            'failed_tickets': failed,
+            'results': results,
+            'latency_ms': round(latency_ms, 3)
+        }
+
+    def _close_symbol(self, symbol: str, positions: List, allow_close_by: bool) -> List[Dict]:
+        """Close all positions of one symbol, netting opposite sides first"""
+        results = []
+        remaining = OrderedDict((p.ticket, p.volume) for p in positions)
+
+        if allow_close_by and self._symbol_allows_close_by(symbol):
+            results.extend(self._net_close_by(symbol, positions, remaining))
+
+        if not remaining:
+            return results
+
+        # One fresh tick prices every remaining close for this symbol
+        tick = self.symbol_cache.get_tick(symbol, max_age=0)
+        if not tick:
+            for ticket in remaining:
+                results.append(self._result(ticket, symbol, 'deal', False, error=f'No prices available for {symbol}'))
+            return results
+
+        types = {p.ticket: p.type for p in positions}
+        for ticket, volume in remaining.items():
+            if types[ticket] == self.mt5.POSITION_TYPE_BUY:
+                order_type, price = self.mt5.ORDER_TYPE_SELL, tick['bid']
+            else:
+                order_type, price = self.mt5.ORDER_TYPE_BUY, tick['ask']
+
+            request = {
+                "action": self.mt5.TRADE_ACTION_DEAL,
+                "symbol": symbol,
+                "volume": volume,
+                "type": order_type,
+                "position": ticket,
+                "price": price,
+                "deviation": self.sender.deviation,
+                "magic": self.magic_number,
+                "comment": "Close position",
+                "type_time": self.mt5.ORDER_TIME_GTC,
+                "type_filling": self.sender.filling_type(symbol),
+            }
+            results.append(self._send(ticket, symbol, 'deal', request))
+
+        return results
+
+    def _net_close_by(self, symbol: str, positions: List, remaining: OrderedDict) -> List[Dict]:
+        """Close opposite positions against each other with TRADE_ACTION_CLOSE_BY"""
+        results = []
+        buys = [p.ticket for p in positions if p.type == self.mt5.POSITION_TYPE_BUY]
+        sells = [p.ticket for p in positions if p.type != self.mt5.POSITION_TYPE_BUY]
+
+        while buys and sells:
+            buy, sell = buys[0], sells[0]
+            request = {
+                "action": self.mt5.TRADE_ACTION_CLOSE_BY,
+                "position": buy,
+                "position_by": sell,
+                "magic": self.magic_number,
+                "comment": "Close by",
+            }
+            result = self._send(buy, symbol, 'close_by', request)
+
+            if not result['success']:
+                # Leave the remainder to regular market closes
+                logger.warning(f"Close by {buy}/{sell} failed, falling back to market closes")
+                break
+
+            # The smaller side is closed in full, the larger keeps the difference
+            netted = min(remaining[buy], remaining[sell])
+            for ticket, opposite, side in ((buy, sell, buys), (sell, buy, sells)):
+                remaining[ticket] = round(remaining[ticket] - netted, 8)
+                if remaining[ticket] <= 0:
+                    del remaining[ticket]
+                    side.pop(0)
+                    results.append(dict(result, ticket=ticket, position_by=opposite))
+
+        return results
+
+    def _symbol_allows_close_by(self, symbol: str) -> bool:
+        spec = self.symbol_cache.get_spec(symbol)
+        return bool(spec and spec.get('order_mode', 0) & SYMBOL_ORDER_CLOSEBY)
+
+    def _send(self, ticket: int, symbol: str, method: str, request: Dict) -> Dict:
+        try:
+            result, _ = self.send(request, symbol, 'CLOSE')
+        except Exception as e:
+            return self._result(ticket, symbol, method, False, error=str(e))
+
+        if result is None:
+            return self._result(ticket, symbol, method, False, error=f'Order send failed: {self.mt5.last_error()}')
+
+        if result.retcode == self.mt5.TRADE_RETCODE_DONE:
+            return self._result(ticket, symbol, method, True, retcode=result.retcode)
+
+        error_msg = f"Close order failed: {result.retcode} - {result.comment}"
+        logger.error(f"{error_msg} (ticket {ticket})")
+        return self._result(ticket, symbol, method, False, retcode=result.retcode, error=error_msg)
+
+    @staticmethod
+    def _result(ticket, symbol, method, success, retcode=None, error=None) -> Dict:
+        result = {'ticket': ticket, 'symbol': symbol, 'method': method, 'success': success, 'retcode': retcode}
+        if error:
+            result['error'] = error
+        return result
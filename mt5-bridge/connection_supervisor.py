@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Connection supervisor for the MT5 Bridge
+Health-checks the terminal in the background, reconnects with exponential backoff
+and re-warms bridge state after a reconnect. While the terminal is down a circuit
+breaker is open, so orders fail immediately instead of waiting on a dead connection.
+"""
+
+import logging
+import random
+import threading
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from datetime import datetime, timezone
+from typing import Dict
+
+from execution import PRIORITY_CLOSE, QueueFullError
+
+logger = logging.getLogger(__name__)
+
+BREAKER_CLOSED = 'closed'
+BREAKER_OPEN = 'open'
+
+
+class CircuitOpenError(Exception):
+    """Raised when an order is refused because the terminal is disconnected"""
+
+
+class ConnectionSupervisor:
+    def __init__(self, bridge, mt5, interval: float = 5.0, backoff_initial: float = 1.0,
+                 backoff_max: float = 60.0, failure_threshold: int = 2, check_timeout: float = 10.0):
+        self.bridge = bridge
+        self.mt5 = mt5
+        self.interval = interval
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        # Consecutive failed health checks before the connection is declared down
+        self.failure_threshold = failure_threshold
+        self.check_timeout = check_timeout
+
+        self.breaker = BREAKER_CLOSED if bridge.mt5_initialized else BREAKER_OPEN
+        self._down_since = None if bridge.mt5_initialized else time.monotonic()
+        self._down_since_wall = None if bridge.mt5_initialized else datetime.now(timezone.utc).isoformat()
+        self._backoff = backoff_initial
+        self._next_attempt = 0.0
+
+        self._thread = None
+        self._stop_event = threading.Event()
+        self._wake = threading.Event()
+
+        self.consecutive_failures = 0
+        self.check_count = 0
+        self.skipped_checks = 0
+        self._stuck_check = None
+        self.reconnect_count = 0
+        self.reconnect_attempts = 0
+        self.outage_count = 0 if bridge.mt5_initialized else 1
+        self.rejected_orders = 0
+        self.downtime_seconds = 0.0
+        self.last_check = None
+        self.last_error = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.mt5 is not None and self.interval > 0
+
+    @property
+    def is_open(self) -> bool:
+        return self.breaker == BREAKER_OPEN
+
+    def start(self):
+        """Start supervising the connection"""
+        if not self.enabled or (self._thread and self._thread.is_alive()):
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='mt5-supervisor', daemon=True)
+        self._thread.start()
+        logger.info(f"Connection supervisor started ({self.interval}s checks)")
+
+    def stop(self):
+        self._stop_event.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(self.check_timeout + 1)
+            self._thread = None
+
+    def guard(self):
+        """Fail fast while the breaker is open"""
+        if self.enabled and self.is_open:
+            self.rejected_orders += 1
+            raise CircuitOpenError(f"MT5 terminal disconnected for {self.current_downtime():.0f}s, order refused")
+
+    def report_failure(self, reason: str):
+        """Called by the order path when a terminal call fails, to check the connection right away"""
+        self.last_error = reason
+        self._wake.set()
+
+    def current_downtime(self) -> float:
+        return time.monotonic() - self._down_since if self._down_since is not None else 0.0
+
+    def get_stats(self) -> Dict:
+        return {
+            'enabled': self.enabled,
+            'connected': self.bridge.mt5_initialized,
+            'breaker': self.breaker,
+            'down_since': self._down_since_wall,
+            'current_downtime_seconds': round(self.current_downtime(), 1),
+            'downtime_seconds_total': round(self.downtime_seconds + self.current_downtime(), 1),
+            'outages': self.outage_count,
+            'reconnects': self.reconnect_count,
+            'reconnect_attempts': self.reconnect_attempts,
+            'next_backoff_seconds': round(self._backoff, 1) if self.is_open else None,
+            'checks': self.check_count,
+            'skipped_checks': self.skipped_checks,
+            'rejected_orders': self.rejected_orders,
+            'last_check': self.last_check,
+            'last_error': self.last_error
+        }
+
+    def _healthy(self) -> bool:
+        """Terminal reachable, connected to the trade server and logged in (runs on the execution thread)"""
+        info = self.mt5.terminal_info()
+        if info is None or not info.connected:
+            self.last_error = f"terminal_info: {self.mt5.last_error()}"
+            return False
+        if self.mt5.account_info() is None:
+            self.last_error = f"account_info: {self.mt5.last_error()}"
+            return False
+        return True
+
+    def _reconnect(self) -> bool:
+        """Drop the old session and connect again (runs on the execution thread)"""
+        try:
+            self.mt5.shutdown()
+        except Exception:
+            pass
+        return self.bridge.initialize_mt5()
+
+    def _check(self):
+        self.check_count += 1
+        self.last_check = datetime.now(timezone.utc).isoformat()
+
+        # A check still stuck in a terminal call keeps failing until it returns
+        if self._stuck_check is not None and not self._stuck_check.done():
+            healthy = False
+            self.last_error = "health check still blocked in a terminal call"
+        else:
+            self._stuck_check = None
+            future = None
+            try:
+                # Checks queue behind closes only, never behind a backlog of opens or queries
+                future = self.bridge.executor.submit(self._healthy, priority=PRIORITY_CLOSE)
+                healthy = future.result(timeout=self.check_timeout)
+            except QueueFullError:
+                self.skipped_checks += 1
+                return
+            except FutureTimeoutError:
+                if future.cancel():
+                    # Never started: a busy execution thread says nothing about the terminal
+                    self.skipped_checks += 1
+                    logger.debug("Health check skipped, the execution queue is busy")
+                    return
+                # Started and hung, which is what a wedged terminal looks like
+                self._stuck_check = future
+                healthy = False
+                self.last_error = f"health check timed out after {self.check_timeout}s"
+            except Exception as e:
+                healthy = False
+                self.last_error = f"health check failed: {str(e)}"
+
+        if healthy:
+            self.consecutive_failures = 0
+            return
+
+        self.consecutive_failures += 1
+        if not self.is_open and self.consecutive_failures >= self.failure_threshold:
+            self._trip()
+
+    def _trip(self):
+        self.breaker = BREAKER_OPEN
+        self.bridge.mt5_initialized = False
+        self._down_since = time.monotonic()
+        self._down_since_wall = datetime.now(timezone.utc).isoformat()
+        self._backoff = self.backoff_initial
+        self._next_attempt = 0.0
+        self.outage_count += 1
+        logger.error(f"MT5 connection lost ({self.last_error}), orders are refused until it is restored")
+
+    def _attempt_reconnect(self):
+        now = time.monotonic()
+        if now < self._next_attempt:
+            return
+
+        self.reconnect_attempts += 1
+        try:
+            connected = self.bridge.executor.call(self._reconnect, priority=PRIORITY_CLOSE, timeout=self.check_timeout * 3)
+        except Exception as e:
+            connected = False
+            self.last_error = f"reconnect failed: {str(e)}"
+
+        if not connected:
+            # Jitter keeps several bridges from reconnecting in lockstep
+            self._next_attempt = time.monotonic() + random.uniform(0.5, 1.0) * self._backoff
+            logger.warning(f"MT5 reconnect attempt {self.reconnect_attempts} failed, next in {self._backoff:.0f}s")
+            self._backoff = min(self._backoff * 2, self.backoff_max)
+            return
+
+        downtime = self.current_downtime()
+        self.downtime_seconds += downtime
+        self._down_since = None
+        self._down_since_wall = None
+        self.consecutive_failures = 0
+        self.reconnect_count += 1
+        self._rewarm()
+        self.breaker = BREAKER_CLOSED
+        logger.info(f"MT5 connection restored after {downtime:.1f}s")
+
+    def _rewarm(self):
+        """Bring cached state up to date before orders are accepted again"""
+        bridge = self.bridge
+        # Symbols were selected and specs prefetched by initialize_mt5
+        for name, action in [('filling modes', lambda: bridge.order_sender.invalidate()),
+                             ('state mirror', lambda: bridge.state_mirror.refresh()),
+                             ('trade journal', lambda: bridge.reconciler and bridge.reconciler.reconcile()),
+                             ('deals journal', lambda: bridge.deals_syncer.wake()),
+                             ('risk table', lambda: bridge.risk_engine.refresh())]:
+            try:
+                action()
+            except Exception as e:
+                logger.error(f"Re-warming {name} after reconnect failed: {str(e)}")
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            if self.is_open:
+                self._attempt_reconnect()
+                wait = max(0.2, min(self.interval, self._next_attempt - time.monotonic()))
+            else:
+                self._check()
+                # Confirm a failed check quickly instead of waiting a full interval
+                wait = min(self.interval, 1.0) if self.consecutive_failures else self.interval
+            self._wake.wait(wait)
+            self._wake.clear()
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Local deals journal for the MT5 Bridge
+Mirrors the account's deal history into SQLite, synced incrementally from the
+terminal, so /history can filter and page through years of deals without asking
+MT5 for the full history on every request.
+
+Deals are keyed by ticket. Each sync re-reads a short overlap before the newest
+stored deal time, so deals the terminal reports late are still picked up and
+duplicates are ignored by the primary key.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+DEAL_COLUMNS = [
+    ('ticket', 'INTEGER PRIMARY KEY'), ('order', 'INTEGER'), ('time', 'INTEGER'), ('time_msc', 'INTEGER'),
+    ('type', 'INTEGER'), ('entry', 'INTEGER'), ('magic', 'INTEGER'), ('reason', 'INTEGER'),
+    ('position_id', 'INTEGER'), ('volume', 'REAL'), ('price', 'REAL'), ('commission', 'REAL'),
+    ('swap', 'REAL'), ('profit', 'REAL'), ('fee', 'REAL'), ('symbol', 'TEXT'), ('comment', 'TEXT'),
+    ('external_id', 'TEXT')
+]
+COLUMN_NAMES = [name for name, _ in DEAL_COLUMNS]
+_COLUMNS_SQL = ', '.join(f'"{name}"' for name in COLUMN_NAMES)
+_SCHEMA_SQL = ', '.join(f'"{name}" {kind}' for name, kind in DEAL_COLUMNS)
+
+DEAL_TYPES = {
+    0: 'BUY', 1: 'SELL', 2: 'BALANCE', 3: 'CREDIT', 4: 'CHARGE', 5: 'CORRECTION', 6: 'BONUS',
+    7: 'COMMISSION', 8: 'COMMISSION_DAILY', 9: 'COMMISSION_MONTHLY', 10: 'COMMISSION_AGENT_DAILY',
+    11: 'COMMISSION_AGENT_MONTHLY', 12: 'INTEREST', 13: 'BUY_CANCELED', 14: 'SELL_CANCELED',
+    15: 'DIVIDEND', 16: 'DIVIDEND_FRANKED', 17: 'TAX'
+}
+DEAL_ENTRIES = {0: 'IN', 1: 'OUT', 2: 'INOUT', 3: 'OUT_BY'}
+
+# Broker server time can be offset from UTC by up to a day, so sync windows extend that far
+SERVER_TIME_MARGIN = 86400
+MAX_PAGE_SIZE = 1000
+
+
+def _utc(timestamp: float) -> datetime:
+    return datetime.fromtimestamp(timestamp, timezone.utc)
+
+
+def encode_cursor(deal: Dict) -> str:
+    return f"{deal['time_msc']}:{deal['ticket']}"
+
+
+def decode_cursor(cursor: str):
+    """Split a cursor into its (time_msc, ticket) position"""
+    time_msc, _, ticket = cursor.partition(':')
+    try:
+        return int(time_msc), int(ticket)
+    except ValueError:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+
+def _deal_dict(row) -> Dict:
+    deal = dict(zip(COLUMN_NAMES, row))
+    deal['type'] = DEAL_TYPES.get(deal['type'], str(deal['type']))
+    deal['entry'] = DEAL_ENTRIES.get(deal['entry'], str(deal['entry']))
+    return deal
+
+
+class DealsJournal:
+    """SQLite index of account deals with time, symbol and magic lookups"""
+
+    def __init__(self, path: str, mt5=None, runner: Optional[Callable] = None,
+                 default_days: int = 365, chunk_days: int = 30, overlap: float = 60.0):
+        self.path = path
+        self.mt5 = mt5
+        # Terminal calls go through the runner so they can be serialized on the execution engine
+        self.runner = runner or (lambda func, *args: func(*args))
+        self.default_days = default_days
+        self.chunk_days = chunk_days
+        self.overlap = overlap
+
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        # WAL lets /history readers run while a sync is writing
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(f"CREATE TABLE IF NOT EXISTS deals ({_SCHEMA_SQL})")
+        self._conn.execute('CREATE INDEX IF NOT EXISTS deals_time ON deals (time_msc, ticket)')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS deals_symbol ON deals (symbol, time_msc, ticket)')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS deals_magic ON deals (magic, time_msc, ticket)')
+        self._conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER)')
+        self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def watermark(self) -> Dict:
+        """Newest stored deal time and highest stored ticket"""
+        with self._lock:
+            last_time, last_ticket, count = self._conn.execute(
+                'SELECT MAX(time), MAX(ticket), COUNT(*) FROM deals').fetchone()
+            synced_to = self._conn.execute("SELECT value FROM meta WHERE key = 'synced_to'").fetchone()
+        return {'last_time': last_time, 'last_ticket': last_ticket, 'deals': count,
+                'synced_to': synced_to[0] if synced_to else None}
+
+    def sync(self, since: Optional[int] = None) -> int:
+        """Insert deals reported since the last sync, returning how many were new"""
+        mark = self.watermark()
+        if mark['synced_to'] is not None:
+            # Deal times are in server time, which may lag the wall clock, but never rescan more than a day
+            synced_to = mark['synced_to']
+            start = int(max(min(synced_to, mark['last_time'] or synced_to), synced_to - SERVER_TIME_MARGIN) - self.overlap)
+        else:
+            start = since if since is not None else int(time.time() - self.default_days * 86400)
+        end = int(time.time() + SERVER_TIME_MARGIN)
+
+        added = 0
+        chunk = self.chunk_days * 86400
+        while start < end:
+            chunk_end = min(start + chunk, end)
+            deals = self.runner(self.mt5.history_deals_get, _utc(start), _utc(chunk_end))
+            if deals is None:
+                raise RuntimeError(f"history_deals_get failed: {self.mt5.last_error()}")
+            added += self._insert(deals)
+            start = chunk_end
+
+        # Resume from the wall clock rather than the server-time margin on the next sync
+        self._set_meta('synced_to', int(time.time()))
+        if added:
+            logger.info(f"Deals journal synced {added} new deals")
+        return added
+
+    def query(self, start: Optional[int] = None, end: Optional[int] = None, symbol: Optional[str] = None,
+              magic: Optional[int] = None, cursor: Optional[str] = None, limit: Optional[int] = None,
+              descending: bool = True) -> Iterator[Dict]:
+        """Yield deals in [start, end) seconds ordered by (time_msc, ticket), resuming after cursor"""
+        where, params = [], []
+        if start is not None:
+            where.append('time_msc >= ?')
+            params.append(start * 1000)
+        if end is not None:
+            where.append('time_msc < ?')
+            params.append(end * 1000)
+        if symbol:
+            where.append('symbol = ?')
+            params.append(symbol)
+        if magic is not None:
+            where.append('magic = ?')
+            params.append(magic)
+        if cursor:
+            # Keyset pagination: resume strictly past the last row of the previous page
+            where.append(f"(time_msc, ticket) {'<' if descending else '>'} (?, ?)")
+            params.extend(decode_cursor(cursor))
+
+        direction = 'DESC' if descending else 'ASC'
+        sql = f"SELECT {_COLUMNS_SQL} FROM deals"
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        sql += f" ORDER BY time_msc {direction}, ticket {direction}"
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+
+        # A connection per reader, so a long stream never holds the sync connection
+        conn = sqlite3.connect(self.path)
+        try:
+            rows = conn.execute(sql, params)
+            while True:
+                batch = rows.fetchmany(500)
+                if not batch:
+                    break
+                for row in batch:
+                    yield _deal_dict(row)
+        finally:
+            conn.close()
+
+    def page(self, limit: int = 100, **filters) -> Dict:
+        """One page of deals plus the cursor for the next one"""
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        deals = list(self.query(limit=limit + 1, **filters))
+        next_cursor = encode_cursor(deals[limit - 1]) if len(deals) > limit else None
+        return {'history': deals[:limit], 'count': min(len(deals), limit), 'next_cursor': next_cursor}
+
+    def _insert(self, deals) -> int:
+        rows = [
+            tuple(getattr(deal, name, None) for name in COLUMN_NAMES)
+            for deal in deals
+        ]
+        if not rows:
+            return 0
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                f"INSERT OR IGNORE INTO deals ({_COLUMNS_SQL}) VALUES ({', '.join('?' * len(COLUMN_NAMES))})", rows)
+            self._conn.commit()
+            return self._conn.total_changes - before
+
+    def _set_meta(self, key: str, value: int):
+        with self._lock:
+            self._conn.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (key, value))
+            self._conn.commit()
+
+
+class DealsSyncer:
+    """Background incremental sync of the deals journal"""
+
+    def __init__(self, journal: DealsJournal, interval: float = 10.0):
+        self.journal = journal
+        self.interval = interval
+
+        self._thread = None
+        self._stop_event = threading.Event()
+        self._wake = threading.Event()
+
+        self.sync_count = 0
+        self.error_count = 0
+        self.deals_added = 0
+        self.last_sync = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.journal.mt5 is not None and self.interval > 0
+
+    def start(self):
+        """Start syncing in the background"""
+        if not self.enabled or (self._thread and self._thread.is_alive()):
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='deals-sync', daemon=True)
+        self._thread.start()
+        logger.info(f"Deals journal sync started ({self.interval}s interval)")
+
+    def stop(self):
+        """Stop the background sync"""
+        self._stop_event.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(self.interval + 5)
+            self._thread = None
+
+    def wake(self):
+        """Sync now instead of waiting for the next interval, e.g. after an order fills"""
+        self._wake.set()
+
+    def sync_once(self):
+        try:
+            self.deals_added += self.journal.sync()
+            self.last_sync = datetime.now(timezone.utc).isoformat()
+        except Exception as e:
+            self.error_count += 1
+            logger.error(f"Deals journal sync failed: {str(e)}")
+        self.sync_count += 1
+
+    def get_stats(self) -> Dict:
+        stats = {
+            'enabled': self.enabled,
+            'syncs': self.sync_count,
+            'errors': self.error_count,
+            'deals_added': self.deals_added,
+            'last_sync': self.last_sync
+        }
+        stats.update(self.journal.watermark())
+        return stats
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            self.sync_once()
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+
+def ndjson_lines(deals: Iterator[Dict]) -> Iterator[str]:
+    """Serialize deals one JSON object per line"""
+    for deal in deals:
+        yield json.dumps(deal) + '\n'
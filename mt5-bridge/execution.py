@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Execution engine for the MT5 Bridge
+Owns every MetaTrader5 call on a single thread fed by a bounded priority queue
+"""
+
+import itertools
+import logging
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+from metrics import QUEUE_WAIT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Lower values are executed first. CLOSE signals always jump ahead of opens,
+# and read-only queries never delay an order.
+PRIORITY_CLOSE = 0
+PRIORITY_OPEN = 10
+PRIORITY_QUERY = 20
+
+
+class QueueFullError(Exception):
+    """Raised when the execution queue cannot accept more work"""
+
+
+class ExecutionEngine:
+    def __init__(self, max_queue_size: int = 100, max_tracked_orders: int = 1000):
+        self.max_queue_size = max_queue_size
+        self.max_tracked_orders = max_tracked_orders
+
+        self._queue = queue.PriorityQueue(maxsize=max_queue_size)
+        self._sequence = itertools.count()
+        self._thread = None
+        self._running = False
+
+        # Order registry for accept-then-execute lookups, oldest evicted first
+        self._orders = OrderedDict()
+        self._orders_lock = threading.Lock()
+
+        # Order id of the tracked order running on the execution thread, if any, and its requests so far
+        self.current_order_id = None
+        self._current_legs = 0
+
+        self.processed_count = 0
+        self.failed_count = 0
+        self.rejected_count = 0
+
+    def start(self):
+        """Start the execution thread"""
+        if self._thread and self._thread.is_alive():
+            return
+
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='mt5-executor', daemon=True)
+        self._thread.start()
+        logger.info(f"Execution engine started (queue size {self.max_queue_size})")
+
+    def stop(self, timeout: float = 5.0):
+        """Stop the execution thread after the current task finishes"""
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def is_owner_thread(self) -> bool:
+        """Return True when called from the execution thread itself"""
+        return threading.current_thread() is self._thread
+
+    def submit(self, func: Callable, *args, priority: int = PRIORITY_QUERY, **kwargs) -> Future:
+        """Queue a callable for the execution thread and return its future"""
+        future = Future()
+
+        # Calls made from inside a task run inline, queueing them would deadlock
+        if self.is_owner_thread():
+            self._execute(func, args, kwargs, future)
+            return future
+
+        try:
+            self._queue.put_nowait((priority, next(self._sequence), time.perf_counter(), func, args, kwargs, future))
+        except queue.Full:
+            self.rejected_count += 1
+            raise QueueFullError(f"Execution queue is full ({self.max_queue_size} pending)")
+
+        return future
+
+    def call(self, func: Callable, *args, priority: int = PRIORITY_QUERY,
+             timeout: Optional[float] = None, **kwargs):
+        """Run a callable on the execution thread and wait for its result"""
+        return self.submit(func, *args, priority=priority, **kwargs).result(timeout=timeout)
+
+    @staticmethod
+    def new_order_id() -> str:
+        """Order id to journal a signal under before it is queued"""
+        return uuid.uuid4().hex
+
+    def next_leg(self) -> int:
+        """Number the running order's next terminal request, from 0 (execution thread only)"""
+        leg = self._current_legs
+        self._current_legs += 1
+        return leg
+
+    def submit_order(self, func: Callable, *args, priority: int = PRIORITY_OPEN,
+                     order_id: Optional[str] = None, **kwargs) -> Tuple[str, Future]:
+        """Queue a trading task and track its outcome under order_id (default: a new id)"""
+        record = self._track_order(order_id)
+        order_id = record['order_id']
+
+        try:
+            future = self.submit(self._run_order, record, func, args, kwargs, priority=priority)
+        except QueueFullError:
+            with self._orders_lock:
+                self._orders.pop(order_id, None)
+            raise
+
+        return order_id, future
+
+    def submit_orders(self, calls: List[Tuple[Callable, tuple]], priority: int = PRIORITY_OPEN,
+                      before: Optional[Callable] = None,
+                      order_ids: Optional[List[str]] = None) -> List[Tuple[str, Future]]:
+        """Queue several trading tasks to run back to back in one execution slot
+
+        Each call is tracked under its own order id and resolves its own future, in order.
+        If `before` raises, none of the calls run and every future fails with its error.
+        """
+        order_ids = order_ids or [None] * len(calls)
+        legs = [(self._track_order(order_id), func, args, Future()) for (func, args), order_id in zip(calls, order_ids)]
+
+        try:
+            self.submit(self._run_orders, legs, before, priority=priority)
+        except QueueFullError:
+            with self._orders_lock:
+                for record, _, _, _ in legs:
+                    self._orders.pop(record['order_id'], None)
+            raise
+
+        return [(record['order_id'], future) for record, _, _, future in legs]
+
+    def restore_order(self, order_id: str, status: str, result: Dict, submitted_at: Optional[str] = None):
+        """Track the outcome of an order recovered from a previous run"""
+        with self._orders_lock:
+            self._orders[order_id] = {
+                'order_id': order_id,
+                'status': status,
+                'submitted_at': submitted_at,
+                'completed_at': datetime.now(timezone.utc).isoformat(),
+                'result': result,
+                'error': result.get('error'),
+                'recovered': True
+            }
+            while len(self._orders) > self.max_tracked_orders:
+                self._orders.popitem(last=False)
+
+    def get_order(self, order_id: str) -> Optional[Dict]:
+        """Get a copy of a tracked order record"""
+        with self._orders_lock:
+            record = self._orders.get(order_id)
+            return dict(record) if record else None
+
+    def get_stats(self) -> Dict:
+        """Get execution queue statistics"""
+        return {
+            'running': bool(self._thread and self._thread.is_alive()),
+            'queue_depth': self._queue.qsize(),
+            'max_queue_size': self.max_queue_size,
+            'processed': self.processed_count,
+            'failed': self.failed_count,
+            'rejected': self.rejected_count,
+            'tracked_orders': len(self._orders)
+        }
+
+    def _track_order(self, order_id: Optional[str] = None) -> Dict:
+        """Register a new order record, under a fresh id unless one is given"""
+        record = {
+            'order_id': order_id or self.new_order_id(),
+            'status': 'queued',
+            'submitted_at': datetime.now(timezone.utc).isoformat(),
+            'completed_at': None,
+            'result': None,
+            'error': None
+        }
+        with self._orders_lock:
+            self._orders[record['order_id']] = record
+            while len(self._orders) > self.max_tracked_orders:
+                self._orders.popitem(last=False)
+        return record
+
+    def _run_orders(self, legs: List[Tuple[Dict, Callable, tuple, Future]], before: Optional[Callable]):
+        """Execute the legs of a batch in order, resolving each leg's future as it completes"""
+        if before:
+            try:
+                before()
+            except Exception as e:
+                for record, _, _, future in legs:
+                    record.update(status='failed', error=str(e), completed_at=datetime.now(timezone.utc).isoformat())
+                    future.set_exception(e)
+                return
+
+        for record, func, args, future in legs:
+            future.set_running_or_notify_cancel()
+            try:
+                future.set_result(self._run_order(record, func, args, {}))
+            except Exception as e:
+                future.set_exception(e)
+
+    def _run_order(self, record: Dict, func: Callable, args: tuple, kwargs: dict):
+        """Execute a tracked order and record its result"""
+        record['status'] = 'running'
+        self.current_order_id = record['order_id']
+        self._current_legs = 0
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            record['status'] = 'failed'
+            record['error'] = str(e)
+            raise
+        else:
+            record['status'] = 'done' if result.get('success') else 'failed'
+            record['result'] = result
+            return result
+        finally:
+            self.current_order_id = None
+            record['completed_at'] = datetime.now(timezone.utc).isoformat()
+
+    def _execute(self, func: Callable, args: tuple, kwargs: dict, future: Future):
+        """Run a single task and resolve its future"""
+        if not future.set_running_or_notify_cancel():
+            return
+
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            self.failed_count += 1
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+        finally:
+            self.processed_count += 1
+
+    def _run(self):
+        """Execution thread main loop"""
+        while self._running:
+            try:
+                priority, _, enqueued_at, func, args, kwargs, future = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+            QUEUE_WAIT_SECONDS.observe(time.perf_counter() - enqueued_at, priority=priority)
+
+            try:
+                self._execute(func, args, kwargs, future)
+            except Exception as e:
+                logger.error(f"Execution engine error: {str(e)}")
+            finally:
+                self._queue.task_done()
@@ -0,0 +1,589 @@
+#!/usr/bin/env python3
+"""
+Local history store for the MT5 Bridge
+Keeps OHLCV bars and ticks per symbol in append-only columnar files, synced from the
+terminal incrementally and read back as memory-mapped NumPy arrays.
+
+Layout:
+    <root>/<SYMBOL>/<TIMEFRAME>/   time.bin open.bin ... meta.json   (bars)
+    <root>/<SYMBOL>/ticks/         time_msc.bin bid.bin ... meta.json (ticks)
+
+Each column is a flat little-endian array. meta.json holds the committed row count,
+so a write interrupted by a crash is truncated away on the next append. Rows are
+strictly ordered by time, which makes a binary search on the mapped time column
+the range index. Appends and rewrites hold an exclusive lock on <series>.lock next to
+the series directory, so the compact CLI and the bridge's sync never interleave.
+
+Usage:
+    python history_store.py sync EURUSD:M1 EURUSD:ticks --since 2024-01-01
+    python history_store.py info
+    python history_store.py compact EURUSD:ticks --keep-days 90
+    python history_store.py export EURUSD:M1 eurusd_m1.csv --start 2024-06-01
+"""
+
+import fcntl
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from execution import PRIORITY_QUERY
+
+logger = logging.getLogger(__name__)
+
+BAR_COLUMNS = [
+    ('time', '<i8'), ('open', '<f8'), ('high', '<f8'), ('low', '<f8'), ('close', '<f8'),
+    ('tick_volume', '<u8'), ('spread', '<i4'), ('real_volume', '<u8')
+]
+TICK_COLUMNS = [
+    ('time_msc', '<i8'), ('bid', '<f8'), ('ask', '<f8'), ('last', '<f8'),
+    ('volume', '<u8'), ('flags', '<u4'), ('volume_real', '<f8')
+]
+
+TIMEFRAME_SECONDS = {
+    'M1': 60, 'M5': 300, 'M15': 900, 'M30': 1800, 'H1': 3600, 'H4': 14400, 'D1': 86400
+}
+
+# MetaTrader5 copy_ticks_* flag for every tick
+COPY_TICKS_ALL = -1
+
+
+def _utc(timestamp: float) -> datetime:
+    return datetime.fromtimestamp(timestamp, timezone.utc)
+
+
+def parse_time(value: str) -> int:
+    """Parse a unix timestamp or an ISO date/datetime (UTC) into seconds"""
+    if value.isdigit():
+        return int(value)
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp())
+
+
+class ColumnSeries:
+    """One append-only, time-ordered table stored as a file per column"""
+
+    def __init__(self, path: str, columns: List[Tuple[str, str]]):
+        self.path = path
+        self.columns = columns
+        self.time_column = columns[0][0]
+        self._lock = threading.RLock()
+        self._lock_file = None
+        self._lock_depth = 0
+        self._maps = {}
+        self._maps_rows = -1
+
+        self.meta = None
+        with self.locked():
+            pass
+
+    @property
+    def rows(self) -> int:
+        return self.meta['rows']
+
+    @property
+    def last_time(self) -> Optional[int]:
+        return self.meta['last_time']
+
+    @contextmanager
+    def locked(self):
+        """Hold the series exclusively against other threads and processes, with meta re-read"""
+        with self._lock:
+            if not self._lock_depth:
+                # The lock file sits beside the directory, which a rewrite swaps out
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                self._lock_file = open(f"{self.path}.lock", 'a')
+                fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+                try:
+                    self._recover()
+                    meta = self._read_meta()
+                except BaseException:
+                    self._unlock()
+                    raise
+                # Another process may have appended or compacted since the last read
+                if meta != self.meta:
+                    self._maps = {}
+                    self._maps_rows = -1
+                    self.meta = meta
+            self._lock_depth += 1
+            try:
+                yield
+            finally:
+                self._lock_depth -= 1
+                if not self._lock_depth:
+                    self._unlock()
+
+    def _unlock(self):
+        fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+        self._lock_file.close()
+        self._lock_file = None
+
+    def _recover(self):
+        # A compaction interrupted between its two renames leaves only the new copy
+        if not os.path.isdir(self.path) and os.path.isdir(f"{self.path}.compact"):
+            os.rename(f"{self.path}.compact", self.path)
+
+    def _read_meta(self) -> Dict:
+        try:
+            with open(os.path.join(self.path, 'meta.json')) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'rows': 0, 'first_time': None, 'last_time': None, 'last_time_count': 0,
+                    'columns': [name for name, _ in self.columns]}
+
+    def _write_meta(self, meta: Dict, path: Optional[str] = None):
+        path = path or self.path
+        temp_path = os.path.join(path, 'meta.json.tmp')
+        with open(temp_path, 'w') as f:
+            json.dump(meta, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, os.path.join(path, 'meta.json'))
+
+    def _column_path(self, name: str, path: Optional[str] = None) -> str:
+        return os.path.join(path or self.path, f'{name}.bin')
+
+    def append(self, data) -> int:
+        """Append rows (a structured array or dict of columns) newer than the stored ones"""
+        with self.locked():
+            count = len(data[self.time_column])
+            if not count:
+                return 0
+            times = np.asarray(data[self.time_column], dtype=np.int64)
+
+            os.makedirs(self.path, exist_ok=True)
+            committed = self.meta['rows']
+            for name, dtype in self.columns:
+                column_path = self._column_path(name)
+                itemsize = np.dtype(dtype).itemsize
+                # Drop bytes past the committed row count left by an interrupted append
+                if os.path.exists(column_path) and os.path.getsize(column_path) != committed * itemsize:
+                    with open(column_path, 'r+b') as f:
+                        f.truncate(committed * itemsize)
+                with open(column_path, 'ab') as f:
+                    f.write(np.ascontiguousarray(data[name], dtype=dtype).tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+
+            last_time = int(times[-1])
+            last_count = int(np.count_nonzero(times == last_time))
+            if last_time == self.meta['last_time']:
+                last_count += self.meta['last_time_count']
+
+            meta = dict(self.meta, rows=committed + count, last_time=last_time, last_time_count=last_count)
+            if meta['first_time'] is None:
+                meta['first_time'] = int(times[0])
+            self._write_meta(meta)
+            self.meta = meta
+            return count
+
+    def column(self, name: str) -> np.ndarray:
+        """Read-only memory map of one column's committed rows"""
+        rows = self.meta['rows']
+        if self._maps_rows != rows:
+            self._maps = {}
+            self._maps_rows = rows
+        if name not in self._maps:
+            dtype = dict(self.columns)[name]
+            if rows == 0:
+                self._maps[name] = np.empty(0, dtype=dtype)
+            else:
+                self._maps[name] = np.memmap(self._column_path(name), dtype=dtype, mode='r', shape=(rows,))
+        return self._maps[name]
+
+    def index_range(self, start: Optional[int] = None, end: Optional[int] = None) -> Tuple[int, int]:
+        """Row slice [first, last) with start <= time <= end, by binary search"""
+        times = self.column(self.time_column)
+        first = int(np.searchsorted(times, start, side='left')) if start is not None else 0
+        last = int(np.searchsorted(times, end, side='right')) if end is not None else len(times)
+        return first, max(first, last)
+
+    def read(self, start: Optional[int] = None, end: Optional[int] = None,
+             columns: Optional[List[str]] = None) -> Dict[str, np.ndarray]:
+        """Zero-copy column views for a time range"""
+        first, last = self.index_range(start, end)
+        names = columns or [name for name, _ in self.columns]
+        return {name: self.column(name)[first:last] for name in names}
+
+    def rewrite(self, data: Dict[str, np.ndarray]):
+        """Replace the whole series, swapping in a fully written copy"""
+        with self.locked():
+            new_path = f"{self.path}.compact"
+            old_path = f"{self.path}.old"
+            shutil.rmtree(new_path, ignore_errors=True)
+            os.makedirs(new_path)
+
+            times = np.asarray(data[self.time_column], dtype=np.int64)
+            for name, dtype in self.columns:
+                with open(self._column_path(name, new_path), 'wb') as f:
+                    f.write(np.ascontiguousarray(data[name], dtype=dtype).tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+
+            meta = {
+                'rows': len(times),
+                'first_time': int(times[0]) if len(times) else None,
+                'last_time': int(times[-1]) if len(times) else None,
+                'last_time_count': int(np.count_nonzero(times == times[-1])) if len(times) else 0,
+                'columns': [name for name, _ in self.columns]
+            }
+            self._write_meta(meta, new_path)
+
+            self._maps = {}
+            self._maps_rows = -1
+            if os.path.isdir(self.path):
+                os.rename(self.path, old_path)
+            os.rename(new_path, self.path)
+            shutil.rmtree(old_path, ignore_errors=True)
+            self.meta = meta
+
+    def get_info(self) -> Dict:
+        size = sum(os.path.getsize(self._column_path(name)) for name, _ in self.columns
+                   if os.path.exists(self._column_path(name)))
+        return {
+            'rows': self.meta['rows'],
+            'first_time': self.meta['first_time'],
+            'last_time': self.meta['last_time'],
+            'bytes': size
+        }
+
+
+class HistoryStore:
+    def __init__(self, root: str, mt5_module=None, runner: Optional[Callable] = None,
+                 default_days: int = 30, chunk_bars: int = 50000, chunk_seconds: int = 6 * 3600):
+        self.root = root
+        self.mt5 = mt5_module
+        # Terminal calls go through the runner, e.g. the bridge's execution engine
+        self.runner = runner or (lambda func, *args: func(*args))
+        self.default_days = default_days
+        self.chunk_bars = chunk_bars
+        self.chunk_seconds = chunk_seconds
+
+        self._series = {}
+        self._series_lock = threading.Lock()
+
+    def series(self, symbol: str, timeframe: str) -> ColumnSeries:
+        """Bars of a timeframe, or ticks when timeframe is 'ticks'"""
+        symbol, timeframe = symbol.upper(), timeframe.upper()
+        if timeframe != 'TICKS' and timeframe not in TIMEFRAME_SECONDS:
+            raise ValueError(f"Unsupported timeframe {timeframe}, use ticks or one of {', '.join(TIMEFRAME_SECONDS)}")
+
+        key = (symbol, timeframe)
+        with self._series_lock:
+            if key not in self._series:
+                if timeframe == 'TICKS':
+                    self._series[key] = ColumnSeries(os.path.join(self.root, symbol, 'ticks'), TICK_COLUMNS)
+                else:
+                    self._series[key] = ColumnSeries(os.path.join(self.root, symbol, timeframe), BAR_COLUMNS)
+            return self._series[key]
+
+    def bars(self, symbol: str, timeframe: str, start: Optional[int] = None,
+             end: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """Stored bars with open time in [start, end], as memory-mapped columns"""
+        return self.series(symbol, timeframe).read(start, end)
+
+    def ticks(self, symbol: str, start: Optional[int] = None, end: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """Stored ticks between two unix times in seconds, as memory-mapped columns"""
+        return self.series(symbol, 'ticks').read(
+            start * 1000 if start is not None else None,
+            end * 1000 + 999 if end is not None else None
+        )
+
+    def sync(self, symbol: str, timeframe: str, since: Optional[int] = None) -> int:
+        """Fetch everything newer than the last stored row; returns rows added"""
+        if timeframe.upper() == 'TICKS':
+            return self.sync_ticks(symbol, since)
+        return self.sync_bars(symbol, timeframe, since)
+
+    def sync_bars(self, symbol: str, timeframe: str, since: Optional[int] = None) -> int:
+        """Append closed bars since the last stored one"""
+        series = self.series(symbol, timeframe)
+        seconds = TIMEFRAME_SECONDS[timeframe.upper()]
+        mt5_timeframe = getattr(self.mt5, f'TIMEFRAME_{timeframe.upper()}')
+
+        tick = self._last_tick(symbol)
+        # Only bars before the one still forming are final
+        forming_open = tick.time // seconds * seconds
+
+        last_time = series.last_time
+        start = last_time + seconds if last_time is not None else self._default_start(since)
+        added = 0
+        while start < forming_open:
+            end = min(start + self.chunk_bars * seconds, forming_open) - 1
+            rates = self.runner(self.mt5.copy_rates_range, symbol, mt5_timeframe, _utc(start), _utc(end))
+            if rates is None:
+                raise RuntimeError(f"copy_rates_range failed for {symbol} {timeframe}: {self.mt5.last_error()}")
+            if len(rates):
+                keep = rates['time'] < forming_open
+                if series.last_time is not None:
+                    keep &= rates['time'] > series.last_time
+                added += series.append(rates[keep])
+            start = end + 1
+
+        if added:
+            logger.info(f"History store synced {added} {timeframe} bars for {symbol}")
+        return added
+
+    def sync_ticks(self, symbol: str, since: Optional[int] = None) -> int:
+        """Append ticks since the last stored one, skipping those already stored at the same millisecond"""
+        series = self.series(symbol, 'ticks')
+        now = self._last_tick(symbol).time + 1
+
+        start = series.last_time // 1000 if series.last_time is not None else self._default_start(since)
+        added = 0
+        while start < now:
+            end = min(start + self.chunk_seconds, now)
+            ticks = self.runner(self.mt5.copy_ticks_range, symbol, _utc(start), _utc(end),
+                                getattr(self.mt5, 'COPY_TICKS_ALL', COPY_TICKS_ALL))
+            if ticks is None:
+                raise RuntimeError(f"copy_ticks_range failed for {symbol}: {self.mt5.last_error()}")
+            if len(ticks):
+                added += series.append(self._new_ticks(series, ticks))
+            start = end
+
+        if added:
+            logger.info(f"History store synced {added} ticks for {symbol}")
+        return added
+
+    def compact(self, symbol: str, timeframe: str, keep_days: Optional[float] = None) -> Dict:
+        """Rewrite a series sorted and deduplicated, optionally dropping old rows"""
+        series = self.series(symbol, timeframe)
+        # Held from the read to the swap, so rows appended meanwhile are not dropped
+        with series.locked():
+            return self._compact(series, keep_days)
+
+    @staticmethod
+    def _compact(series: ColumnSeries, keep_days: Optional[float]) -> Dict:
+        data = {name: np.array(series.column(name)) for name, _ in series.columns}
+        times = data[series.time_column]
+        before = len(times)
+
+        order = np.argsort(times, kind='stable')
+        data = {name: values[order] for name, values in data.items()}
+        times = data[series.time_column]
+
+        if series.columns is BAR_COLUMNS and len(times):
+            # One bar per open time, the latest write wins
+            keep = np.append(times[1:] != times[:-1], True)
+            data = {name: values[keep] for name, values in data.items()}
+            times = data[series.time_column]
+
+        if keep_days is not None:
+            cutoff = time.time() - keep_days * 86400
+            if series.columns is TICK_COLUMNS:
+                cutoff *= 1000
+            keep = times >= cutoff
+            data = {name: values[keep] for name, values in data.items()}
+
+        series.rewrite(data)
+        return {'rows_before': before, 'rows_after': series.rows}
+
+    def get_info(self) -> List[Dict]:
+        """Every stored series with its row count, time span and size"""
+        result = []
+        if not os.path.isdir(self.root):
+            return result
+        for symbol in sorted(os.listdir(self.root)):
+            symbol_path = os.path.join(self.root, symbol)
+            if not os.path.isdir(symbol_path):
+                continue
+            for timeframe in sorted(os.listdir(symbol_path)):
+                if os.path.exists(os.path.join(symbol_path, timeframe, 'meta.json')):
+                    info = self.series(symbol, timeframe).get_info()
+                    result.append(dict(info, symbol=symbol, timeframe=timeframe.upper()))
+        return result
+
+    def _default_start(self, since: Optional[int]) -> int:
+        return since if since is not None else int(time.time() - self.default_days * 86400)
+
+    def _last_tick(self, symbol: str):
+        tick = self.runner(self.mt5.symbol_info_tick, symbol)
+        if tick is None:
+            raise RuntimeError(f"No tick for {symbol}: {self.mt5.last_error()}")
+        return tick
+
+    @staticmethod
+    def _new_ticks(series: ColumnSeries, ticks):
+        """Drop ticks that are already stored; several ticks can share a millisecond"""
+        last_time = series.last_time
+        if last_time is None:
+            return ticks
+        times = ticks['time_msc']
+        keep = times > last_time
+        same = np.flatnonzero(times == last_time)
+        keep[same[series.meta['last_time_count']:]] = True
+        return ticks[keep]
+
+
+class HistorySyncer:
+    """Background incremental sync of configured series through the execution engine"""
+
+    def __init__(self, store: HistoryStore, series: List[Tuple[str, str]], interval: float = 60.0):
+        self.store = store
+        self.series = series
+        self.interval = interval
+
+        self._thread = None
+        self._stop_event = threading.Event()
+
+        self.sync_count = 0
+        self.error_count = 0
+        self.rows_added = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.series) and self.store.mt5 is not None and self.interval > 0
+
+    def start(self):
+        """Start syncing in the background"""
+        if not self.enabled or (self._thread and self._thread.is_alive()):
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='history-sync', daemon=True)
+        self._thread.start()
+        logger.info(f"History sync started for {', '.join(f'{s}:{t}' for s, t in self.series)}")
+
+    def stop(self):
+        """Stop the background sync"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(self.interval + 5)
+            self._thread = None
+
+    def sync_all(self):
+        """Sync every configured series once"""
+        for symbol, timeframe in self.series:
+            try:
+                self.rows_added += self.store.sync(symbol, timeframe)
+            except Exception as e:
+                self.error_count += 1
+                logger.error(f"History sync failed for {symbol}:{timeframe}: {str(e)}")
+        self.sync_count += 1
+
+    def get_stats(self) -> Dict:
+        return {
+            'enabled': self.enabled,
+            'syncs': self.sync_count,
+            'errors': self.error_count,
+            'rows_added': self.rows_added
+        }
+
+    def _run(self):
+        # Sync right away, then every interval
+        while True:
+            self.sync_all()
+            if self._stop_event.wait(self.interval):
+                break
+
+
+def parse_series(spec: str) -> List[Tuple[str, str]]:
+    """Parse 'EURUSD:M1,EURUSD:ticks' into (symbol, timeframe) pairs"""
+    pairs = []
+    for entry in (e.strip() for e in spec.split(',') if e.strip()):
+        symbol, _, timeframe = entry.partition(':')
+        pairs.append((symbol.upper(), (timeframe or 'M1').upper()))
+    return pairs
+
+
+def executor_runner(executor) -> Callable:
+    """Runner that queues terminal calls on the bridge's execution engine"""
+    return lambda func, *args: executor.call(func, *args, priority=PRIORITY_QUERY)
+
+
+def _connect(mt5):
+    """Initialize and log in to the terminal for standalone CLI use"""
+    if not mt5.initialize(path=os.getenv('MT5_PATH', '/opt/mt5')):
+        raise SystemExit(f"MT5 initialization failed: {mt5.last_error()}")
+    login = os.getenv('MT5_LOGIN')
+    if login and not mt5.login(login, os.getenv('MT5_PASSWORD'), os.getenv('MT5_SERVER')):
+        raise SystemExit(f"MT5 login failed: {mt5.last_error()}")
+
+
+def main():
+    import argparse
+    import csv
+
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description='MT5 Bridge local history store')
+    parser.add_argument('--root', default=os.getenv('HISTORY_STORE_PATH', 'mt5_data/history'), help='Store directory')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    sync_parser = subparsers.add_parser('sync', help='Prefill or update series from the terminal')
+    sync_parser.add_argument('series', nargs='+', help='SYMBOL:TIMEFRAME or SYMBOL:ticks')
+    sync_parser.add_argument('--since', type=parse_time, help='Start of an empty series (unix time or ISO date)')
+
+    subparsers.add_parser('info', help='List stored series')
+
+    compact_parser = subparsers.add_parser('compact', help='Sort, deduplicate and trim series')
+    compact_parser.add_argument('series', nargs='+', help='SYMBOL:TIMEFRAME or SYMBOL:ticks')
+    compact_parser.add_argument('--keep-days', type=float, help='Drop rows older than this many days')
+
+    export_parser = subparsers.add_parser('export', help='Write a series range as CSV')
+    export_parser.add_argument('series', help='SYMBOL:TIMEFRAME or SYMBOL:ticks')
+    export_parser.add_argument('output', help='CSV file to write')
+    export_parser.add_argument('--start', type=parse_time, help='Start time (unix time or ISO date)')
+    export_parser.add_argument('--end', type=parse_time, help='End time (unix time or ISO date)')
+
+    args = parser.parse_args()
+
+    if args.command == 'sync':
+        if os.getenv('MT5_BACKEND', 'terminal').lower() == 'simulator':
+            import mt5_simulator as mt5
+        else:
+            import MetaTrader5 as mt5
+        _connect(mt5)
+        store = HistoryStore(args.root, mt5)
+        for symbol, timeframe in parse_series(','.join(args.series)):
+            started = time.perf_counter()
+            added = store.sync(symbol, timeframe, args.since)
+            info = store.series(symbol, timeframe).get_info()
+            print(f"{symbol}:{timeframe} +{added} rows in {time.perf_counter() - started:.2f}s ({info['rows']} stored)")
+        mt5.shutdown()
+
+    elif args.command == 'info':
+        store = HistoryStore(args.root)
+        print(f"{'Series':<20} {'Rows':>12} {'First':<20} {'Last':<20} {'MB':>9}")
+        for info in store.get_info():
+            scale = 1000 if info['timeframe'] == 'TICKS' else 1
+
+            def fmt(value):
+                return _utc(value / scale).strftime('%Y-%m-%d %H:%M:%S') if value is not None else '-'
+            print(f"{info['symbol'] + ':' + info['timeframe']:<20} {info['rows']:>12} {fmt(info['first_time']):<20} "
+                  f"{fmt(info['last_time']):<20} {info['bytes'] / 1e6:>9.1f}")
+
+    elif args.command == 'compact':
+        store = HistoryStore(args.root)
+        for symbol, timeframe in parse_series(','.join(args.series)):
+            result = store.compact(symbol, timeframe, args.keep_days)
+            print(f"{symbol}:{timeframe} {result['rows_before']} -> {result['rows_after']} rows")
+
+    elif args.command == 'export':
+        store = HistoryStore(args.root)
+        (symbol, timeframe), = parse_series(args.series)
+        if timeframe == 'TICKS':
+            data = store.ticks(symbol, args.start, args.end)
+        else:
+            data = store.bars(symbol, timeframe, args.start, args.end)
+        names = list(data)
+        with open(args.output, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(names)
+            writer.writerows(zip(*(data[name].tolist() for name in names)))
+        print(f"Wrote {len(data[names[0]])} rows to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
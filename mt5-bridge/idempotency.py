@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Signal idempotency index for the MT5 Bridge
+Absorbs TradingView and n8n webhook retries so each alert executes only once
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Try to import redis - the local store is used when it is not installed
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+    redis = None
+
+
+class LocalIdempotencyStore:
+    """In-process store with TTL eviction and a hard entry limit"""
+
+    def __init__(self, ttl: float = 86400, max_entries: int = 10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def reserve(self, key: str, record: Dict) -> Optional[Dict]:
+        """Store record under key unless present, returning the existing record"""
+        now = time.monotonic()
+        with self._lock:
+            self._evict(now)
+            existing = self._entries.get(key)
+            if existing:
+                return existing[1]
+
+            self._entries[key] = (now + self.ttl, record)
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return None
+
+    def update(self, key: str, record: Dict):
+        with self._lock:
+            if key in self._entries:
+                self._entries[key] = (self._entries[key][0], record)
+
+    def release(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def size(self) -> int:
+        return len(self._entries)
+
+    def _evict(self, now: float):
+        # Entries share one TTL, so insertion order is also expiry order
+        while self._entries:
+            key, (expires_at, _) = next(iter(self._entries.items()))
+            if expires_at > now:
+                break
+            del self._entries[key]
+
+
+class RedisIdempotencyStore:
+    """Store backed by the redis service, shared across bridge restarts"""
+
+    def __init__(self, url: str, ttl: float = 86400, prefix: str = 'mt5-bridge:signal:'):
+        self.ttl = int(ttl)
+        self.prefix = prefix
+        self.client = redis.Redis.from_url(url, socket_timeout=1.0)
+
+    def reserve(self, key: str, record: Dict) -> Optional[Dict]:
+        if self.client.set(self.prefix + key, json.dumps(record), nx=True, ex=self.ttl):
+            return None
+
+        existing = self.client.get(self.prefix + key)
+        return json.loads(existing) if existing else None
+
+    def update(self, key: str, record: Dict):
+        self.client.set(self.prefix + key, json.dumps(record), xx=True, keepttl=True)
+
+    def release(self, key: str):
+        self.client.delete(self.prefix + key)
+
+    def size(self) -> int:
+        return -1  # Not tracked, the keyspace is shared
+
+
+class SignalDeduplicator:
+    def __init__(self, store):
+        self.store = store
+        self.duplicate_count = 0
+
+    @staticmethod
+    def fingerprint(signal: str, symbol: str, data: Dict) -> Optional[str]:
+        """Build a fingerprint from the strategy bar time and optional client id"""
+        strategy_time = data.get('strategy_time', data.get('timestamp'))
+        client_id = data.get('client_id')
+        if strategy_time is None and client_id is None:
+            return None
+
+        raw = f"{signal}|{symbol}|{strategy_time}|{client_id or ''}"
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def reserve(self, fingerprint: str) -> Optional[Dict]:
+        """Claim a fingerprint, returning the original record for duplicates"""
+        existing = self.store.reserve(fingerprint, {'status': 'pending', 'order_id': None})
+        if existing:
+            self.duplicate_count += 1
+            logger.info(f"Duplicate signal {fingerprint[:12]} absorbed (order {existing.get('order_id')})")
+        return existing
+
+    def update(self, fingerprint: str, record: Dict):
+        self.store.update(fingerprint, record)
+
+    def release(self, fingerprint: str):
+        """Forget a fingerprint whose signal was never executed"""
+        self.store.release(fingerprint)
+
+    def get_stats(self) -> Dict:
+        return {
+            'backend': 'redis' if isinstance(self.store, RedisIdempotencyStore) else 'memory',
+            'entries': self.store.size(),
+            'duplicates': self.duplicate_count
+        }
+
+
+def create_deduplicator(backend: str = 'memory', redis_url: str = 'redis://redis:6379/0',
+                        ttl: float = 86400, max_entries: int = 10000,
+                        prefix: str = 'mt5-bridge:signal:') -> SignalDeduplicator:
+    """Build a deduplicator for the configured backend"""
+    if backend == 'redis':
+        if REDIS_AVAILABLE:
+            try:
+                store = RedisIdempotencyStore(redis_url, ttl=ttl, prefix=prefix)
+                store.client.ping()
+                logger.info(f"Signal idempotency index using redis at {redis_url}")
+                return SignalDeduplicator(store)
+            except Exception as e:
+                logger.warning(f"Redis unavailable ({str(e)}), using local idempotency store")
+        else:
+            logger.warning("redis package not available, using local idempotency store")
+
+    return SignalDeduplicator(LocalIdempotencyStore(ttl=ttl, max_entries=max_entries))
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Off-thread logging pipeline for the MT5 Bridge
+Request and execution threads only enqueue records. A listener thread per stream
+formats them as JSON lines and writes them to size- and time-rotated files, which
+are gzip-compressed in the background. Queues are bounded: when the disk falls
+behind, records are dropped and counted instead of stalling order execution.
+
+Streams:
+    logs/mt5_bridge.log   diagnostics from every module (also echoed to the console)
+    logs/audit.log        one event per signal received, order submitted and order result
+"""
+
+import copy
+import gzip
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import shutil
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List
+
+AUDIT_LOGGER = 'audit'
+
+audit_logger = logging.getLogger(AUDIT_LOGGER)
+
+# LogRecord attributes that are not user supplied fields
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+
+def audit(event: str, **fields):
+    """Record an order lifecycle event on the audit stream"""
+    audit_logger.info(event, extra={'event': event, 'fields': fields})
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, with any `extra` fields merged in"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'message': record.getMessage()
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                if key == 'fields' and isinstance(value, dict):
+                    entry.update(value)
+                else:
+                    entry[key] = value
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class BoundedQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that drops records instead of blocking when the queue is full"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Only resolve what cannot cross threads; JSON formatting happens on the listener
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class CompressingRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """Rotates on size or at every interval boundary (UTC), gzipping old files off-thread
+
+    Rotated files are named by rotation time (mt5_bridge.log.20240601-000000-000000.gz)
+    rather than renumbered, so a rotation never renames a file still being compressed.
+    """
+
+    def __init__(self, filename: str, max_bytes: int, backup_count: int, interval: float):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8', delay=True)
+        self.interval = interval
+        start = os.stat(self.baseFilename).st_mtime if os.path.exists(self.baseFilename) else time.time()
+        self.rollover_at = self._next_boundary(start)
+
+        self._pending = queue.Queue()
+        threading.Thread(target=self._compress_loop, name='log-compress', daemon=True).start()
+        # Rotations a previous process did not get to compress
+        for name in self._rotated_files():
+            if not name.endswith('.gz'):
+                self._pending.put(name)
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if self.interval > 0 and record.created >= self.rollover_at:
+            return True
+        return bool(super().shouldRollover(record))
+
+    def doRollover(self):
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+        if os.path.exists(self.baseFilename) and os.path.getsize(self.baseFilename) > 0:
+            rotated = f"{self.baseFilename}.{datetime.now(timezone.utc).strftime('%Y%m%d-%H%M%S-%f')}"
+            os.replace(self.baseFilename, rotated)
+            self._pending.put(rotated)
+        self.rollover_at = self._next_boundary(time.time())
+
+    def _next_boundary(self, timestamp: float) -> float:
+        if self.interval <= 0:
+            return float('inf')
+        return (timestamp // self.interval + 1) * self.interval
+
+    def _rotated_files(self) -> List[str]:
+        directory, base = os.path.split(self.baseFilename)
+        return sorted(
+            os.path.join(directory, name) for name in os.listdir(directory or '.')
+            if name.startswith(base + '.') and name[len(base) + 1:len(base) + 2].isdigit()
+        )
+
+    def _compress_loop(self):
+        while True:
+            source = self._pending.get()
+            try:
+                with open(source, 'rb') as src, gzip.open(source + '.gz', 'wb') as dst:
+                    shutil.copyfileobj(src, dst)
+                os.remove(source)
+                # Names sort by rotation time, so the oldest backups come first
+                backups = [name for name in self._rotated_files() if name.endswith('.gz')]
+                for name in backups[:max(0, len(backups) - self.backupCount)]:
+                    os.remove(name)
+            except OSError as e:
+                logging.getLogger(__name__).error(f"Log compression failed for {source}: {str(e)}")
+
+
+class LogPipeline:
+    """Owns the diagnostic and audit queues and their listener threads"""
+
+    def __init__(self, log_dir: str = 'logs', level: str = 'INFO', queue_size: int = 10000,
+                 max_bytes: int = 50 * 1024 * 1024, backup_count: int = 10, interval: float = 86400,
+                 console: bool = True):
+        os.makedirs(log_dir, exist_ok=True)
+        self.handlers: Dict[str, BoundedQueueHandler] = {}
+        self._listeners: List[logging.handlers.QueueListener] = []
+
+        json_formatter = JsonFormatter()
+
+        diagnostic_file = CompressingRotatingFileHandler(
+            os.path.join(log_dir, 'mt5_bridge.log'), max_bytes, backup_count, interval)
+        diagnostic_file.setFormatter(json_formatter)
+        outputs = [diagnostic_file]
+        if console:
+            console_handler = logging.StreamHandler()
+            console_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+            outputs.append(console_handler)
+        self._add_stream('diagnostic', logging.getLogger(), outputs, queue_size)
+
+        audit_file = CompressingRotatingFileHandler(
+            os.path.join(log_dir, 'audit.log'), max_bytes, backup_count, interval)
+        audit_file.setFormatter(json_formatter)
+        # Audit events have their own queue so a diagnostic flood cannot drop them
+        audit_logger.propagate = False
+        audit_logger.setLevel(logging.INFO)
+        self._add_stream('audit', audit_logger, [audit_file], queue_size)
+
+        logging.getLogger().setLevel(getattr(logging, level.upper(), logging.INFO))
+
+    def _add_stream(self, name: str, target: logging.Logger, outputs: List[logging.Handler], queue_size: int):
+        log_queue = queue.Queue(maxsize=queue_size)
+        handler = BoundedQueueHandler(log_queue)
+        # Replace whatever basicConfig or a previous pipeline installed
+        for existing in list(target.handlers):
+            target.removeHandler(existing)
+        target.addHandler(handler)
+
+        listener = logging.handlers.QueueListener(log_queue, *outputs, respect_handler_level=True)
+        listener.start()
+        self.handlers[name] = handler
+        self._listeners.append(listener)
+
+    def stop(self):
+        """Flush queued records and stop the listener threads"""
+        for listener in self._listeners:
+            listener.stop()
+            for handler in listener.handlers:
+                handler.close()
+        self._listeners = []
+
+    @property
+    def dropped(self) -> int:
+        return sum(handler.dropped for handler in self.handlers.values())
+
+    def get_stats(self) -> Dict:
+        return {
+            name: {'queued': handler.queue.qsize(), 'dropped': handler.dropped}
+            for name, handler in self.handlers.items()
+        }
+
+
+def setup_logging(log_dir: str = 'logs') -> LogPipeline:
+    """Build the pipeline from LOG_* environment variables"""
+    return LogPipeline(
+        log_dir=log_dir,
+        level=os.getenv('LOG_LEVEL', 'INFO'),
+        queue_size=int(os.getenv('LOG_QUEUE_SIZE', '10000')),
+        max_bytes=int(float(os.getenv('LOG_MAX_MB', '50')) * 1024 * 1024),
+        backup_count=int(os.getenv('LOG_BACKUP_COUNT', '10')),
+        interval=float(os.getenv('LOG_ROTATE_INTERVAL', '86400')),
+        console=os.getenv('LOG_CONSOLE', 'true').lower() == 'true'
+    )
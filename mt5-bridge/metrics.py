@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Latency metrics for the MT5 Bridge
+Low-overhead histograms and counters rendered in Prometheus text format
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Sequence, Tuple
+
+# Seconds, from sub-millisecond cache hits up to slow broker round-trips
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: Sequence[str], values: Tuple, extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        """Record one observation, in seconds"""
+        key = tuple(str(labels.get(name, '')) for name in self.label_names)
+        index = bisect.bisect_left(self.buckets, value)
+
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # Per-bucket counts, cumulated only when rendered; last slot is +Inf
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} histogram'
+
+        with self._lock:
+            snapshot = [(key, list(counts), total, count) for key, (counts, total, count) in self._series.items()]
+
+        for key, counts, total, count in snapshot:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.label_names, key, 'le="%s"' % bound)
+                yield f'{self.name}_bucket{labels} {cumulative}'
+            labels = _format_labels(self.label_names, key, 'le="+Inf"')
+            yield f'{self.name}_bucket{labels} {count}'
+            labels = _format_labels(self.label_names, key)
+            yield f'{self.name}_sum{labels} {total}'
+            yield f'{self.name}_count{labels} {count}'
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} counter'
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield f'{self.name}{_format_labels(self.label_names, key)} {value}'
+
+
+class CallbackMetric:
+    """Gauge or counter whose value is read from the owning component at scrape time"""
+
+    def __init__(self, name: str, documentation: str, func: Callable[[], float], metric_type: str = 'gauge'):
+        self.name = name
+        self.documentation = documentation
+        self.func = func
+        self.metric_type = metric_type
+
+    def render(self):
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} {self.metric_type}'
+        yield f'{self.name} {self.func()}'
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None and not isinstance(metric, CallbackMetric):
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def histogram(self, name: str, documentation: str, label_names: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, label_names, buckets))
+
+    def counter(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, label_names))
+
+    def callback(self, name: str, documentation: str, func: Callable[[], float],
+                 metric_type: str = 'gauge') -> CallbackMetric:
+        return self._register(CallbackMetric(name, documentation, func, metric_type))
+
+    def render(self) -> str:
+        """Render every metric in Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    'mt5_bridge_stage_seconds',
+    'Time spent per signal processing stage',
+    ['stage', 'symbol', 'signal', 'retcode']
+)
+
+SIGNAL_SECONDS = REGISTRY.histogram(
+    'mt5_bridge_signal_seconds',
+    'Time from webhook receipt to response',
+    ['endpoint', 'signal', 'status']
+)
+
+QUEUE_WAIT_SECONDS = REGISTRY.histogram(
+    'mt5_bridge_queue_wait_seconds',
+    'Time tasks wait in the execution queue before running',
+    ['priority']
+)
+
+ORDER_RESULTS = REGISTRY.counter(
+    'mt5_bridge_order_results_total',
+    'order_send results by MT5 retcode',
+    ['symbol', 'signal', 'retcode']
+)
+
+
+@contextmanager
+def timed(stage: str, **labels):
+    """Record how long the wrapped block took as one stage observation"""
+    start = time.perf_counter()
+    try:
+        yield labels
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=stage, **labels)
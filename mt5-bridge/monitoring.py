@@ -2,15 +2,32 @@
 """
 Monitoring script for MT5 Bridge Service
 Provides health checks, metrics, and alerting
+
+Each check is a single GET /status over a pooled keep-alive session. One process can
+watch many bridges: MonitorPool probes them concurrently on a fixed schedule, and a
+bridge whose previous probe is still running skips the tick instead of delaying the others.
+
+Response time, equity, margin level and open positions are kept per bridge in
+fixed-size ring buffers (raw samples, 1-minute and 1-hour buckets). Alerts are
+judged on the rolling p95 response time and equity drawdown from its peak, and
+the series can be read back over HTTP with --serve-port.
 """
 
 import os
 import time
 import logging
+import threading
 import requests
 import json
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+from requests.adapters import HTTPAdapter
+
+from timeseries import TimeSeriesStore
 
 # Configure logging
 logging.basicConfig(
@@ -19,23 +36,134 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+def create_session(pool_size: int = 10) -> requests.Session:
+    """Keep-alive session with a connection pool per bridge host"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
 class MT5Monitor:
-    def __init__(self, bridge_url: str = "http://localhost:5000"):
+    def __init__(self, bridge_url: str = "http://localhost:5000", session: Optional[requests.Session] = None,
+                 timeout: float = 10, store: Optional[TimeSeriesStore] = None):
         self.bridge_url = bridge_url.rstrip('/')
+        self.session = session or create_session()
+        self.timeout = timeout
         self.alert_thresholds = {
-            'max_response_time': 5.0,  # seconds
+            'max_response_time': 5.0,  # seconds, p95 over the response time window
+            'response_time_window': 300,  # seconds
             'min_account_balance': 100.0,  # USD
+            'max_drawdown_percent': 10.0,  # equity below its peak over the drawdown window
+            'drawdown_window': 86400,  # seconds
+            'min_margin_level': 150.0,  # percent, only while margin is used
             'max_positions': 10,  # maximum open positions
         }
+        # Response time, equity, margin level and open positions history
+        self.store = store or TimeSeriesStore()
         self.last_check = None
         self.error_count = 0
         self.max_errors = 5
 
+        # Last ETag and body per endpoint, unchanged snapshots come back as 304
+        self._etag_cache = {}
+        # Bridges older than /status are checked through /health, /account and /positions
+        self._legacy = False
+        # Alerts currently raised, so a condition is reported once rather than on every check
+        self.active_alerts = set()
+
+    def _get_json(self, path: str, timeout: float = 5) -> Optional[Dict]:
+        """GET a bridge endpoint, reusing the cached body when its ETag still matches"""
+        headers = {}
+        cached = self._etag_cache.get(path)
+        if cached:
+            headers['If-None-Match'] = cached[0]
+
+        response = self.session.get(f"{self.bridge_url}{path}", headers=headers, timeout=timeout)
+        if response.status_code == 304 and cached:
+            return cached[1]
+        if response.status_code != 200:
+            return None
+
+        data = response.json()
+        etag = response.headers.get('ETag')
+        if etag:
+            self._etag_cache[path] = (etag, data)
+        return data
+
     def check_health(self) -> Dict:
-        """Check overall system health"""
+        """Check overall system health and record its samples"""
+        health_data = self._check_health_legacy() if self._legacy else self._check_status()
+        self.record(health_data)
+        return health_data
+
+    def record(self, health_data: Dict):
+        """Add one check's samples to the time series"""
+        now = time.time()
+        details = health_data.get('details', {})
+        checks = details.get('checks', {})
+        self.store.record('response_time', details.get('response_time'), now)
+        self.store.record('equity', checks.get('account_equity'), now)
+        if checks.get('account_margin'):
+            # MT5 reports a margin level of 0 while no margin is used
+            self.store.record('margin_level', checks.get('margin_level'), now)
+        self.store.record('open_positions', checks.get('open_positions'), now)
+
+    def _check_status(self) -> Dict:
+        """Health check through /status"""
         try:
             start_time = time.time()
-            response = requests.get(f"{self.bridge_url}/health", timeout=10)
+            response = self.session.get(f"{self.bridge_url}/status", timeout=self.timeout)
+            response_time = time.time() - start_time
+
+            if response.status_code == 404:
+                logger.info(f"{self.bridge_url} has no /status endpoint, using /health")
+                self._legacy = True
+                return self._check_health_legacy()
+
+            if response.status_code == 200:
+                status = response.json()
+                account = status.get('account') or {}
+                status['response_time'] = response_time
+                status['timestamp'] = datetime.now().isoformat()
+                if account:
+                    status['checks'] = {
+                        'account_balance': account.get('balance', 0),
+                        'account_equity': account.get('equity', 0),
+                        'account_margin': account.get('margin', 0),
+                        'margin_level': account.get('margin_level', 0),
+                        'open_positions': status.get('positions', {}).get('count', 0)
+                    }
+                else:
+                    status['checks'] = {'account_check': 'failed',
+                                        'open_positions': status.get('positions', {}).get('count', 0)}
+
+                return {
+                    'status': 'healthy' if status.get('status') == 'healthy' else 'unhealthy',
+                    'details': status
+                }
+            else:
+                return {
+                    'status': 'unhealthy',
+                    'details': {
+                        'error': f'HTTP {response.status_code}',
+                        'response_time': response_time
+                    }
+                }
+
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Health check failed for {self.bridge_url}: {str(e)}")
+            return {
+                'status': 'unhealthy',
+                'details': {'error': str(e)}
+            }
+
+    def _check_health_legacy(self) -> Dict:
+        """Health check against bridges without /status"""
+        try:
+            start_time = time.time()
+            response = self.session.get(f"{self.bridge_url}/health", timeout=self.timeout)
             response_time = time.time() - start_time
 
             if response.status_code == 200:
@@ -60,7 +188,7 @@ class MT5Monitor:
                 }
 
         except requests.exceptions.RequestException as e:
-            logger.error(f"Health check failed: {str(e)}")
+            logger.error(f"Health check failed for {self.bridge_url}: {str(e)}")
             return {
                 'status': 'unhealthy',
                 'details': {'error': str(e)}
@@ -72,12 +200,12 @@ class MT5Monitor:
 
         try:
             # Check account info
-            account_response = requests.get(f"{self.bridge_url}/account", timeout=5)
-            if account_response.status_code == 200:
-                account_data = account_response.json()
+            account_data = self._get_json('/account')
+            if account_data is not None:
                 checks['account_balance'] = account_data.get('balance', 0)
                 checks['account_equity'] = account_data.get('equity', 0)
                 checks['account_margin'] = account_data.get('margin', 0)
+                checks['margin_level'] = account_data.get('margin_level', 0)
             else:
                 checks['account_check'] = 'failed'
 
@@ -86,9 +214,8 @@ class MT5Monitor:
 
         try:
             # Check positions
-            positions_response = requests.get(f"{self.bridge_url}/positions", timeout=5)
-            if positions_response.status_code == 200:
-                positions_data = positions_response.json()
+            positions_data = self._get_json('/positions')
+            if positions_data is not None:
                 checks['open_positions'] = len(positions_data.get('positions', []))
             else:
                 checks['positions_check'] = 'failed'
@@ -106,18 +233,41 @@ class MT5Monitor:
             alerts.append("MT5 Bridge service is unhealthy")
 
         details = health_data.get('details', {})
-        response_time = details.get('response_time', 0)
-        if response_time > self.alert_thresholds['max_response_time']:
-            alerts.append(".2f")
+        thresholds = self.alert_thresholds
+        now = time.time()
+
+        # Rolling p95, so one slow request does not alert but a sustained slowdown does
+        p95 = self.store.get('response_time').percentile(95, thresholds['response_time_window'], now)
+        if p95 is not None and p95 > thresholds['max_response_time']:
+            alerts.append(f"Slow responses: p95 {p95:.2f}s over {thresholds['response_time_window']}s "
+                          f"(limit {thresholds['max_response_time']:.2f}s)")
+
+        connection = details.get('connection') or {}
+        if connection.get('breaker') == 'open':
+            alerts.append(f"MT5 terminal disconnected for {connection.get('current_downtime_seconds', 0):.0f}s "
+                          f"({connection.get('reconnect_attempts', 0)} reconnect attempts)")
 
         checks = details.get('checks', {})
 
-        account_balance = checks.get('account_balance', 0)
-        if account_balance < self.alert_thresholds['min_account_balance']:
-            alerts.append(".2f")
+        account_balance = checks.get('account_balance')
+        if account_balance is not None and account_balance < thresholds['min_account_balance']:
+            alerts.append(f"Account balance {account_balance:.2f} below minimum "
+                          f"{thresholds['min_account_balance']:.2f}")
+
+        equity = self.store.get('equity')
+        peak = equity.peak(thresholds['drawdown_window'], now)
+        current = equity.last()
+        if peak and current is not None:
+            drawdown = (peak - current) / peak * 100
+            if drawdown > thresholds['max_drawdown_percent']:
+                alerts.append(f"Equity drawdown {drawdown:.1f}% from peak {peak:.2f} (now {current:.2f})")
+
+        margin_level = checks.get('margin_level')
+        if checks.get('account_margin') and margin_level is not None and margin_level < thresholds['min_margin_level']:
+            alerts.append(f"Margin level {margin_level:.1f}% below {thresholds['min_margin_level']:.0f}%")
 
         open_positions = checks.get('open_positions', 0)
-        if open_positions > self.alert_thresholds['max_positions']:
+        if open_positions > thresholds['max_positions']:
             alerts.append(f"Too many open positions: {open_positions}")
 
         return alerts
@@ -127,7 +277,7 @@ class MT5Monitor:
         # This is a placeholder for alert mechanisms
         # You can integrate with email, Telegram, Slack, etc.
 
-        logger.warning(f"ALERT: {message}")
+        logger.warning(f"ALERT [{self.bridge_url}]: {message}")
 
         # Example: Send email alert
         # import smtplib
@@ -138,40 +288,34 @@ class MT5Monitor:
         # chat_id = os.getenv('TELEGRAM_CHAT_ID')
         # ... telegram sending code ...
 
-    def run_monitoring_loop(self, interval: int = 60):
-        """Run continuous monitoring loop"""
-        logger.info(f"Starting monitoring loop with {interval}s interval")
-
-        while True:
-            try:
-                # Perform health check
-                health_data = self.check_health()
-                self.last_check = datetime.now()
-
-                # Log health status
-                if health_data['status'] == 'healthy':
-                    logger.info("System health: OK")
-                    self.error_count = 0
-                else:
-                    logger.error(f"System health: FAILED - {health_data}")
-                    self.error_count += 1
-
-                # Check for alerts
-                alerts = self.check_alerts(health_data)
-                for alert in alerts:
-                    self.send_alert(alert)
-
-                # Stop monitoring if too many errors
-                if self.error_count >= self.max_errors:
-                    logger.critical(f"Too many consecutive errors ({self.error_count}). Stopping monitoring.")
-                    break
-
-            except Exception as e:
-                logger.error(f"Monitoring error: {str(e)}")
-                self.error_count += 1
+    def probe(self) -> Dict:
+        """Run one check, log state changes and send newly raised alerts"""
+        health_data = self.check_health()
+        self.last_check = datetime.now()
 
-            # Wait for next check
-            time.sleep(interval)
+        # Log health status
+        if health_data['status'] == 'healthy':
+            if self.error_count:
+                logger.info(f"{self.bridge_url} health: OK")
+            else:
+                logger.debug(f"{self.bridge_url} health: OK")
+            self.error_count = 0
+        else:
+            logger.error(f"{self.bridge_url} health: FAILED - {health_data}")
+            self.error_count += 1
+
+        # Check for alerts
+        alerts = set(self.check_alerts(health_data))
+        for alert in alerts - self.active_alerts:
+            self.send_alert(alert)
+        for alert in self.active_alerts - alerts:
+            logger.info(f"RESOLVED: {alert}")
+        self.active_alerts = alerts
+        return health_data
+
+    def run_monitoring_loop(self, interval: float = 60):
+        """Run continuous monitoring loop"""
+        MonitorPool([self], interval).run()
 
     def get_system_stats(self) -> Dict:
         """Get comprehensive system statistics"""
@@ -212,25 +356,167 @@ class MT5Monitor:
         except:
             return "unknown"
 
+class MonitorPool:
+    """Probes many bridges concurrently at a fixed rate"""
+
+    def __init__(self, monitors: List[MT5Monitor], interval: float = 60, max_workers: Optional[int] = None):
+        self.monitors = monitors
+        self.interval = interval
+        self._executor = ThreadPoolExecutor(max_workers=max_workers or min(64, len(monitors) * 2),
+                                            thread_name_prefix='monitor-probe')
+        self._in_flight = {}
+        self._stop_event = threading.Event()
+
+        self.tick_count = 0
+        # Ticks a bridge sat out because its previous probe had not returned yet
+        self.skipped = {m.bridge_url: 0 for m in monitors}
+        # Ticks the scheduler itself fell behind on
+        self.late_ticks = 0
+
+    def stop(self):
+        self._stop_event.set()
+
+    def tick(self):
+        """Start a probe for every bridge that is not still busy with the previous one"""
+        self.tick_count += 1
+        for monitor in self.monitors:
+            future = self._in_flight.get(monitor.bridge_url)
+            if future and not future.done():
+                self.skipped[monitor.bridge_url] += 1
+                continue
+            self._in_flight[monitor.bridge_url] = self._executor.submit(self._probe, monitor)
+
+    def _probe(self, monitor: MT5Monitor):
+        try:
+            monitor.probe()
+        except Exception as e:
+            logger.error(f"Monitoring error for {monitor.bridge_url}: {str(e)}")
+            monitor.error_count += 1
+
+        # Stop monitoring a bridge after too many errors
+        if monitor.error_count >= monitor.max_errors:
+            logger.critical(f"Too many consecutive errors ({monitor.error_count}) for {monitor.bridge_url}. "
+                            f"Stopping monitoring.")
+            self.monitors = [m for m in self.monitors if m is not monitor]
+            if not self.monitors:
+                self.stop()
+
+    def run(self):
+        """Tick until stopped or no bridges are left"""
+        logger.info(f"Starting monitoring loop for {len(self.monitors)} bridge(s) with {self.interval}s interval")
+        next_tick = time.monotonic()
+        try:
+            while not self._stop_event.is_set():
+                self.tick()
+                next_tick += self.interval
+                now = time.monotonic()
+                if now > next_tick:
+                    # Keep the schedule fixed-rate, dropping ticks rather than bunching them up
+                    missed = int((now - next_tick) // self.interval) + 1
+                    self.late_ticks += missed
+                    next_tick += missed * self.interval
+                self._stop_event.wait(next_tick - now)
+        finally:
+            self._executor.shutdown(wait=False)
+
+    def get_stats(self) -> Dict:
+        return {
+            'bridges': [m.bridge_url for m in self.monitors],
+            'ticks': self.tick_count,
+            'late_ticks': self.late_ticks,
+            'skipped': dict(self.skipped)
+        }
+
+
+def serve_series(monitors: List[MT5Monitor], port: int, host: str = '127.0.0.1') -> ThreadingHTTPServer:
+    """Serve the monitors' time series as JSON in a background thread
+
+    GET /series                                   series sizes and active alerts per bridge
+    GET /series?resolution=1m&metric=equity       points for every bridge
+        &bridge=<url>&since=<unix time>           optional filters
+    """
+    by_url = {m.bridge_url: m for m in monitors}
+
+    class SeriesHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path.rstrip('/') != '/series':
+                return self._send(404, {'error': 'Not found'})
+            query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            bridge = query.get('bridge', '').rstrip('/')
+            if bridge and bridge not in by_url:
+                return self._send(404, {'error': f"Unknown bridge: {bridge}"})
+            selected = [by_url[bridge]] if bridge else list(by_url.values())
+
+            if 'resolution' not in query and 'metric' not in query:
+                return self._send(200, {m.bridge_url: {'series': m.store.get_stats(),
+                                                       'active_alerts': sorted(m.active_alerts)}
+                                        for m in selected})
+            try:
+                since = float(query['since']) if 'since' in query else None
+                metrics = query['metric'].split(',') if query.get('metric') else None
+                body = {m.bridge_url: m.store.dump(query.get('resolution', 'raw'), metrics, since)
+                        for m in selected}
+            except ValueError as e:
+                return self._send(400, {'error': str(e)})
+            self._send(200, body)
+
+        def _send(self, status: int, body: Dict):
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            logger.debug(format % args)
+
+    server = ThreadingHTTPServer((host, port), SeriesHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='monitor-series', daemon=True).start()
+    logger.info(f"Serving time series on http://{host}:{port}/series")
+    return server
+
+
 def main():
     """Main monitoring function"""
     import argparse
 
     parser = argparse.ArgumentParser(description='MT5 Bridge Monitoring')
-    parser.add_argument('--url', default='http://localhost:5000', help='MT5 Bridge URL')
-    parser.add_argument('--interval', type=int, default=60, help='Monitoring interval in seconds')
+    parser.add_argument('--url', action='append',
+                        help='MT5 Bridge URL, repeat or comma-separate to watch several (default http://localhost:5000)')
+    parser.add_argument('--interval', type=float, default=60, help='Monitoring interval in seconds (may be fractional)')
+    parser.add_argument('--timeout', type=float, default=10, help='Per-request timeout in seconds')
     parser.add_argument('--once', action='store_true', help='Run single check and exit')
+    parser.add_argument('--history-size', type=int, default=3600,
+                        help='Raw samples kept per series (1-minute and 1-hour buckets are kept for 24h and 30 days)')
+    parser.add_argument('--serve-port', type=int, default=0, help='Serve the time series on this port (0 = off)')
+    parser.add_argument('--serve-host', default='127.0.0.1', help='Address for --serve-port')
 
     args = parser.parse_args()
 
-    monitor = MT5Monitor(args.url)
+    urls = list(dict.fromkeys(
+        u.strip() for value in (args.url or ['http://localhost:5000']) for u in value.split(',') if u.strip()))
+    # Sub-second probing should not wait longer than a couple of intervals on a stuck bridge
+    timeout = min(args.timeout, max(args.interval * 2, 1.0)) if not args.once else args.timeout
+    session = create_session(pool_size=max(10, len(urls)))
+    monitors = [MT5Monitor(url, session=session, timeout=timeout, store=TimeSeriesStore(raw_size=args.history_size))
+                for url in urls]
 
     if args.once:
-        # Single check mode
-        health = monitor.check_health()
-        print(json.dumps(health, indent=2))
+        # Single check mode, all bridges at once
+        with ThreadPoolExecutor(max_workers=min(64, len(monitors))) as executor:
+            results = list(executor.map(lambda m: m.check_health(), monitors))
+
+        alerts = []
+        for monitor, health in zip(monitors, results):
+            alerts.extend(f"{monitor.bridge_url}: {a}" if len(monitors) > 1 else a for a in monitor.check_alerts(health))
+        if len(monitors) == 1:
+            print(json.dumps(results[0], indent=2))
+        else:
+            print(json.dumps({m.bridge_url: h for m, h in zip(monitors, results)}, indent=2))
 
-        alerts = monitor.check_alerts(health)
         if alerts:
             print("\nAlerts:")
             for alert in alerts:
@@ -241,7 +527,9 @@ def main():
             exit(0)
     else:
         # Continuous monitoring
-        monitor.run_monitoring_loop(args.interval)
+        if args.serve_port:
+            serve_series(monitors, args.serve_port, args.serve_host)
+        MonitorPool(monitors, args.interval).run()
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,688 @@
+#!/usr/bin/env python3
+"""
+Simulated MetaTrader5 backend for the MT5 Bridge
+Drop-in replacement for the MetaTrader5 module so the order path can be tested and
+benchmarked without a broker. Select it with MT5_BACKEND=simulator.
+
+Configuration (environment):
+    SIM_SYMBOLS          Comma separated symbols (default EURUSD,GBPUSD,USDJPY,XAUUSD)
+    SIM_BALANCE          Starting balance in USD (default 10000)
+    SIM_LEVERAGE         Account leverage (default 100)
+    SIM_MARGIN_MODE      hedging or netting (default hedging)
+    SIM_TICKS_FILE       CSV of time,symbol,bid,ask to replay instead of a random walk
+    SIM_VOLATILITY       Annualised volatility of the synthetic feed (default 0.1)
+    SIM_LATENCY_MS       Mean order_send latency in milliseconds (default 0)
+    SIM_LATENCY_JITTER_MS  Uniform jitter added to the latency (default 0)
+    SIM_REQUOTE_RATE     Probability an order is requoted (default 0)
+    SIM_REJECT_RATE      Probability an order is rejected by the dealer (default 0)
+    SIM_SEED             Random seed for reproducible runs
+    SIM_BAR_HISTORY      Closed bars available per symbol and timeframe (default 5000)
+    SIM_TICK_HISTORY     Quotes kept per symbol for copy_ticks_range (default 100000)
+"""
+
+import csv
+import math
+import os
+import random
+import threading
+import time
+from bisect import bisect_right
+from collections import deque, namedtuple
+from datetime import datetime, timezone
+
+import numpy as np
+
+# Trade actions
+TRADE_ACTION_DEAL = 1
+TRADE_ACTION_PENDING = 5
+TRADE_ACTION_SLTP = 6
+TRADE_ACTION_MODIFY = 7
+TRADE_ACTION_REMOVE = 8
+TRADE_ACTION_CLOSE_BY = 10
+
+# Order and position types
+ORDER_TYPE_BUY = 0
+ORDER_TYPE_SELL = 1
+POSITION_TYPE_BUY = 0
+POSITION_TYPE_SELL = 1
+DEAL_TYPE_BUY = 0
+DEAL_TYPE_SELL = 1
+DEAL_ENTRY_IN = 0
+DEAL_ENTRY_OUT = 1
+DEAL_ENTRY_OUT_BY = 3
+
+# Filling and expiration
+ORDER_FILLING_FOK = 0
+ORDER_FILLING_IOC = 1
+ORDER_FILLING_RETURN = 2
+ORDER_TIME_GTC = 0
+SYMBOL_FILLING_FOK = 1
+SYMBOL_FILLING_IOC = 2
+SYMBOL_TRADE_EXECUTION_MARKET = 2
+SYMBOL_ORDER_MARKET = 1
+SYMBOL_ORDER_CLOSEBY = 64
+
+# Account margin modes
+ACCOUNT_MARGIN_MODE_RETAIL_NETTING = 0
+ACCOUNT_MARGIN_MODE_EXCHANGE = 1
+ACCOUNT_MARGIN_MODE_RETAIL_HEDGING = 2
+
+# Trade server return codes
+TRADE_RETCODE_REQUOTE = 10004
+TRADE_RETCODE_REJECT = 10006
+TRADE_RETCODE_DONE = 10009
+TRADE_RETCODE_INVALID = 10013
+TRADE_RETCODE_INVALID_VOLUME = 10014
+TRADE_RETCODE_INVALID_PRICE = 10015
+TRADE_RETCODE_INVALID_STOPS = 10016
+TRADE_RETCODE_NO_MONEY = 10019
+TRADE_RETCODE_PRICE_CHANGED = 10020
+TRADE_RETCODE_PRICE_OFF = 10021
+TRADE_RETCODE_INVALID_FILL = 10030
+TRADE_RETCODE_POSITION_CLOSED = 10036
+
+# Timeframes
+TIMEFRAME_M1 = 1
+TIMEFRAME_M5 = 5
+TIMEFRAME_M15 = 15
+TIMEFRAME_M30 = 30
+TIMEFRAME_H1 = 16385
+TIMEFRAME_H4 = 16388
+TIMEFRAME_D1 = 16408
+
+TIMEFRAME_SECONDS = {
+    TIMEFRAME_M1: 60, TIMEFRAME_M5: 300, TIMEFRAME_M15: 900, TIMEFRAME_M30: 1800,
+    TIMEFRAME_H1: 3600, TIMEFRAME_H4: 14400, TIMEFRAME_D1: 86400
+}
+
+# copy_ticks_* flags
+COPY_TICKS_ALL = -1
+COPY_TICKS_INFO = 1
+COPY_TICKS_TRADE = 2
+
+# last_error() codes
+RES_S_OK = 1
+RES_E_INVALID_PARAMS = -2
+RES_E_NOT_FOUND = -4
+RES_E_INTERNAL_FAIL = -10000
+
+AccountInfo = namedtuple('AccountInfo', [
+    'login', 'trade_mode', 'leverage', 'margin_mode', 'currency', 'server', 'balance',
+    'credit', 'profit', 'equity', 'margin', 'margin_free', 'margin_level'
+])
+TerminalInfo = namedtuple('TerminalInfo', ['connected', 'trade_allowed', 'ping_last', 'name', 'build'])
+SymbolInfo = namedtuple('SymbolInfo', [
+    'name', 'visible', 'select', 'time', 'bid', 'ask', 'spread', 'digits', 'point',
+    'volume_min', 'volume_max', 'volume_step', 'filling_mode', 'order_mode',
+    'trade_exemode', 'trade_stops_level', 'trade_contract_size', 'currency_base', 'currency_profit'
+])
+Tick = namedtuple('Tick', ['time', 'bid', 'ask', 'last', 'volume', 'time_msc', 'flags', 'volume_real'])
+TradePosition = namedtuple('TradePosition', [
+    'ticket', 'time', 'time_msc', 'type', 'magic', 'identifier', 'volume', 'price_open',
+    'sl', 'tp', 'price_current', 'swap', 'profit', 'symbol', 'comment'
+])
+TradeOrder = namedtuple('TradeOrder', [
+    'ticket', 'time_setup', 'type', 'magic', 'volume_initial', 'volume_current',
+    'price_open', 'sl', 'tp', 'symbol', 'comment'
+])
+TradeDeal = namedtuple('TradeDeal', [
+    'ticket', 'order', 'time', 'time_msc', 'type', 'entry', 'magic', 'position_id',
+    'volume', 'price', 'commission', 'swap', 'profit', 'fee', 'symbol', 'comment'
+])
+OrderSendResult = namedtuple('OrderSendResult', [
+    'retcode', 'deal', 'order', 'volume', 'price', 'bid', 'ask', 'comment', 'request_id',
+    'retcode_external', 'request'
+])
+
+# Contract defaults per symbol: (price, spread in points, digits, contract size, filling modes)
+SYMBOL_DEFAULTS = {
+    'EURUSD': (1.08500, 10, 5, 100000, SYMBOL_FILLING_FOK | SYMBOL_FILLING_IOC),
+    'GBPUSD': (1.26500, 14, 5, 100000, SYMBOL_FILLING_FOK | SYMBOL_FILLING_IOC),
+    'USDJPY': (150.000, 12, 3, 100000, SYMBOL_FILLING_FOK | SYMBOL_FILLING_IOC),
+    'XAUUSD': (2000.00, 30, 2, 100, SYMBOL_FILLING_FOK),
+}
+
+SECONDS_PER_YEAR = 365 * 24 * 3600
+
+RATE_DTYPE = np.dtype([
+    ('time', '<i8'), ('open', '<f8'), ('high', '<f8'), ('low', '<f8'), ('close', '<f8'),
+    ('tick_volume', '<u8'), ('spread', '<i4'), ('real_volume', '<u8')
+])
+TICK_DTYPE = np.dtype([
+    ('time', '<i8'), ('bid', '<f8'), ('ask', '<f8'), ('last', '<f8'), ('volume', '<u8'),
+    ('time_msc', '<i8'), ('flags', '<u4'), ('volume_real', '<f8')
+])
+
+
+class SimulatedTerminal:
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.random = random.Random(os.getenv('SIM_SEED'))
+        self.connected = False
+        self.error = (RES_S_OK, 'Success')
+
+        self.leverage = int(os.getenv('SIM_LEVERAGE', '100'))
+        self.margin_mode = (ACCOUNT_MARGIN_MODE_RETAIL_NETTING
+                            if os.getenv('SIM_MARGIN_MODE', 'hedging').lower() == 'netting'
+                            else ACCOUNT_MARGIN_MODE_RETAIL_HEDGING)
+        self.balance = float(os.getenv('SIM_BALANCE', '10000'))
+        self.login_id = 0
+        self.server = 'Simulator'
+
+        self.volatility = float(os.getenv('SIM_VOLATILITY', '0.1'))
+        self.latency = float(os.getenv('SIM_LATENCY_MS', '0')) / 1000
+        self.latency_jitter = float(os.getenv('SIM_LATENCY_JITTER_MS', '0')) / 1000
+        self.requote_rate = float(os.getenv('SIM_REQUOTE_RATE', '0'))
+        self.reject_rate = float(os.getenv('SIM_REJECT_RATE', '0'))
+
+        self.symbols = {}
+        names = os.getenv('SIM_SYMBOLS', ','.join(SYMBOL_DEFAULTS)).split(',')
+        for name in (n.strip().upper() for n in names if n.strip()):
+            price, spread, digits, contract_size, filling = SYMBOL_DEFAULTS.get(
+                name, (1.00000, 10, 5, 100000, SYMBOL_FILLING_FOK | SYMBOL_FILLING_IOC))
+            self.symbols[name] = {
+                'mid': price, 'spread': spread, 'digits': digits, 'point': 10 ** -digits,
+                'contract_size': contract_size, 'filling_mode': filling,
+                'selected': False, 'updated': time.time()
+            }
+
+        # Replayed ticks per symbol: (times, bids, asks)
+        self.replay = {}
+        self.replay_started = time.time()
+        ticks_file = os.getenv('SIM_TICKS_FILE')
+        if ticks_file:
+            self.load_ticks(ticks_file)
+
+        self.positions = {}
+        self.deals = []
+        self.next_ticket = 1000
+
+        # Closed bars per (symbol, timeframe), generated once and extended as time passes
+        self.bar_history = int(os.getenv('SIM_BAR_HISTORY', '5000'))
+        self.bars = {}
+
+        # Every quote handed out, so copy_ticks_range can return it later
+        self.tick_history = int(os.getenv('SIM_TICK_HISTORY', '100000'))
+        self.ticks = {}
+
+    def load_ticks(self, path):
+        """Load a time,symbol,bid,ask CSV to replay in real time, looping at the end"""
+        rows = {}
+        with open(path, newline='') as f:
+            for row in csv.DictReader(f):
+                rows.setdefault(row['symbol'].upper(), []).append(
+                    (float(row['time']), float(row['bid']), float(row['ask'])))
+
+        for symbol, ticks in rows.items():
+            ticks.sort()
+            self.replay[symbol] = ([t[0] for t in ticks], [t[1] for t in ticks], [t[2] for t in ticks])
+            if symbol not in self.symbols:
+                digits = 5
+                self.symbols[symbol] = {
+                    'mid': ticks[0][1], 'spread': 10, 'digits': digits, 'point': 10 ** -digits,
+                    'contract_size': 100000, 'filling_mode': SYMBOL_FILLING_FOK | SYMBOL_FILLING_IOC,
+                    'selected': False, 'updated': time.time()
+                }
+
+    def quote(self, symbol):
+        """Current (bid, ask) for a symbol, advancing the feed to now"""
+        spec = self.symbols[symbol]
+        now = time.time()
+
+        if symbol in self.replay:
+            times, bids, asks = self.replay[symbol]
+            span = times[-1] - times[0] or 1
+            offset = (now - self.replay_started) % span
+            index = max(0, bisect_right(times, times[0] + offset) - 1)
+            bid, ask = bids[index], asks[index]
+        else:
+            # Geometric random walk scaled to the time since the last quote
+            elapsed = now - spec['updated']
+            if elapsed > 0:
+                sigma = self.volatility * math.sqrt(elapsed / SECONDS_PER_YEAR)
+                spec['mid'] *= math.exp(self.random.gauss(0, sigma))
+                spec['updated'] = now
+
+            half_spread = spec['spread'] * spec['point'] / 2
+            bid = round(spec['mid'] - half_spread, spec['digits'])
+            ask = round(spec['mid'] + half_spread, spec['digits'])
+
+        ticks = self.ticks.get(symbol)
+        if ticks is None:
+            ticks = self.ticks[symbol] = deque(maxlen=self.tick_history)
+        if not ticks or ticks[-1][1:] != (bid, ask):
+            ticks.append((int(now * 1000), bid, ask))
+        return bid, ask
+
+    def closed_bars(self, symbol, timeframe, now):
+        """Closed bars of a symbol up to now as a list of rate tuples, oldest first"""
+        seconds = TIMEFRAME_SECONDS[timeframe]
+        current_open = int(now // seconds) * seconds
+        key = (symbol, timeframe)
+        history = self.bars.get(key)
+        if history is None:
+            # Each series gets its own seeded walk so repeated calls return the same bars
+            rng = random.Random(f"{os.getenv('SIM_SEED')}|{symbol}|{timeframe}")
+            first_open = current_open - self.bar_history * seconds
+            history = self.bars[key] = {'rng': rng, 'rates': [],
+                                       'next_open': first_open, 'close': self.symbols[symbol]['mid']}
+
+        spec = self.symbols[symbol]
+        sigma = self.volatility * math.sqrt(seconds / SECONDS_PER_YEAR)
+        rng = history['rng']
+        while history['next_open'] < current_open:
+            open_price = history['close']
+            close_price = open_price * math.exp(rng.gauss(0, sigma))
+            wick = abs(rng.gauss(0, sigma / 2)) * open_price
+            history['rates'].append((
+                history['next_open'], round(open_price, spec['digits']),
+                round(max(open_price, close_price) + wick, spec['digits']),
+                round(min(open_price, close_price) - wick, spec['digits']),
+                round(close_price, spec['digits']), rng.randint(50, 500), spec['spread'], 0
+            ))
+            history['close'] = close_price
+            history['next_open'] += seconds
+
+        if len(history['rates']) > self.bar_history:
+            del history['rates'][:len(history['rates']) - self.bar_history]
+        return history['rates'], current_open, history['close']
+
+    def new_ticket(self):
+        self.next_ticket += 1
+        return self.next_ticket
+
+    def profit(self, position, bid, ask):
+        spec = self.symbols[position['symbol']]
+        close_price = bid if position['type'] == POSITION_TYPE_BUY else ask
+        direction = 1 if position['type'] == POSITION_TYPE_BUY else -1
+        profit = (close_price - position['price_open']) * direction * position['volume'] * spec['contract_size']
+        # Quote currency other than the USD account currency is converted at the close price
+        if not position['symbol'].endswith('USD'):
+            profit /= close_price
+        return round(profit, 2)
+
+    def margin(self, symbol, volume, price):
+        spec = self.symbols[symbol]
+        notional = volume * spec['contract_size']
+        if not symbol.startswith('USD'):
+            notional *= price
+        return notional / self.leverage
+
+    def account_state(self):
+        profit = 0.0
+        margin = 0.0
+        for position in self.positions.values():
+            bid, ask = self.quote(position['symbol'])
+            profit += self.profit(position, bid, ask)
+            margin += self.margin(position['symbol'], position['volume'], position['price_open'])
+        equity = self.balance + profit
+        return profit, equity, margin
+
+
+_terminal = SimulatedTerminal()
+
+
+def _fail(code, message):
+    _terminal.error = (code, message)
+    return None
+
+
+def _timestamp(value):
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.timestamp()
+    if isinstance(value, (int, float)):
+        return float(value)
+    return None
+
+
+# Connection
+
+def initialize(path=None, login=None, password=None, server=None, timeout=None, portable=False):
+    with _terminal.lock:
+        _terminal.connected = True
+        _terminal.error = (RES_S_OK, 'Success')
+        if login:
+            _terminal.login_id = int(login) if str(login).isdigit() else 0
+        return True
+
+
+def login(login, password=None, server=None, timeout=None):
+    with _terminal.lock:
+        if not _terminal.connected:
+            return bool(_fail(RES_E_INTERNAL_FAIL, 'Terminal not initialized'))
+        _terminal.login_id = int(login) if str(login).isdigit() else 0
+        _terminal.server = server or _terminal.server
+        return True
+
+
+def shutdown():
+    with _terminal.lock:
+        _terminal.connected = False
+        return True
+
+
+def last_error():
+    return _terminal.error
+
+
+def version():
+    return (500, 4000, '01 Jan 2024')
+
+
+def terminal_info():
+    with _terminal.lock:
+        if not _terminal.connected:
+            return _fail(RES_E_INTERNAL_FAIL, 'Terminal not initialized')
+        return TerminalInfo(connected=True, trade_allowed=True,
+                            ping_last=int(_terminal.latency * 1e6), name='MT5 Simulator', build=4000)
+
+
+def account_info():
+    with _terminal.lock:
+        if not _terminal.connected:
+            return _fail(RES_E_INTERNAL_FAIL, 'Terminal not initialized')
+        profit, equity, margin = _terminal.account_state()
+        return AccountInfo(
+            login=_terminal.login_id, trade_mode=0, leverage=_terminal.leverage,
+            margin_mode=_terminal.margin_mode, currency='USD', server=_terminal.server,
+            balance=round(_terminal.balance, 2), credit=0.0, profit=round(profit, 2),
+            equity=round(equity, 2), margin=round(margin, 2), margin_free=round(equity - margin, 2),
+            margin_level=round(equity / margin * 100, 2) if margin else 0.0
+        )
+
+
+# Symbols and prices
+
+def symbol_select(symbol, enable=True):
+    with _terminal.lock:
+        spec = _terminal.symbols.get(symbol)
+        if not spec:
+            return bool(_fail(RES_E_NOT_FOUND, f'Symbol {symbol} not found'))
+        spec['selected'] = enable
+        return True
+
+
+def symbol_info(symbol):
+    with _terminal.lock:
+        spec = _terminal.symbols.get(symbol)
+        if not spec:
+            return _fail(RES_E_NOT_FOUND, f'Symbol {symbol} not found')
+        bid, ask = _terminal.quote(symbol)
+        return SymbolInfo(
+            name=symbol, visible=spec['selected'], select=spec['selected'], time=int(time.time()),
+            bid=bid, ask=ask, spread=spec['spread'], digits=spec['digits'], point=spec['point'],
+            volume_min=0.01, volume_max=100.0, volume_step=0.01,
+            filling_mode=spec['filling_mode'], order_mode=127,
+            trade_exemode=SYMBOL_TRADE_EXECUTION_MARKET, trade_stops_level=0,
+            trade_contract_size=spec['contract_size'],
+            currency_base=symbol[:3], currency_profit=symbol[3:]
+        )
+
+
+def symbol_info_tick(symbol):
+    with _terminal.lock:
+        if symbol not in _terminal.symbols:
+            return _fail(RES_E_NOT_FOUND, f'Symbol {symbol} not found')
+        bid, ask = _terminal.quote(symbol)
+        now = time.time()
+        return Tick(time=int(now), bid=bid, ask=ask, last=0.0, volume=0,
+                    time_msc=int(now * 1000), flags=6, volume_real=0.0)
+
+
+def order_calc_margin(action, symbol, volume, price):
+    with _terminal.lock:
+        if symbol not in _terminal.symbols:
+            return _fail(RES_E_NOT_FOUND, f'Symbol {symbol} not found')
+        return round(_terminal.margin(symbol, volume, price), 2)
+
+
+def order_calc_profit(action, symbol, volume, price_open, price_close):
+    with _terminal.lock:
+        if symbol not in _terminal.symbols:
+            return _fail(RES_E_NOT_FOUND, f'Symbol {symbol} not found')
+        spec = _terminal.symbols[symbol]
+        direction = 1 if action == ORDER_TYPE_BUY else -1
+        profit = (price_close - price_open) * direction * volume * spec['contract_size']
+        if not symbol.endswith('USD'):
+            profit /= price_close
+        return round(profit, 2)
+
+
+def copy_rates_from_pos(symbol, timeframe, start_pos, count):
+    with _terminal.lock:
+        if symbol not in _terminal.symbols:
+            return _fail(RES_E_NOT_FOUND, f'Symbol {symbol} not found')
+        if timeframe not in TIMEFRAME_SECONDS or start_pos < 0 or count <= 0:
+            return _fail(RES_E_INVALID_PARAMS, 'Invalid arguments')
+
+        rates, current_open, last_close = _terminal.closed_bars(symbol, timeframe, time.time())
+        spec = _terminal.symbols[symbol]
+        bid, _ = _terminal.quote(symbol)
+        open_price = round(last_close, spec['digits'])
+        # Position 0 is the bar still forming, priced from the live quote
+        forming = (current_open, open_price, max(open_price, bid), min(open_price, bid), bid, 1, spec['spread'], 0)
+
+        bars = rates + [forming]
+        end = len(bars) - start_pos
+        if end <= 0:
+            return _fail(RES_E_INVALID_PARAMS, 'Invalid arguments')
+        return np.array(bars[max(0, end - count):end], dtype=RATE_DTYPE)
+
+
+def copy_rates_range(symbol, timeframe, date_from, date_to):
+    with _terminal.lock:
+        if symbol not in _terminal.symbols:
+            return _fail(RES_E_NOT_FOUND, f'Symbol {symbol} not found')
+        start, end = _timestamp(date_from), _timestamp(date_to)
+        if timeframe not in TIMEFRAME_SECONDS or start is None or end is None:
+            return _fail(RES_E_INVALID_PARAMS, 'Invalid arguments')
+
+        rates, _, _ = _terminal.closed_bars(symbol, timeframe, time.time())
+        return np.array([r for r in rates if start <= r[0] <= end], dtype=RATE_DTYPE)
+
+
+def copy_ticks_range(symbol, date_from, date_to, flags=COPY_TICKS_ALL):
+    with _terminal.lock:
+        if symbol not in _terminal.symbols:
+            return _fail(RES_E_NOT_FOUND, f'Symbol {symbol} not found')
+        start, end = _timestamp(date_from), _timestamp(date_to)
+        if start is None or end is None:
+            return _fail(RES_E_INVALID_PARAMS, 'Invalid arguments')
+
+        start_msc, end_msc = int(start * 1000), int(end * 1000) + 999
+        ticks = [
+            (msc // 1000, bid, ask, 0.0, 0, msc, 6, 0.0)
+            for msc, bid, ask in _terminal.ticks.get(symbol, ())
+            if start_msc <= msc <= end_msc
+        ]
+        return np.array(ticks, dtype=TICK_DTYPE)
+
+
+# Positions, orders and history
+
+def _position_tuple(position):
+    bid, ask = _terminal.quote(position['symbol'])
+    return TradePosition(
+        ticket=position['ticket'], time=int(position['time']), time_msc=int(position['time'] * 1000),
+        type=position['type'], magic=position['magic'], identifier=position['ticket'],
+        volume=position['volume'], price_open=position['price_open'], sl=position['sl'],
+        tp=position['tp'], price_current=bid if position['type'] == POSITION_TYPE_BUY else ask,
+        swap=0.0, profit=_terminal.profit(position, bid, ask), symbol=position['symbol'],
+        comment=position['comment']
+    )
+
+
+def positions_get(symbol=None, group=None, ticket=None):
+    with _terminal.lock:
+        positions = [
+            _position_tuple(p) for p in _terminal.positions.values()
+            if (symbol is None or p['symbol'] == symbol) and (ticket is None or p['ticket'] == ticket)
+        ]
+        return tuple(positions)
+
+
+def positions_total():
+    return len(_terminal.positions)
+
+
+def orders_get(symbol=None, group=None, ticket=None):
+    # Only market execution is simulated, there are never pending orders
+    return ()
+
+
+def history_deals_get(date_from=None, date_to=None, group=None, ticket=None, position=None):
+    with _terminal.lock:
+        if ticket is not None:
+            return tuple(d for d in _terminal.deals if d.order == ticket)
+        if position is not None:
+            return tuple(d for d in _terminal.deals if d.position_id == position)
+
+        start, end = _timestamp(date_from), _timestamp(date_to)
+        if start is None or end is None:
+            return _fail(RES_E_INVALID_PARAMS, 'Invalid arguments')
+        return tuple(d for d in _terminal.deals if start <= d.time <= end)
+
+
+def history_deals_total(date_from, date_to):
+    deals = history_deals_get(date_from, date_to)
+    return len(deals) if deals is not None else None
+
+
+# Trading
+
+def _result(retcode, request, comment, deal=0, order=0, volume=0.0, price=0.0, bid=0.0, ask=0.0):
+    return OrderSendResult(retcode=retcode, deal=deal, order=order, volume=volume, price=price,
+                           bid=bid, ask=ask, comment=comment, request_id=0,
+                           retcode_external=0, request=request)
+
+
+def _add_deal(order, position, deal_type, entry, volume, price, profit, magic, comment):
+    now = time.time()
+    deal = TradeDeal(
+        ticket=_terminal.new_ticket(), order=order, time=int(now), time_msc=int(now * 1000),
+        type=deal_type, entry=entry, magic=magic, position_id=position, volume=volume,
+        price=price, commission=0.0, swap=0.0, profit=profit, fee=0.0,
+        symbol=_terminal.positions.get(position, {}).get('symbol', ''), comment=comment
+    )
+    _terminal.deals.append(deal)
+    return deal
+
+
+def _close(position, volume, price, bid, ask, order, magic, comment, entry=DEAL_ENTRY_OUT):
+    closed = dict(position, volume=volume)
+    profit = _terminal.profit(closed, bid, ask)
+    deal_type = DEAL_TYPE_SELL if position['type'] == POSITION_TYPE_BUY else DEAL_TYPE_BUY
+    deal = _add_deal(order, position['ticket'], deal_type, entry, volume, price, profit, magic, comment)
+
+    _terminal.balance += profit
+    position['volume'] = round(position['volume'] - volume, 8)
+    if position['volume'] <= 0:
+        del _terminal.positions[position['ticket']]
+    return deal
+
+
+def order_send(request):
+    # Broker round-trip, outside the lock so other calls are not serialized behind it
+    delay = _terminal.latency + _terminal.random.uniform(0, _terminal.latency_jitter)
+    if delay > 0:
+        time.sleep(delay)
+
+    with _terminal.lock:
+        if not _terminal.connected:
+            return _fail(RES_E_INTERNAL_FAIL, 'Terminal not initialized')
+
+        action = request.get('action')
+        if action == TRADE_ACTION_CLOSE_BY:
+            return _close_by(request)
+        if action != TRADE_ACTION_DEAL:
+            return _result(TRADE_RETCODE_INVALID, request, 'Unsupported action')
+
+        symbol = request.get('symbol')
+        spec = _terminal.symbols.get(symbol)
+        if not spec:
+            return _result(TRADE_RETCODE_INVALID, request, 'Invalid symbol')
+
+        bid, ask = _terminal.quote(symbol)
+        order_type = request.get('type')
+        volume = float(request.get('volume') or 0)
+        price = ask if order_type == ORDER_TYPE_BUY else bid
+
+        # Injected dealer behaviour
+        roll = _terminal.random.random()
+        if roll < _terminal.requote_rate:
+            return _result(TRADE_RETCODE_REQUOTE, request, 'Requote', bid=bid, ask=ask)
+        if roll < _terminal.requote_rate + _terminal.reject_rate:
+            return _result(TRADE_RETCODE_REJECT, request, 'Request rejected', bid=bid, ask=ask)
+
+        if volume < 0.01 or volume > 100.0 or abs(round(volume / 0.01) * 0.01 - volume) > 1e-9:
+            return _result(TRADE_RETCODE_INVALID_VOLUME, request, 'Invalid volume')
+
+        filling = request.get('type_filling', ORDER_FILLING_FOK)
+        allowed = {ORDER_FILLING_FOK: SYMBOL_FILLING_FOK, ORDER_FILLING_IOC: SYMBOL_FILLING_IOC}
+        if filling not in allowed or not spec['filling_mode'] & allowed[filling]:
+            return _result(TRADE_RETCODE_INVALID_FILL, request, 'Unsupported filling mode')
+
+        requested_price = request.get('price')
+        if requested_price:
+            deviation = int(request.get('deviation') or 0) * spec['point']
+            if abs(requested_price - price) > deviation + spec['point'] / 2:
+                return _result(TRADE_RETCODE_REQUOTE, request, 'Requote', bid=bid, ask=ask)
+
+        order = _terminal.new_ticket()
+        magic = request.get('magic', 0)
+        comment = request.get('comment', '')
+
+        position_ticket = request.get('position')
+        if position_ticket:
+            position = _terminal.positions.get(position_ticket)
+            if not position:
+                return _result(TRADE_RETCODE_POSITION_CLOSED, request, 'Position closed')
+            if volume > position['volume'] + 1e-9:
+                return _result(TRADE_RETCODE_INVALID_VOLUME, request, 'Invalid volume')
+            deal = _close(position, volume, price, bid, ask, order, magic, comment)
+            return _result(TRADE_RETCODE_DONE, request, 'Request executed', deal=deal.ticket,
+                           order=order, volume=volume, price=price, bid=bid, ask=ask)
+
+        sl = request.get('sl') or 0.0
+        tp = request.get('tp') or 0.0
+        if order_type == ORDER_TYPE_BUY:
+            stops_valid = (not sl or sl < bid) and (not tp or tp > bid)
+        else:
+            stops_valid = (not sl or sl > ask) and (not tp or tp < ask)
+        if not stops_valid:
+            return _result(TRADE_RETCODE_INVALID_STOPS, request, 'Invalid stops', bid=bid, ask=ask)
+
+        _, equity, margin = _terminal.account_state()
+        if margin + _terminal.margin(symbol, volume, price) > equity:
+            return _result(TRADE_RETCODE_NO_MONEY, request, 'No money', bid=bid, ask=ask)
+
+        now = time.time()
+        _terminal.positions[order] = {
+            'ticket': order, 'time': now, 'type': order_type, 'magic': magic, 'volume': volume,
+            'price_open': price, 'sl': sl, 'tp': tp, 'symbol': symbol, 'comment': comment
+        }
+        deal = _add_deal(order, order, order_type, DEAL_ENTRY_IN, volume, price, 0.0, magic, comment)
+        return _result(TRADE_RETCODE_DONE, request, 'Request executed', deal=deal.ticket,
+                       order=order, volume=volume, price=price, bid=bid, ask=ask)
+
+
+def _close_by(request):
+    position = _terminal.positions.get(request.get('position'))
+    opposite = _terminal.positions.get(request.get('position_by'))
+    if not position or not opposite:
+        return _result(TRADE_RETCODE_POSITION_CLOSED, request, 'Position closed')
+    if (_terminal.margin_mode != ACCOUNT_MARGIN_MODE_RETAIL_HEDGING
+            or position['symbol'] != opposite['symbol'] or position['type'] == opposite['type']):
+        return _result(TRADE_RETCODE_INVALID, request, 'Invalid close by')
+
+    # Both sides close at the opposite position's open price
+    volume = min(position['volume'], opposite['volume'])
+    order = _terminal.new_ticket()
+    magic = request.get('magic', 0)
+    price = opposite['price_open']
+    _close(position, volume, price, price, price, order, magic, request.get('comment', ''), DEAL_ENTRY_OUT_BY)
+    _close(opposite, volume, position['price_open'], position['price_open'], position['price_open'],
+           order, magic, request.get('comment', ''), DEAL_ENTRY_OUT_BY)
+    return _result(TRADE_RETCODE_DONE, request, 'Request executed', order=order, volume=volume, price=price)
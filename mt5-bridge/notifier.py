@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+n8n side-channel notifier for the MT5 Bridge
+Forwards execution results to n8n in the background, after orders are placed
+"""
+
+import logging
+import queue
+import threading
+from typing import Dict
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+
+class N8nNotifier:
+    def __init__(self, url: str, max_queue_size: int = 1000, timeout: float = 5.0):
+        self.url = url
+        self.timeout = timeout
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._session = requests.Session()
+        self._thread = None
+
+        self.sent_count = 0
+        self.failed_count = 0
+        self.dropped_count = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.url)
+
+    def start(self):
+        """Start the background sender"""
+        if not self.enabled or (self._thread and self._thread.is_alive()):
+            return
+
+        self._thread = threading.Thread(target=self._run, name='n8n-notifier', daemon=True)
+        self._thread.start()
+        logger.info(f"n8n notifications enabled: {self.url}")
+
+    def notify(self, payload: Dict):
+        """Queue a payload, dropping it rather than blocking when the queue is full"""
+        if not self.enabled:
+            return
+
+        try:
+            self._queue.put_nowait(payload)
+        except queue.Full:
+            self.dropped_count += 1
+
+    def get_stats(self) -> Dict:
+        return {
+            'enabled': self.enabled,
+            'pending': self._queue.qsize(),
+            'sent': self.sent_count,
+            'failed': self.failed_count,
+            'dropped': self.dropped_count
+        }
+
+    def _run(self):
+        while True:
+            payload = self._queue.get()
+            try:
+                response = self._session.post(self.url, json=payload, timeout=self.timeout)
+                response.raise_for_status()
+                self.sent_count += 1
+            except requests.exceptions.RequestException as e:
+                self.failed_count += 1
+                logger.warning(f"n8n notification failed: {str(e)}")
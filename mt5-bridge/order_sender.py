@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Order sending for the MT5 Bridge
+Market orders are sent with a filling mode the symbol supports, detected once per
+symbol from symbol_info.filling_mode (IOC preferred, then FOK, then RETURN unless the
+symbol uses market execution) and detected again after a reconnect. Replies
+that only mean the price moved (REQUOTE, PRICE_CHANGED, PRICE_OFF) are re-priced
+from a fresh tick and sent again, and INVALID_FILL moves on to the symbol's next
+filling mode. Retries stop at the per-order latency budget, because every retry
+holds the execution thread.
+"""
+
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+
+from metrics import ORDER_RESULTS, REGISTRY, timed
+
+logger = logging.getLogger(__name__)
+
+# Retcodes answered by re-pricing and sending again
+REQUOTE_RETCODES = {10004: 'requote', 10020: 'price_changed', 10021: 'price_off'}
+RETCODE_DONE = 10009
+RETCODE_INVALID_FILL = 10030
+
+# Flags in symbol_info.filling_mode
+SYMBOL_FILLING_FOK = 1
+SYMBOL_FILLING_IOC = 2
+
+# symbol_info.trade_exemode that does not accept ORDER_FILLING_RETURN for market orders
+SYMBOL_TRADE_EXECUTION_MARKET = 2
+
+ORDER_RETRIES = REGISTRY.counter(
+    'mt5_bridge_order_retries_total',
+    'order_send retries by the retcode that caused them',
+    ['symbol', 'signal', 'retcode']
+)
+
+RETRY_SECONDS = REGISTRY.histogram(
+    'mt5_bridge_order_retry_seconds',
+    'Latency added to retried orders after their first reply',
+    ['symbol', 'signal', 'retcode']
+)
+
+
+class OrderSender:
+    def __init__(self, mt5, symbol_cache, deviation: int = 10, retry_budget: float = 0.5, max_retries: int = 3):
+        self.mt5 = mt5
+        self.symbol_cache = symbol_cache
+        self.deviation = deviation  # points
+        self.retry_budget = retry_budget  # seconds per order, 0 disables retries
+        self.max_retries = max_retries
+
+        # Supported order filling types per symbol, most preferred first
+        self._filling: Dict[str, List[int]] = {}
+
+        self.retried_orders = 0
+        self.recovered_orders = 0
+        self.budget_exhausted = 0
+        self.retry_seconds = 0.0
+        self.retries: Dict[str, int] = {}
+
+    def filling_type(self, symbol: str) -> int:
+        """Filling mode to send market orders for the symbol with"""
+        types = self._filling.get(symbol)
+        if types is None:
+            spec = self.symbol_cache.get_spec(symbol)
+            if not spec:
+                return self.mt5.ORDER_FILLING_IOC
+            types = self._filling[symbol] = self._supported_types(spec)
+        return types[0]
+
+    def invalidate(self):
+        """Forget detected filling modes, e.g. after a reconnect that may have changed them"""
+        self._filling.clear()
+
+    def send(self, request: Dict, symbol: str, signal: str) -> Tuple[Optional[object], int]:
+        """Send a request, retrying requote-class replies within the budget
+
+        Returns the last result and the number of retries.
+        """
+        start = time.perf_counter()
+        result = self._attempt(request, symbol, signal)
+        first_reply = time.perf_counter()
+        if request.get('action') != self.mt5.TRADE_ACTION_DEAL:
+            return result, 0
+
+        retries = 0
+        first_retcode = result.retcode if result else None
+        while result is not None and retries < self.max_retries and self.retry_budget > 0:
+            retcode = result.retcode
+            if retcode in REQUOTE_RETCODES:
+                tick = self.symbol_cache.get_tick(symbol, max_age=0)
+                if not tick:
+                    break
+                price = tick['ask'] if request['type'] == self.mt5.ORDER_TYPE_BUY else tick['bid']
+                retry = dict(request, price=price)
+            elif retcode == RETCODE_INVALID_FILL and self._drop_filling(symbol, request.get('type_filling')):
+                retry = dict(request, type_filling=self._filling[symbol][0])
+            else:
+                break
+
+            # Only retry when another attempt as slow as the first still fits in the budget
+            elapsed = time.perf_counter() - start
+            if elapsed + (first_reply - start) > self.retry_budget:
+                self.budget_exhausted += 1
+                logger.warning(f"Order retry budget of {self.retry_budget * 1000:.0f}ms spent on {symbol} "
+                               f"after {retries} retries (last retcode {retcode})")
+                break
+
+            retries += 1
+            reason = REQUOTE_RETCODES.get(retcode, 'invalid_fill')
+            self.retries[reason] = self.retries.get(reason, 0) + 1
+            ORDER_RETRIES.inc(symbol=symbol, signal=signal, retcode=retcode)
+            request = retry
+            result = self._attempt(request, symbol, signal)
+
+        if retries:
+            added = time.perf_counter() - first_reply
+            final = result.retcode if result else 'none'
+            RETRY_SECONDS.observe(added, symbol=symbol, signal=signal, retcode=final)
+            self.retried_orders += 1
+            self.retry_seconds += added
+            if final == RETCODE_DONE:
+                self.recovered_orders += 1
+            logger.info(f"{signal} {symbol} retried {retries}x after retcode {first_retcode}, "
+                        f"final retcode {final}, +{added * 1000:.1f}ms")
+        return result, retries
+
+    def get_stats(self) -> Dict:
+        return {
+            'deviation': self.deviation,
+            'retry_budget_ms': round(self.retry_budget * 1000),
+            'max_retries': self.max_retries,
+            'retried_orders': self.retried_orders,
+            'recovered_orders': self.recovered_orders,
+            'budget_exhausted': self.budget_exhausted,
+            'retries': dict(self.retries),
+            'retry_latency_ms_total': round(self.retry_seconds * 1000, 2),
+            'filling_modes': {symbol: self._filling_name(types[0]) for symbol, types in self._filling.items()}
+        }
+
+    def _attempt(self, request: Dict, symbol: str, signal: str):
+        with timed('order_send', symbol=symbol, signal=signal) as labels:
+            result = self.mt5.order_send(request)
+            labels['retcode'] = result.retcode if result else 'none'
+        ORDER_RESULTS.inc(symbol=symbol, signal=signal, retcode=labels['retcode'])
+        return result
+
+    def _supported_types(self, spec: Dict) -> List[int]:
+        types = []
+        if spec['filling_mode'] & SYMBOL_FILLING_IOC:
+            types.append(self.mt5.ORDER_FILLING_IOC)
+        if spec['filling_mode'] & SYMBOL_FILLING_FOK:
+            types.append(self.mt5.ORDER_FILLING_FOK)
+        # Allowed for market orders in request, instant and exchange execution, not market execution
+        if spec.get('trade_exemode') != SYMBOL_TRADE_EXECUTION_MARKET:
+            types.append(self.mt5.ORDER_FILLING_RETURN)
+        return types or [self.mt5.ORDER_FILLING_IOC]
+
+    def _filling_name(self, filling: int) -> str:
+        for name in ('FOK', 'IOC', 'RETURN'):
+            if filling == getattr(self.mt5, f'ORDER_FILLING_{name}'):
+                return name
+        return str(filling)
+
+    def _drop_filling(self, symbol: str, filling: int) -> bool:
+        """Stop using a filling mode the server refused; False when none is left to try"""
+        types = self._filling.get(symbol)
+        if not types or types[0] != filling or len(types) < 2:
+            return False
+        types.pop(0)
+        logger.warning(f"{symbol} refused filling mode {filling}, switching to {types[0]}")
+        return True
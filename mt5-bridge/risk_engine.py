@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+Pre-trade risk checks for the MT5 Bridge
+Every BUY/SELL is checked before it is queued, against a per-symbol table of margin
+and value per lot (from order_calc_margin and order_calc_profit, refreshed in the
+background) and the state mirror's account and positions. A check is plain arithmetic
+on cached figures, so it never waits on the terminal. A symbol the table has not seen
+is loaded in the background, and its first orders skip the checks that need it.
+
+Checks, in order:
+    risk-percent sizing   lots = equity * risk% / (SL distance * value per lot)
+    volume                rounded down to the volume step, within the symbol's min/max
+    symbol exposure       open + in-flight lots on the symbol <= RISK_MAX_SYMBOL_LOTS
+    account exposure      open + in-flight lots on the account <= RISK_MAX_ACCOUNT_LOTS
+    margin                required margin <= free margin less RISK_MARGIN_BUFFER_PERCENT
+
+An order that breaks a limit is rejected, or with resize enabled shrunk to the
+largest volume that passes.
+"""
+
+import logging
+import math
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from execution import PRIORITY_QUERY
+
+logger = logging.getLogger(__name__)
+
+# Orders that completed stay counted as in flight until a mirror read taken after them
+# is published, or at most this long
+HOLD_TTL = 5.0
+
+
+class RiskRejected(Exception):
+    """Raised when an order breaks a pre-trade risk limit"""
+
+    def __init__(self, message: str, details: Optional[Dict] = None):
+        super().__init__(message)
+        self.details = details or {}
+
+
+class RiskEngine:
+    def __init__(self, bridge, mt5, refresh_interval: float = 60.0, risk_percent: float = 0.0,
+                 max_symbol_lots: float = 0.0, max_account_lots: float = 0.0,
+                 margin_buffer_percent: float = 0.0, resize: bool = False, enabled: bool = True):
+        self.bridge = bridge
+        self.mt5 = mt5
+        self.refresh_interval = refresh_interval
+        # Default account risk per trade when a signal does not set risk_percent (0 = use lot_size)
+        self.risk_percent = risk_percent
+        self.max_symbol_lots = max_symbol_lots
+        self.max_account_lots = max_account_lots
+        self.margin_buffer_percent = margin_buffer_percent
+        self.resize = resize
+        self._enabled = enabled
+
+        self._table: Dict[str, Dict] = {}
+        self._holds: List[Dict] = []
+        # Symbols queued for a background load, and those a load found no spec for
+        self._pending = set()
+        self._unavailable = set()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop_event = threading.Event()
+
+        self.check_count = 0
+        self.rejected_count = 0
+        self.resized_count = 0
+        self.refresh_count = 0
+        self.error_count = 0
+        self.last_refresh = None
+
+    @property
+    def enabled(self) -> bool:
+        return self._enabled and self.mt5 is not None
+
+    def start(self):
+        """Load the symbols already in the symbol cache and refresh them in the background"""
+        if not self.enabled or (self._thread and self._thread.is_alive()):
+            return
+        self.refresh()
+        if self.refresh_interval > 0:
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name='risk-refresh', daemon=True)
+            self._thread.start()
+        logger.info(f"Risk engine started ({len(self._table)} symbols, {self.refresh_interval}s refresh)")
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(5)
+            self._thread = None
+
+    def refresh(self, symbols: Optional[List[str]] = None):
+        """Recompute margin and value per lot for the given (default: all known) symbols"""
+        symbols = symbols or sorted(set(self._table) | set(self.bridge.symbol_cache.symbols()))
+        if not symbols or not self.bridge.mt5_initialized:
+            return
+        try:
+            entries = self.bridge.executor.call(self._load, symbols, priority=PRIORITY_QUERY,
+                                                timeout=self.bridge.execution_timeout)
+        except Exception as e:
+            self.error_count += 1
+            logger.error(f"Risk table refresh failed: {str(e)}")
+            return
+        self._store(symbols, entries)
+
+    def load_async(self, symbol: str):
+        """Queue a load of one symbol on the execution engine, without waiting for it"""
+        if symbol in self._pending or not self.bridge.mt5_initialized:
+            return
+        self._pending.add(symbol)
+        try:
+            future = self.bridge.executor.submit(self._load, [symbol], priority=PRIORITY_QUERY)
+        except Exception as e:
+            self._pending.discard(symbol)
+            logger.warning(f"Risk table load for {symbol} not queued: {str(e)}")
+            return
+        future.add_done_callback(lambda f: self._loaded(symbol, f))
+
+    def check(self, signal: str, symbol: str, lot_size: float, sl_percent: float,
+              risk_percent: Optional[float] = None) -> Dict:
+        """Approve, resize or reject a BUY/SELL, returning the lot size to send
+
+        Raises RiskRejected. The approved volume is held as in flight until release().
+        """
+        self.check_count += 1
+        entry = self._table.get(symbol)
+        if entry is None:
+            entry = self._provisional(symbol, risk_percent)
+            if entry is None:
+                # Never resolved yet: execution looks the symbol up and rejects it if unknown
+                return None
+
+        snapshot, account, positions = self._account_state()
+        if not account:
+            raise self._reject('Account information unavailable')
+
+        decision = {'requested_lot_size': lot_size, 'lot_size': lot_size, 'adjustments': []}
+        price = self._price(symbol, entry)
+
+        risk_percent = self.risk_percent if risk_percent is None else risk_percent
+        if risk_percent > 0:
+            if sl_percent <= 0:
+                raise self._reject('risk_percent sizing needs a positive sl_percent')
+            loss_per_lot = price * sl_percent / 100 * entry['value_per_price']
+            decision['lot_size'] = account['equity'] * risk_percent / 100 / loss_per_lot
+            decision['risk_percent'] = risk_percent
+            decision['adjustments'].append(f'sized for {risk_percent}% risk')
+
+        lots = self._round(decision['lot_size'], entry)
+        if lots < entry['volume_min']:
+            raise self._reject(f"Volume {decision['lot_size']:.4f} below the {symbol} minimum of {entry['volume_min']}",
+                               decision)
+        lots = self._limit(lots, entry['volume_max'], f"{symbol} maximum volume", entry, decision)
+
+        with self._lock:
+            holds = self._active_holds(snapshot)
+            open_symbol = sum(p['volume'] for p in positions if p['symbol'] == symbol)
+            open_total = sum(p['volume'] for p in positions)
+            held_symbol = sum(h['lots'] for h in holds if h['symbol'] == symbol)
+            held_total = sum(h['lots'] for h in holds)
+            held_margin = sum(h['margin'] for h in holds)
+
+            if self.max_symbol_lots > 0:
+                lots = self._limit(lots, self.max_symbol_lots - open_symbol - held_symbol,
+                                   f"{symbol} exposure limit of {self.max_symbol_lots} lots", entry, decision)
+            if self.max_account_lots > 0:
+                lots = self._limit(lots, self.max_account_lots - open_total - held_total,
+                                   f"account exposure limit of {self.max_account_lots} lots", entry, decision)
+
+            margin_per_lot = entry['margin_buy'] if signal == 'BUY' else entry['margin_sell']
+            available = account['margin_free'] * (1 - self.margin_buffer_percent / 100) - held_margin
+            if margin_per_lot > 0:
+                lots = self._limit(lots, available / margin_per_lot, 'free margin', entry, decision)
+
+            decision['lot_size'] = lots
+            decision['margin'] = round(lots * margin_per_lot, 2)
+            decision['hold'] = {'symbol': symbol, 'lots': lots, 'margin': lots * margin_per_lot,
+                                'after': None, 'done_at': None}
+            self._holds.append(decision['hold'])
+
+        if lots != decision['requested_lot_size']:
+            self.resized_count += 1
+        return decision
+
+    def release(self, decision: Dict):
+        """Mark an approved order as completed; its hold lapses once a mirror read started later is published"""
+        hold = decision.get('hold')
+        if hold:
+            # Reads numbered above this one start after the order finished, so they include it
+            hold['after'] = self.bridge.state_mirror.collect_seq
+            hold['done_at'] = time.monotonic()
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            holds = len(self._active_holds(self.bridge.state_mirror.get_snapshot()))
+        return {
+            'enabled': self.enabled,
+            'symbols': len(self._table),
+            'checks': self.check_count,
+            'rejected': self.rejected_count,
+            'resized': self.resized_count,
+            'in_flight': holds,
+            'refreshes': self.refresh_count,
+            'errors': self.error_count,
+            'last_refresh': self.last_refresh
+        }
+
+    def _provisional(self, symbol: str, risk_percent: Optional[float]) -> Optional[Dict]:
+        """Table entry for a symbol not loaded yet, built from its cached spec with no margin figures
+
+        Queues the symbol's load and returns None when the symbol cache has no spec for it either.
+        """
+        self.load_async(symbol)
+        if symbol in self._unavailable:
+            raise self._reject(f'Symbol {symbol} not available')
+        risk_percent = self.risk_percent if risk_percent is None else risk_percent
+        if risk_percent > 0:
+            raise self._reject(f'No margin data for {symbol} yet, retry shortly')
+        spec = self.bridge.symbol_cache.peek_spec(symbol)
+        if spec is None:
+            return None
+        return {'margin_buy': 0.0, 'margin_sell': 0.0, 'value_per_price': 0.0, 'price': 0.0,
+                'volume_min': spec['volume_min'], 'volume_max': spec['volume_max'],
+                'volume_step': spec['volume_step']}
+
+    def _store(self, symbols: List[str], entries: Dict[str, Dict]):
+        self._table.update(entries)
+        self._unavailable.difference_update(entries)
+        self._unavailable.update(s for s in symbols if s not in entries and not self.bridge.symbol_cache.has_spec(s))
+        self.refresh_count += 1
+        self.last_refresh = datetime.now(timezone.utc).isoformat()
+
+    def _loaded(self, symbol: str, future):
+        self._pending.discard(symbol)
+        try:
+            self._store([symbol], future.result())
+        except Exception as e:
+            self.error_count += 1
+            logger.error(f"Risk table load for {symbol} failed: {str(e)}")
+
+    def _reject(self, message: str, details: Optional[Dict] = None) -> RiskRejected:
+        self.rejected_count += 1
+        if details:
+            details = {k: v for k, v in details.items() if k != 'hold'}
+        return RiskRejected(message, details)
+
+    def _limit(self, lots: float, maximum: float, reason: str, entry: Dict, decision: Dict) -> float:
+        """Apply an upper bound, resizing or rejecting when lots exceed it"""
+        if lots <= maximum + 1e-9:
+            return lots
+        allowed = self._round(max(maximum, 0.0), entry)
+        if not self.resize or allowed < entry['volume_min']:
+            raise self._reject(f"{lots} lots exceeds the {reason} (at most {max(allowed, 0.0)})", decision)
+        decision['adjustments'].append(f'resized to {allowed} for the {reason}')
+        return allowed
+
+    @staticmethod
+    def _round(lots: float, entry: Dict) -> float:
+        """Round down to the volume step"""
+        step = entry['volume_step'] or 0.01
+        decimals = max(0, -int(math.floor(math.log10(step)))) if step < 1 else 0
+        return round(math.floor(lots / step + 1e-9) * step, decimals)
+
+    def _price(self, symbol: str, entry: Dict) -> float:
+        tick = self.bridge.symbol_cache.peek_tick(symbol)
+        return (tick['bid'] + tick['ask']) / 2 if tick else entry['price']
+
+    def _account_state(self):
+        """Snapshot (None for a direct read), account and positions, read together"""
+        snapshot = self.bridge.state_mirror.get_snapshot()
+        if snapshot:
+            return snapshot, snapshot.account, snapshot.positions
+        account, positions = self.bridge.executor.call(
+            lambda: (self.bridge.get_account_info(), self.bridge.get_positions()),
+            timeout=self.bridge.execution_timeout
+        )
+        return None, account, positions
+
+    def _active_holds(self, snapshot) -> List[Dict]:
+        """Drop holds of completed orders the positions being checked already include (caller holds the lock)
+
+        A direct read (no snapshot) ran after every completed order, so it includes all of them.
+        """
+        collected = snapshot.collected if snapshot else None
+        now = time.monotonic()
+        self._holds = [
+            h for h in self._holds
+            if h['done_at'] is None or (collected is not None and collected <= h['after']
+                                        and now - h['done_at'] < HOLD_TTL)
+        ]
+        return self._holds
+
+    def _load(self, symbols: List[str]) -> Dict[str, Dict]:
+        """Margin and value per lot for each symbol (runs on the execution thread)"""
+        cache = self.bridge.symbol_cache
+        entries = {}
+        for symbol in symbols:
+            spec = cache.get_spec(symbol)
+            tick = cache.get_tick(symbol) if spec else None
+            if not spec or not tick:
+                continue
+            margin_buy = self.mt5.order_calc_margin(self.mt5.ORDER_TYPE_BUY, symbol, 1.0, tick['ask'])
+            margin_sell = self.mt5.order_calc_margin(self.mt5.ORDER_TYPE_SELL, symbol, 1.0, tick['bid'])
+            # Value of a price move in account currency, over 100 points to stay clear of rounding
+            move = (spec['point'] or 0.00001) * 100
+            profit = self.mt5.order_calc_profit(self.mt5.ORDER_TYPE_BUY, symbol, 1.0, tick['bid'], tick['bid'] + move)
+            if margin_buy is None or margin_sell is None or not profit:
+                logger.warning(f"Risk table: margin or profit calculation failed for {symbol}: {self.mt5.last_error()}")
+                continue
+            entries[symbol] = {
+                'margin_buy': margin_buy,
+                'margin_sell': margin_sell,
+                'value_per_price': profit / move,
+                'price': (tick['bid'] + tick['ask']) / 2,
+                'volume_min': spec['volume_min'],
+                'volume_max': spec['volume_max'],
+                'volume_step': spec['volume_step']
+            }
+        return entries
+
+    def _run(self):
+        while not self._stop_event.wait(self.refresh_interval):
+            self.refresh()
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Production server for the MT5 Bridge Service
+Serves the app with waitress in a single process: the execution engine owns the
+MT5 terminal while request threads scale independently
+"""
+
+import logging
+import os
+
+from dotenv import load_dotenv
+from waitress import serve
+
+from app import create_app
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+def main():
+    """Start the production server"""
+    port = int(os.getenv('BRIDGE_PORT', 5000))
+    threads = int(os.getenv('BRIDGE_THREADS', '16'))
+
+    app = create_app()
+
+    logger.info(f"Starting MT5 Bridge Service on port {port} with {threads} threads")
+    serve(
+        app,
+        host=os.getenv('BRIDGE_HOST', '0.0.0.0'),
+        port=port,
+        threads=threads,
+        # Concurrent connections accepted before new ones wait in the backlog
+        connection_limit=int(os.getenv('BRIDGE_CONNECTION_LIMIT', '200')),
+        backlog=int(os.getenv('BRIDGE_BACKLOG', '1024')),
+        # Idle keep-alive connections are closed after this many seconds
+        channel_timeout=int(os.getenv('BRIDGE_KEEPALIVE_TIMEOUT', '30')),
+        cleanup_interval=10,
+        # Alerts are small, refuse oversized bodies early
+        max_request_body_size=int(os.getenv('BRIDGE_MAX_BODY_SIZE', '65536')),
+        ident='mt5-bridge'
+    )
+
+
+if __name__ == '__main__':
+    main()
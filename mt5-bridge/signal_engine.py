@@ -0,0 +1,671 @@
+#!/usr/bin/env python3
+"""
+In-bridge signal engine for the MT5 Bridge
+Runs the TradingView moving-average crossover strategy on closed MT5 bars and feeds
+BUY/SELL signals straight into the order path, skipping the TradingView alert and
+n8n round trip.
+
+Every MA keeps O(1)-per-bar incremental state with the same na handling as the Pine
+script, and the whole engine state is checkpointed so restarts resume without a
+long warm-up.
+"""
+
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+from connection_supervisor import CircuitOpenError
+from execution import PRIORITY_OPEN, PRIORITY_QUERY, QueueFullError
+from log_pipeline import audit
+from metrics import timed
+from risk_engine import RiskRejected
+from trade_journal import STATE_RECEIVED, STATE_RESULT
+
+logger = logging.getLogger(__name__)
+
+NAN = float('nan')
+
+# Running sums are recomputed from their window this often to stop float drift
+RESYNC_INTERVAL = 10000
+
+TIMEFRAME_SECONDS = {
+    'M1': 60, 'M5': 300, 'M15': 900, 'M30': 1800, 'H1': 3600, 'H4': 14400, 'D1': 86400
+}
+
+
+def _nz(value: float, replacement: float) -> float:
+    return replacement if math.isnan(value) else value
+
+
+class IncrementalMA:
+    """Base class: update() takes one source value per closed bar and returns the MA (NaN = na)"""
+
+    def update(self, value: float) -> float:
+        raise NotImplementedError
+
+    def state(self) -> Dict:
+        """JSON-serializable state for checkpoints"""
+        result = {}
+        for name, value in vars(self).items():
+            if isinstance(value, IncrementalMA):
+                result[name] = value.state()
+            elif isinstance(value, deque):
+                result[name] = list(value)
+            else:
+                result[name] = value
+        return result
+
+    def load(self, state: Dict):
+        """Restore state written by state()"""
+        for name, value in state.items():
+            current = getattr(self, name)
+            if isinstance(current, IncrementalMA):
+                current.load(value)
+            elif isinstance(current, deque):
+                items = (tuple(item) if isinstance(item, list) else item for item in value)
+                setattr(self, name, deque(items, maxlen=current.maxlen))
+            else:
+                setattr(self, name, value)
+
+
+class SMA(IncrementalMA):
+    def __init__(self, length: int):
+        self.length = length
+        self.window = deque(maxlen=length)
+        self.total = 0.0
+        self.updates = 0
+
+    def update(self, value: float) -> float:
+        if len(self.window) == self.length:
+            self.total -= self.window[0]
+        self.window.append(value)
+        self.total += value
+        self.updates += 1
+        if self.updates % RESYNC_INTERVAL == 0:
+            self.total = math.fsum(self.window)
+        return self.total / self.length if len(self.window) == self.length else NAN
+
+
+class EMA(IncrementalMA):
+    """ta.ema, seeded with the SMA of the first length values"""
+
+    def __init__(self, length: int):
+        self.length = length
+        self.alpha = 2 / (length + 1)
+        self.seed_total = 0.0
+        self.seed_count = 0
+        self.value = NAN
+
+    def update(self, value: float) -> float:
+        if math.isnan(value):
+            return NAN
+        if math.isnan(self.value):
+            self.seed_total += value
+            self.seed_count += 1
+            if self.seed_count == self.length:
+                self.value = self.seed_total / self.length
+            return self.value
+        self.value = self.alpha * value + (1 - self.alpha) * self.value
+        return self.value
+
+
+class TEMA(IncrementalMA):
+    def __init__(self, length: int):
+        self.ema1 = EMA(length)
+        self.ema2 = EMA(length)
+        self.ema3 = EMA(length)
+
+    def update(self, value: float) -> float:
+        ema1 = self.ema1.update(value)
+        ema2 = self.ema2.update(ema1)
+        ema3 = self.ema3.update(ema2)
+        return 3 * ema1 - 3 * ema2 + ema3
+
+
+class WMA(IncrementalMA):
+    """ta.wma with a running plain and weighted sum over a ring buffer"""
+
+    def __init__(self, length: int):
+        self.length = length
+        self.window = deque(maxlen=length)
+        self.total = 0.0
+        self.weighted = 0.0
+        self.updates = 0
+
+    def update(self, value: float) -> float:
+        if math.isnan(value):
+            return NAN
+        if len(self.window) == self.length:
+            # Every weight drops by one as the window slides, the oldest value falls out
+            self.weighted += self.length * value - self.total
+            self.total += value - self.window[0]
+        else:
+            self.weighted += (len(self.window) + 1) * value
+            self.total += value
+        self.window.append(value)
+        self.updates += 1
+        if self.updates % RESYNC_INTERVAL == 0:
+            self.total = math.fsum(self.window)
+            self.weighted = math.fsum((i + 1) * v for i, v in enumerate(self.window))
+        if len(self.window) < self.length:
+            return NAN
+        return self.weighted / (self.length * (self.length + 1) / 2)
+
+
+class HMA(IncrementalMA):
+    def __init__(self, length: int):
+        self.wma_half = WMA(_pine_round(length / 2))
+        self.wma_full = WMA(length)
+        self.wma_sqrt = WMA(_pine_round(math.sqrt(length)))
+
+    def update(self, value: float) -> float:
+        raw = 2 * self.wma_half.update(value) - self.wma_full.update(value)
+        return self.wma_sqrt.update(raw)
+
+
+class KAMA(IncrementalMA):
+    def __init__(self, length: int, fast_length: int = 2, slow_length: int = 30):
+        self.length = length
+        self.fast_sc = 2 / (fast_length + 1)
+        self.slow_sc = 2 / (slow_length + 1)
+        self.prices = deque(maxlen=length + 1)
+        self.diffs = deque(maxlen=length)
+        self.volatility = 0.0
+        self.updates = 0
+        self.value = NAN
+
+    def update(self, value: float) -> float:
+        if self.prices:
+            if len(self.diffs) == self.length:
+                self.volatility -= self.diffs[0]
+            diff = abs(value - self.prices[-1])
+            self.diffs.append(diff)
+            self.volatility += diff
+            self.updates += 1
+            if self.updates % RESYNC_INTERVAL == 0:
+                self.volatility = math.fsum(self.diffs)
+        self.prices.append(value)
+
+        er = 0.0
+        if len(self.prices) == self.length + 1 and self.volatility != 0:
+            er = abs(value - self.prices[0]) / self.volatility
+        sc = (er * (self.fast_sc - self.slow_sc) + self.slow_sc) ** 2
+
+        prev = _nz(self.value, value)
+        self.value = prev + sc * (value - prev)
+        return self.value
+
+
+class ALMA(IncrementalMA):
+    """Weights are fixed per length; the window dot product is O(length)"""
+
+    def __init__(self, length: int, offset: float = 0.85, sigma: float = 6):
+        self.length = length
+        m = offset * (length - 1)
+        s = length / sigma
+        weights = [math.exp(-((i - m) ** 2) / (2 * s * s)) for i in range(length)]
+        total = sum(weights)
+        self.weights = [w / total for w in weights]
+        self.window = deque(maxlen=length)
+
+    def update(self, value: float) -> float:
+        self.window.append(value)
+        if len(self.window) < self.length:
+            return NAN
+        # Weight i applies to src[length - 1 - i], i.e. position i of the oldest-first window
+        return sum(w * v for w, v in zip(self.weights, self.window))
+
+    def state(self) -> Dict:
+        return {'window': list(self.window)}
+
+
+class RollingExtreme(IncrementalMA):
+    """ta.highest / ta.lowest with a monotonic deque, amortised O(1)"""
+
+    def __init__(self, length: int, highest: bool):
+        self.length = length
+        self.highest = highest
+        self.index = 0
+        self.candidates = deque()
+
+    def update(self, value: float) -> float:
+        while self.candidates and (self.candidates[-1][1] <= value if self.highest
+                                   else self.candidates[-1][1] >= value):
+            self.candidates.pop()
+        self.candidates.append((self.index, value))
+        if self.candidates[0][0] <= self.index - self.length:
+            self.candidates.popleft()
+        self.index += 1
+        return self.candidates[0][1] if self.index >= self.length else NAN
+
+
+class FRAMA(IncrementalMA):
+    """Fractal adaptive MA as written in the Pine script, where n3 equals n2"""
+
+    def __init__(self, length: int):
+        self.length = length
+        self.half = length / 2
+        half_window = max(1, int(self.half))
+        self.high_full = RollingExtreme(length, True)
+        self.low_full = RollingExtreme(length, False)
+        self.high_half = RollingExtreme(half_window, True)
+        self.low_half = RollingExtreme(half_window, False)
+        self.value = NAN
+
+    def update(self, value: float) -> float:
+        n1 = (self.high_full.update(value) - self.low_full.update(value)) / self.length
+        n2 = (self.high_half.update(value) - self.low_half.update(value)) / self.half
+
+        alpha = NAN
+        if not math.isnan(n1) and not math.isnan(n2):
+            if n2 > 0:
+                dimen = (math.log(n1 + n2) - math.log(n2)) / math.log(2)
+                alpha = min(1.0, max(0.01, math.exp(-4.6 * (dimen - 1))))
+            elif n1 > 0:
+                # log(0) makes the dimension infinite, so alpha takes its floor
+                alpha = 0.01
+
+        prev = _nz(self.value, value)
+        self.value = prev + alpha * (value - prev)
+        return self.value
+
+
+class VIDYA(IncrementalMA):
+    """CMO over the previous length bars, excluding the current one"""
+
+    def __init__(self, length: int):
+        self.length = length
+        self.diffs = deque(maxlen=length)
+        self.up = 0.0
+        self.down = 0.0
+        self.updates = 0
+        self.last = NAN
+        self.value = NAN
+
+    def update(self, value: float) -> float:
+        abs_cmo = 0.0
+        total = self.up + self.down
+        if len(self.diffs) == self.length and total != 0:
+            abs_cmo = abs(self.up - self.down) / total
+
+        prev = _nz(self.value, value)
+        self.value = prev + abs_cmo * 2 / (self.length + 1) * (value - prev)
+
+        # This bar's change only counts from the next bar on
+        if not math.isnan(self.last):
+            if len(self.diffs) == self.length:
+                oldest = self.diffs[0]
+                self.up -= max(oldest, 0.0)
+                self.down -= max(-oldest, 0.0)
+            diff = value - self.last
+            self.diffs.append(diff)
+            self.up += max(diff, 0.0)
+            self.down += max(-diff, 0.0)
+            self.updates += 1
+            if self.updates % RESYNC_INTERVAL == 0:
+                self.up = math.fsum(max(d, 0.0) for d in self.diffs)
+                self.down = math.fsum(max(-d, 0.0) for d in self.diffs)
+        self.last = value
+        return self.value
+
+
+class JMA(IncrementalMA):
+    def __init__(self, length: int, power: float = 2):
+        self.alpha = power / length
+        self.value = NAN
+
+    def update(self, value: float) -> float:
+        prev = _nz(self.value, value)
+        self.value = prev + self.alpha * (value - prev)
+        return self.value
+
+
+MA_CLASSES = {
+    'SMA': SMA, 'EMA': EMA, 'TEMA': TEMA, 'HMA': HMA, 'KAMA': KAMA,
+    'ALMA': ALMA, 'FRAMA': FRAMA, 'VIDYA': VIDYA, 'JMA': JMA
+}
+
+
+def _pine_round(value: float) -> int:
+    return int(math.floor(value + 0.5))
+
+
+def create_ma(ma_type: str, length: int) -> IncrementalMA:
+    """Incremental equivalent of the script's ma(src, length, type), falling back to SMA"""
+    return MA_CLASSES.get(ma_type.upper(), SMA)(length)
+
+
+class StrategyStream:
+    """MA crossover state for one symbol and timeframe"""
+
+    def __init__(self, symbol: str, timeframe: str, ma_type1: str, period1: int, ma_type2: str,
+                 period2: int, sl_percent: float, tp_percent: float, lot_size: float):
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.ma_type1 = ma_type1
+        self.period1 = period1
+        self.ma_type2 = ma_type2
+        self.period2 = period2
+        self.sl_percent = sl_percent
+        self.tp_percent = tp_percent
+        self.lot_size = lot_size
+        self.signals_emitted = 0
+        self.reset()
+
+    def reset(self):
+        """Drop all MA state so the stream warms up again"""
+        self.ma1 = create_ma(self.ma_type1, self.period1)
+        self.ma2 = create_ma(self.ma_type2, self.period2)
+        self.prev1 = NAN
+        self.prev2 = NAN
+        self.last_bar_time = None
+        self.bars_processed = 0
+
+    @property
+    def key(self) -> str:
+        return f"{self.symbol}:{self.timeframe}:{self.ma_type1}:{self.period1}:{self.ma_type2}:{self.period2}"
+
+    def on_bar(self, bar_time: int, close: float) -> Optional[str]:
+        """Advance by one closed bar; returns BUY, SELL or None"""
+        price1 = self.ma1.update(close)
+        price2 = self.ma2.update(close)
+
+        # ta.crossover / ta.crossunder; any na comparison is false
+        signal = None
+        if price1 > price2 and self.prev1 <= self.prev2:
+            signal = 'BUY'
+        elif price1 < price2 and self.prev1 >= self.prev2:
+            signal = 'SELL'
+
+        self.prev1, self.prev2 = price1, price2
+        self.last_bar_time = bar_time
+        self.bars_processed += 1
+        return signal
+
+    def state(self) -> Dict:
+        return {
+            'ma1': self.ma1.state(), 'ma2': self.ma2.state(),
+            'prev1': self.prev1, 'prev2': self.prev2,
+            'last_bar_time': self.last_bar_time, 'bars_processed': self.bars_processed
+        }
+
+    def load(self, state: Dict):
+        self.ma1.load(state['ma1'])
+        self.ma2.load(state['ma2'])
+        self.prev1 = state['prev1']
+        self.prev2 = state['prev2']
+        self.last_bar_time = state['last_bar_time']
+        self.bars_processed = state['bars_processed']
+
+
+def parse_strategies(spec: str, default_sl: float, default_tp: float, default_lot: float) -> List[StrategyStream]:
+    """
+    Parse SIGNAL_ENGINE_STRATEGIES entries of the form
+    SYMBOL:TIMEFRAME:MA1:PERIOD1:MA2:PERIOD2[:SL%:TP%:LOT], separated by commas
+    """
+    streams = []
+    for entry in (e.strip() for e in spec.split(',') if e.strip()):
+        parts = entry.split(':')
+        if len(parts) not in (6, 9):
+            raise ValueError(f"Invalid signal engine strategy '{entry}'")
+        symbol, timeframe, ma_type1, period1, ma_type2, period2 = parts[:6]
+        timeframe = timeframe.upper()
+        if timeframe not in TIMEFRAME_SECONDS:
+            raise ValueError(f"Unsupported timeframe {timeframe}, use one of {', '.join(TIMEFRAME_SECONDS)}")
+        for ma_type in (ma_type1, ma_type2):
+            if ma_type.upper() not in MA_CLASSES:
+                raise ValueError(f"Unknown MA type {ma_type}")
+        sl, tp, lot = (float(p) for p in parts[6:]) if len(parts) == 9 else (default_sl, default_tp, default_lot)
+        streams.append(StrategyStream(symbol.upper(), timeframe, ma_type1.upper(), int(period1),
+                                      ma_type2.upper(), int(period2), sl, tp, lot))
+    return streams
+
+
+class SignalEngine:
+    def __init__(self, bridge, mt5_module, streams: List[StrategyStream], interval: float = 1.0,
+                 warmup_bars: int = 1000, max_catchup_bars: int = 5000,
+                 checkpoint_path: str = '', checkpoint_interval: float = 60.0):
+        self.bridge = bridge
+        self.mt5 = mt5_module
+        self.streams = streams
+        self.interval = interval
+        self.warmup_bars = warmup_bars
+        self.max_catchup_bars = max_catchup_bars
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_interval = checkpoint_interval
+
+        self._thread = None
+        self._stop_event = threading.Event()
+        self._dirty = False
+        self._last_checkpoint = 0.0
+
+        self.poll_count = 0
+        self.error_count = 0
+        self.signal_count = 0
+        self.rejected_count = 0
+        self.restored_streams = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.streams) and self.mt5 is not None
+
+    def start(self):
+        """Restore the checkpoint and start polling for closed bars"""
+        if not self.enabled or (self._thread and self._thread.is_alive()):
+            return
+
+        self._restore()
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='signal-engine', daemon=True)
+        self._thread.start()
+        logger.info(f"Signal engine started for {', '.join(s.key for s in self.streams)}")
+
+    def stop(self):
+        """Stop polling and write a final checkpoint"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(self.interval + 5)
+            self._thread = None
+        self.checkpoint()
+
+    def poll(self):
+        """Process every newly closed bar of every stream"""
+        for stream in self.streams:
+            try:
+                self._poll_stream(stream)
+            except Exception as e:
+                self.error_count += 1
+                logger.error(f"Signal engine poll failed for {stream.key}: {str(e)}")
+        self.poll_count += 1
+
+        if self._dirty and time.time() - self._last_checkpoint >= self.checkpoint_interval:
+            self.checkpoint()
+
+    def checkpoint(self):
+        """Atomically write the state of every stream"""
+        if not self.checkpoint_path or not self._dirty:
+            return
+        state = {'saved_at': time.time(), 'streams': {s.key: s.state() for s in self.streams}}
+        temp_path = f"{self.checkpoint_path}.tmp"
+        try:
+            directory = os.path.dirname(self.checkpoint_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(temp_path, 'w') as f:
+                json.dump(state, f)
+            os.replace(temp_path, self.checkpoint_path)
+            self._dirty = False
+            self._last_checkpoint = time.time()
+        except OSError as e:
+            logger.error(f"Failed to write signal engine checkpoint: {str(e)}")
+
+    def get_stats(self) -> Dict:
+        """Get signal engine statistics"""
+        return {
+            'enabled': self.enabled,
+            'polls': self.poll_count,
+            'errors': self.error_count,
+            'signals': self.signal_count,
+            'rejected': self.rejected_count,
+            'restored_streams': self.restored_streams,
+            'streams': [{
+                'strategy': s.key,
+                'last_bar_time': s.last_bar_time,
+                'bars_processed': s.bars_processed,
+                'signals': s.signals_emitted
+            } for s in self.streams]
+        }
+
+    def _restore(self):
+        """Load stream state from the checkpoint; unknown or changed strategies warm up from bars"""
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return
+        try:
+            with open(self.checkpoint_path) as f:
+                saved = json.load(f)['streams']
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Ignoring unreadable signal engine checkpoint: {str(e)}")
+            return
+
+        for stream in self.streams:
+            if stream.key in saved:
+                stream.load(saved[stream.key])
+                self.restored_streams += 1
+        logger.info(f"Restored {self.restored_streams}/{len(self.streams)} signal engine streams from checkpoint")
+
+    def _fetch(self, stream: StrategyStream, count: int):
+        """Closed bars, oldest first; position 0 is the bar still forming"""
+        timeframe = getattr(self.mt5, f'TIMEFRAME_{stream.timeframe}')
+        with timed('bar_fetch', symbol=stream.symbol):
+            rates = self.bridge.executor.call(self.mt5.copy_rates_from_pos, stream.symbol, timeframe, 1, count,
+                                              priority=PRIORITY_QUERY)
+        if rates is None:
+            raise RuntimeError(f"copy_rates_from_pos failed: {self.mt5.last_error()}")
+        return rates
+
+    def _poll_stream(self, stream: StrategyStream):
+        if stream.last_bar_time is None:
+            # Cold start: replay history silently so the MAs are seeded
+            rates = self._fetch(stream, self.warmup_bars)
+            for rate in rates:
+                stream.on_bar(int(rate['time']), float(rate['close']))
+            self._dirty = bool(len(rates))
+            logger.info(f"Signal engine warmed up {stream.key} on {len(rates)} bars")
+            return
+
+        rates = self._fetch(stream, 3)
+        if len(rates) and int(rates[0]['time']) > stream.last_bar_time:
+            # Bars were missed (restart or stall); fetch enough to bridge the gap
+            seconds = TIMEFRAME_SECONDS[stream.timeframe]
+            missed = int((int(rates[-1]['time']) - stream.last_bar_time) // seconds) + 2
+            rates = self._fetch(stream, min(missed, self.max_catchup_bars))
+            if len(rates) and int(rates[0]['time']) > stream.last_bar_time:
+                logger.warning(f"Signal engine gap for {stream.key} exceeds {self.max_catchup_bars} bars, re-warming")
+                stream.reset()
+                return
+
+        new_rates = [rate for rate in rates if int(rate['time']) > stream.last_bar_time]
+        for index, rate in enumerate(new_rates):
+            with timed('signal_eval', symbol=stream.symbol):
+                signal = stream.on_bar(int(rate['time']), float(rate['close']))
+            self._dirty = True
+            # Only the latest closed bar may trade; crossovers in caught-up history are stale
+            if signal and index == len(new_rates) - 1:
+                self._emit(stream, signal, int(rate['time']))
+
+    def _emit(self, stream: StrategyStream, signal: str, bar_time: int):
+        """Send a crossover into the order path, deduplicated on the bar time"""
+        bridge = self.bridge
+        # Unattended orders pass the same breaker and pre-trade risk checks as webhook signals
+        try:
+            bridge.supervisor.guard()
+        except CircuitOpenError as e:
+            self._reject(stream, signal, str(e))
+            return
+
+        data = {'strategy_time': bar_time, 'client_id': f'signal-engine:{stream.key}'}
+        fingerprint = bridge.idempotency.fingerprint(signal, stream.symbol, data)
+        if bridge.idempotency.reserve(fingerprint):
+            return
+
+        logger.info(f"Signal engine {signal} {stream.symbol} on {stream.key} bar {bar_time}")
+        decision = None
+        lot_size = stream.lot_size
+
+        def abandon():
+            bridge.idempotency.release(fingerprint)
+            if decision:
+                bridge.risk_engine.release(decision)
+
+        try:
+            decision = bridge.check_risk(signal, stream.symbol, lot_size, stream.sl_percent)
+            if decision:
+                lot_size = decision['lot_size']
+
+            # Durable before it is queued, and always ahead of the execution thread's SUBMITTED record
+            order_id = bridge.executor.new_order_id()
+            bridge.journal_order(order_id, STATE_RECEIVED, wait=True, signal=signal, symbol=stream.symbol,
+                                 lot_size=lot_size, sl_percent=stream.sl_percent, tp_percent=stream.tp_percent,
+                                 fingerprint=fingerprint)
+            try:
+                order_id, future = bridge.executor.submit_order(
+                    bridge.execute_signal, signal, stream.symbol, lot_size, stream.sl_percent, stream.tp_percent,
+                    priority=PRIORITY_OPEN, order_id=order_id
+                )
+            except QueueFullError as e:
+                bridge.journal_order(order_id, STATE_RESULT, success=False, error=str(e))
+                raise
+        except RiskRejected as e:
+            abandon()
+            self._reject(stream, signal, str(e), risk=e.details)
+            return
+        except QueueFullError as e:
+            abandon()
+            self.error_count += 1
+            logger.warning(f"Signal engine dropped {signal} {stream.symbol}: {str(e)}")
+            return
+        except Exception:
+            abandon()
+            raise
+
+        if decision:
+            future.add_done_callback(lambda f: bridge.risk_engine.release(decision))
+        audit('order_submitted', order_id=order_id, signal=signal, symbol=stream.symbol, lot_size=lot_size,
+              sl_percent=stream.sl_percent, tp_percent=stream.tp_percent, source='signal_engine', strategy=stream.key)
+        bridge.idempotency.update(fingerprint, {'status': 'pending', 'order_id': order_id})
+        future.add_done_callback(lambda f: self._record_outcome(fingerprint, order_id, stream, signal, lot_size, f))
+        stream.signals_emitted += 1
+        self.signal_count += 1
+
+    def _reject(self, stream: StrategyStream, signal: str, error: str, **fields):
+        self.rejected_count += 1
+        logger.warning(f"Signal engine refused {signal} {stream.symbol}: {error}")
+        audit('signal_rejected', signal=signal, symbol=stream.symbol, error=error, source='signal_engine',
+              strategy=stream.key, **fields)
+
+    def _record_outcome(self, fingerprint: str, order_id: str, stream: StrategyStream, signal: str,
+                        lot_size: float, future):
+        try:
+            result = future.result()
+            record = {'status': 'done', 'order_id': order_id, 'result': result}
+        except Exception as e:
+            result = {'success': False, 'error': str(e)}
+            record = {'status': 'failed', 'order_id': order_id, 'error': str(e)}
+        self.bridge.idempotency.update(fingerprint, record)
+        audit('order_result', order_id=order_id, **result)
+        self.bridge.journal_order(order_id, STATE_RESULT, **result)
+        self.bridge.notifier.notify({
+            'signal': signal, 'symbol': stream.symbol, 'lot_size': lot_size,
+            'sl_percent': stream.sl_percent, 'tp_percent': stream.tp_percent,
+            'source': 'signal_engine', 'strategy': stream.key, 'order_id': order_id, 'mt5_response': result
+        })
+
+    def _run(self):
+        """Background poll loop"""
+        while not self._stop_event.wait(self.interval):
+            self.poll()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+TradingView alert parsing for the MT5 Bridge
+Python port of the n8n "Parse Signal" node, so alerts can be ingested directly
+"""
+
+import hmac
+import json
+from typing import Dict, Optional
+
+VALID_SIGNALS = ['BUY', 'SELL', 'CLOSE']
+
+# Fields that may carry the shared secret inside the alert body
+SECRET_FIELDS = ['passphrase', 'secret']
+
+
+class SignalValidationError(Exception):
+    """Raised when an alert cannot be turned into a valid signal"""
+
+
+def decode_alert(raw_body: str) -> Dict:
+    """Decode an alert body, unwrapping a JSON string sent in 'message'"""
+    try:
+        body = json.loads(raw_body) if raw_body else None
+    except ValueError:
+        raise SignalValidationError('Alert body is not valid JSON')
+
+    if not isinstance(body, dict):
+        raise SignalValidationError('Alert body must be a JSON object')
+
+    if isinstance(body.get('message'), str):
+        try:
+            message = json.loads(body['message'])
+            if isinstance(message, dict):
+                # Secrets may sit next to the message rather than inside it
+                for field in SECRET_FIELDS:
+                    if field in body and field not in message:
+                        message[field] = body[field]
+                return message
+        except ValueError:
+            pass
+
+    return body
+
+
+def verify_secret(expected: str, body: Dict, header_value: Optional[str] = None,
+                  query_value: Optional[str] = None) -> bool:
+    """Check the shared secret from a header, query string or body field"""
+    if not expected:
+        return False
+
+    candidates = [header_value, query_value] + [body.get(field) for field in SECRET_FIELDS]
+    return any(
+        isinstance(candidate, str) and hmac.compare_digest(candidate.encode(), expected.encode())
+        for candidate in candidates
+    )
+
+
+def parse_signal(data: Dict, default_symbol: str, default_lot_size: float) -> Dict:
+    """Extract and validate signal fields, applying the same defaults as n8n"""
+    signal = str(data.get('signal') or data.get('action') or '').upper()
+    if signal not in VALID_SIGNALS:
+        raise SignalValidationError(f"Invalid signal '{signal}'. Use BUY, SELL, or CLOSE")
+
+    symbol = str(data.get('symbol') or default_symbol).upper()
+
+    try:
+        lot_size = float(data.get('lot_size') or default_lot_size)
+        sl_percent = float(data.get('sl_percent') or 1.0)
+        tp_percent = float(data.get('tp_percent') or 2.0)
+    except (TypeError, ValueError):
+        raise SignalValidationError('lot_size, sl_percent and tp_percent must be numbers')
+
+    if lot_size <= 0:
+        raise SignalValidationError('lot_size must be positive')
+    if sl_percent < 0 or tp_percent < 0:
+        raise SignalValidationError('sl_percent and tp_percent must not be negative')
+
+    return {
+        'signal': signal,
+        'symbol': symbol,
+        'lot_size': lot_size,
+        'sl_percent': sl_percent,
+        'tp_percent': tp_percent,
+        'strategy_time': data.get('strategy_time', data.get('timestamp')),
+        'client_id': data.get('client_id')
+    }
+
+
+def redact(data: Dict) -> Dict:
+    """Copy of an alert without secret fields, safe for logging"""
+    return {key: value for key, value in data.items() if key not in SECRET_FIELDS}
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Account and position state mirror for the MT5 Bridge
+Polls the terminal in the background and serves versioned, immutable snapshots
+"""
+
+import json
+import logging
+import threading
+from collections import namedtuple
+from datetime import datetime, timezone
+from typing import Optional
+
+from execution import PRIORITY_QUERY
+
+logger = logging.getLogger(__name__)
+
+# Sections are stored as tuples and pre-serialized JSON so readers can never mutate them.
+# `version` changes when positions, orders or the balance change, not when prices move;
+# `account_version` changes with any account field. `collected` is the sequence number
+# of the terminal read the snapshot reflects.
+Snapshot = namedtuple('Snapshot', [
+    'version', 'account_version', 'updated_at', 'account', 'positions', 'orders',
+    'account_json', 'positions_json', 'orders_json', 'collected'
+])
+
+# Fields that move with every tick while anything is open
+FLOATING_ACCOUNT_FIELDS = ('equity', 'margin', 'margin_free', 'margin_level', 'profit')
+FLOATING_POSITION_FIELDS = ('price_current', 'profit')
+
+
+def without(record, fields):
+    """A record with the floating fields left out, for comparing state across polls"""
+    return {k: v for k, v in record.items() if k not in fields} if record else record
+
+
+class StateMirror:
+    def __init__(self, bridge, interval: float = 1.0):
+        self.bridge = bridge
+        self.interval = interval
+
+        self._snapshot = None
+        self._version = 0
+        self._account_version = 0
+        self._collect_seq = 0
+        self._publish_lock = threading.Lock()
+        self._thread = None
+        self._stop_event = threading.Event()
+        self._wake = threading.Event()
+        self._listeners = []
+
+        self.poll_count = 0
+        self.error_count = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.interval > 0
+
+    def start(self):
+        """Take a first snapshot and start the background poller"""
+        if not self.enabled or (self._thread and self._thread.is_alive()):
+            return
+
+        self.refresh()
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='state-mirror', daemon=True)
+        self._thread.start()
+        logger.info(f"State mirror started ({self.interval}s interval)")
+
+    def stop(self):
+        """Stop the background poller"""
+        self._stop_event.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(self.interval + 1)
+            self._thread = None
+
+    def add_listener(self, callback):
+        """Call callback(previous, snapshot) whenever a new snapshot is published"""
+        self._listeners.append(callback)
+
+    def wake(self):
+        """Poll now instead of waiting for the next interval, e.g. after an order is sent"""
+        self._wake.set()
+
+    def get_snapshot(self) -> Optional[Snapshot]:
+        """Get the latest snapshot, or None before the first poll"""
+        return self._snapshot
+
+    @property
+    def collect_seq(self) -> int:
+        """Sequence number of the latest terminal read started; later reads see everything done before now"""
+        return self._collect_seq
+
+    def refresh(self) -> Snapshot:
+        """Poll the terminal once and publish a new snapshot if anything changed"""
+        seq, account, positions, orders = self.bridge.executor.call(self._collect, priority=PRIORITY_QUERY)
+        self.poll_count += 1
+
+        positions = tuple(positions)
+        orders = tuple(orders)
+
+        with self._publish_lock:
+            current = self._snapshot
+            if current and current.collected > seq:
+                # A newer read was published while this one was in flight
+                return current
+            if current and (current.account, current.positions, current.orders) == (account, positions, orders):
+                self._snapshot = current._replace(collected=seq)
+                return self._snapshot
+
+            if not current or self._state(current.account, current.positions, current.orders) != \
+                    self._state(account, positions, orders):
+                self._version += 1
+            if not current or current.account != account:
+                self._account_version += 1
+            self._snapshot = Snapshot(
+                version=self._version,
+                account_version=self._account_version,
+                updated_at=datetime.now(timezone.utc).isoformat(),
+                account=account,
+                positions=positions,
+                orders=orders,
+                account_json=json.dumps(account),
+                positions_json=json.dumps({'positions': list(positions)}),
+                orders_json=json.dumps({'orders': list(orders)}),
+                collected=seq
+            )
+        for callback in self._listeners:
+            try:
+                callback(current, self._snapshot)
+            except Exception as e:
+                logger.error(f"State mirror listener failed: {str(e)}")
+        return self._snapshot
+
+    def get_stats(self):
+        """Get mirror statistics"""
+        snapshot = self._snapshot
+        return {
+            'enabled': self.enabled,
+            'version': snapshot.version if snapshot else 0,
+            'updated_at': snapshot.updated_at if snapshot else None,
+            'polls': self.poll_count,
+            'errors': self.error_count
+        }
+
+    @staticmethod
+    def _state(account, positions, orders):
+        """What the snapshot version tracks: everything but the floating account and position fields"""
+        return (without(account, FLOATING_ACCOUNT_FIELDS),
+                [without(p, FLOATING_POSITION_FIELDS) for p in positions], orders)
+
+    def _collect(self):
+        """Read account, positions and orders in one execution slot"""
+        # Numbered on the execution thread, so a read sees every order that finished before it started
+        self._collect_seq += 1
+        return (
+            self._collect_seq,
+            self.bridge.get_account_info(),
+            self.bridge.get_positions(),
+            self.bridge.get_orders()
+        )
+
+    def _run(self):
+        """Background poll loop"""
+        while not self._stop_event.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if self._stop_event.is_set():
+                break
+            try:
+                self.refresh()
+            except Exception as e:
+                self.error_count += 1
+                logger.error(f"State mirror poll failed: {str(e)}")
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Live event stream for the MT5 Bridge
+One producer feeds every subscriber. Position and account changes are diffed from
+the state mirror's snapshots, and bid/ask quotes come from a single tick poller that
+only runs for symbols someone is subscribed to, so the terminal is polled once
+however many clients are connected.
+
+Each subscriber has its own bounded buffer. Quotes are coalesced to the latest one
+per symbol, and a subscriber that falls too far behind has its backlog dropped and
+is sent a fresh snapshot (resync), so a slow client never holds up the bridge.
+
+Events (Server-Sent Events on /stream):
+    snapshot / resync   account, positions, orders and last quotes
+    position_opened, position_modified, position_closed
+    account             balance, equity or margin changed
+    tick                bid/ask for a subscribed symbol
+"""
+
+import itertools
+import json
+import logging
+import threading
+from collections import deque
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from execution import PRIORITY_QUERY
+
+logger = logging.getLogger(__name__)
+
+ACCOUNT_FIELDS = ('balance', 'equity', 'margin', 'margin_free', 'margin_level', 'profit')
+POSITION_FIELDS = ('volume', 'sl', 'tp')
+
+
+class StreamFull(Exception):
+    """Raised when the subscriber limit is reached"""
+
+
+def format_event(event: Dict) -> str:
+    """Serialize an event in the text/event-stream format"""
+    return f"id: {event['id']}\nevent: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+
+
+class Subscriber:
+    """One client's buffer of pending events"""
+
+    def __init__(self, symbols: List[str], max_events: int):
+        self.symbols = set(symbols)
+        self.max_events = max_events
+        self.events = deque()
+        # Latest unsent quote per symbol; older ones are superseded, not queued
+        self.ticks: Dict[str, Dict] = {}
+        self.resync = False
+        self.closed = False
+        self.dropped = 0
+        self._cond = threading.Condition()
+
+    def publish(self, event: Dict):
+        with self._cond:
+            if len(self.events) >= self.max_events:
+                # Too far behind: drop the backlog, the client gets a fresh snapshot instead
+                self.dropped += len(self.events)
+                self.events.clear()
+                self.resync = True
+            self.events.append(event)
+            self._cond.notify()
+
+    def publish_tick(self, symbol: str, event: Dict):
+        with self._cond:
+            self.ticks[symbol] = event
+            self._cond.notify()
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify()
+
+    def wait(self, timeout: float) -> Tuple[bool, List[Dict]]:
+        """Take everything pending, waiting up to timeout for something to arrive"""
+        with self._cond:
+            if not (self.events or self.ticks or self.resync or self.closed):
+                self._cond.wait(timeout)
+            resync, self.resync = self.resync, False
+            batch = list(self.events) + list(self.ticks.values())
+            self.events.clear()
+            self.ticks.clear()
+        return resync, batch
+
+
+class StreamHub:
+    """Shared producer fanning position, account and quote events out to subscribers"""
+
+    def __init__(self, bridge, tick_interval: float = 0.25, heartbeat: float = 15.0,
+                 max_events: int = 1000, max_clients: int = 8):
+        self.bridge = bridge
+        self.tick_interval = tick_interval
+        self.heartbeat = heartbeat
+        self.max_events = max_events
+        self.max_clients = max_clients
+
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._sequence = itertools.count(1)
+        self._quotes: Dict[str, Dict] = {}
+        self._thread = None
+        self._stop_event = threading.Event()
+
+        self.subscriber_count = 0
+        self.event_count = 0
+        self.tick_count = 0
+        self.resync_count = 0
+        self.dropped_count = 0
+        self.error_count = 0
+
+        bridge.state_mirror.add_listener(self._on_snapshot)
+
+    def start(self):
+        """Start the tick poller"""
+        if self.tick_interval <= 0 or (self._thread and self._thread.is_alive()):
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='stream-ticks', daemon=True)
+        self._thread.start()
+        logger.info(f"Stream hub started ({self.tick_interval}s quote interval)")
+
+    def stop(self):
+        """Stop the tick poller and end every stream"""
+        self._stop_event.set()
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            subscriber.close()
+        if self._thread:
+            self._thread.join(self.tick_interval + 5)
+            self._thread = None
+
+    def subscribe(self, symbols: List[str]) -> Subscriber:
+        with self._lock:
+            if len(self._subscribers) >= self.max_clients:
+                raise StreamFull(f"Stream limit of {self.max_clients} clients reached")
+            subscriber = Subscriber(symbols, self.max_events)
+            self._subscribers.add(subscriber)
+            self.subscriber_count += 1
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        with self._lock:
+            if subscriber not in self._subscribers:
+                return
+            self._subscribers.discard(subscriber)
+            self.dropped_count += subscriber.dropped
+        subscriber.close()
+
+    def stream(self, subscriber: Subscriber) -> Iterator[str]:
+        """Text/event-stream body for one subscriber, starting with a snapshot"""
+        yield 'retry: 3000\n\n'
+        yield format_event(self._snapshot_event('snapshot', subscriber))
+        while not subscriber.closed:
+            resync, batch = subscriber.wait(self.heartbeat)
+            if resync:
+                self.resync_count += 1
+                yield format_event(self._snapshot_event('resync', subscriber))
+            for event in batch:
+                yield format_event(event)
+            if not batch and not resync:
+                # Comment line, keeps proxies from closing an idle stream and detects gone clients
+                yield ': keepalive\n\n'
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            subscribers = list(self._subscribers)
+        return {
+            'subscribers': len(subscribers),
+            'max_clients': self.max_clients,
+            'subscribers_total': self.subscriber_count,
+            'symbols': sorted(set().union(*(s.symbols for s in subscribers))),
+            'events': self.event_count,
+            'ticks': self.tick_count,
+            'resyncs': self.resync_count,
+            'dropped_events': self.dropped_count + sum(s.dropped for s in subscribers),
+            'errors': self.error_count
+        }
+
+    def _event(self, name: str, data) -> Dict:
+        return {'id': next(self._sequence), 'event': name, 'data': data}
+
+    def _snapshot_event(self, name: str, subscriber: Subscriber) -> Dict:
+        snapshot = self.bridge.state_mirror.get_snapshot()
+        return self._event(name, {
+            'version': snapshot.version if snapshot else None,
+            'account': snapshot.account if snapshot else None,
+            'positions': list(snapshot.positions) if snapshot else [],
+            'orders': list(snapshot.orders) if snapshot else [],
+            'quotes': {s: self._quotes[s] for s in subscriber.symbols if s in self._quotes}
+        })
+
+    def _broadcast(self, name: str, data):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        event = self._event(name, data)
+        for subscriber in subscribers:
+            subscriber.publish(event)
+        self.event_count += 1
+
+    def _on_snapshot(self, previous, snapshot):
+        """Turn a new state mirror snapshot into position and account events"""
+        if previous is None or not self._subscribers:
+            return
+
+        before = {p['ticket']: p for p in previous.positions}
+        after = {p['ticket']: p for p in snapshot.positions}
+        for ticket, position in after.items():
+            old = before.get(ticket)
+            if old is None:
+                self._broadcast('position_opened', position)
+            elif any(old.get(f) != position.get(f) for f in POSITION_FIELDS):
+                self._broadcast('position_modified', position)
+        for ticket in before.keys() - after.keys():
+            self._broadcast('position_closed', before[ticket])
+
+        account = snapshot.account
+        if account and (previous.account is None or
+                        any(previous.account.get(f) != account.get(f) for f in ACCOUNT_FIELDS)):
+            self._broadcast('account', account)
+
+    def _collect_ticks(self, symbols: List[str]) -> Dict[str, Optional[Dict]]:
+        """Quotes for the subscribed symbols in one execution slot, reusing fresh cached ticks"""
+        cache = self.bridge.symbol_cache
+        return {symbol: cache.get_tick(symbol, max_age=self.tick_interval) for symbol in symbols}
+
+    def _run(self):
+        """Poll quotes for subscribed symbols and push the ones that changed"""
+        while not self._stop_event.wait(self.tick_interval):
+            with self._lock:
+                subscribers = list(self._subscribers)
+            symbols = sorted(set().union(*(s.symbols for s in subscribers)))
+            if not symbols or not self.bridge.mt5_initialized:
+                continue
+
+            try:
+                ticks = self.bridge.executor.call(self._collect_ticks, symbols, priority=PRIORITY_QUERY,
+                                                  timeout=max(self.tick_interval * 4, 1.0))
+            except Exception as e:
+                self.error_count += 1
+                logger.error(f"Stream quote poll failed: {str(e)}")
+                continue
+
+            for symbol, tick in ticks.items():
+                if not tick:
+                    continue
+                quote = {'symbol': symbol, 'bid': tick['bid'], 'ask': tick['ask'], 'time': tick['time']}
+                last = self._quotes.get(symbol)
+                if last and (last['bid'], last['ask']) == (quote['bid'], quote['ask']):
+                    continue
+                self._quotes[symbol] = quote
+                event = self._event('tick', quote)
+                self.tick_count += 1
+                for subscriber in subscribers:
+                    if symbol in subscriber.symbols:
+                        subscriber.publish_tick(symbol, event)
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Symbol cache for the MT5 Bridge
+Keeps static contract specs and short-lived tick snapshots to save terminal round-trips
+"""
+
+import logging
+import time
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class SymbolCache:
+    def __init__(self, mt5_module, spec_ttl: float = 3600.0, tick_ttl: float = 0.2):
+        self.mt5 = mt5_module
+        self.spec_ttl = spec_ttl  # seconds, static contract fields
+        self.tick_ttl = tick_ttl  # seconds, bid/ask snapshots
+
+        self._specs = {}
+        self._ticks = {}
+        self._selected = set()
+
+        self.stats = {
+            'spec_hits': 0,
+            'spec_misses': 0,
+            'tick_hits': 0,
+            'tick_misses': 0,
+            'terminal_calls': 0
+        }
+
+    def warm_up(self, symbols: Iterable[str]):
+        """Select symbols in Market Watch and prefetch their specs"""
+        for symbol in symbols:
+            if self.get_spec(symbol, refresh=True):
+                logger.info(f"Symbol cache warmed up for {symbol}")
+            else:
+                logger.warning(f"Symbol cache warm-up failed for {symbol}")
+
+    def invalidate(self, symbol: Optional[str] = None):
+        """Drop cached data for one symbol, or everything"""
+        if symbol is None:
+            self._specs.clear()
+            self._ticks.clear()
+            self._selected.clear()
+        else:
+            self._specs.pop(symbol, None)
+            self._ticks.pop(symbol, None)
+            self._selected.discard(symbol)
+
+    def get_spec(self, symbol: str, refresh: bool = False) -> Optional[Dict]:
+        """Get static contract specs for a symbol"""
+        entry = self._specs.get(symbol)
+        if entry and not refresh and time.monotonic() - entry['fetched_at'] < self.spec_ttl:
+            self.stats['spec_hits'] += 1
+            return entry['spec']
+
+        self.stats['spec_misses'] += 1
+
+        if symbol not in self._selected:
+            self.stats['terminal_calls'] += 1
+            if not self.mt5.symbol_select(symbol, True):
+                return None
+            self._selected.add(symbol)
+
+        self.stats['terminal_calls'] += 1
+        info = self.mt5.symbol_info(symbol)
+        if not info:
+            return None
+
+        spec = {
+            'symbol': info.name,
+            'digits': info.digits,
+            'point': info.point,
+            'volume_min': info.volume_min,
+            'volume_max': info.volume_max,
+            'volume_step': info.volume_step,
+            'filling_mode': info.filling_mode,
+            'order_mode': info.order_mode,
+            'trade_exemode': info.trade_exemode,
+            'trade_stops_level': info.trade_stops_level,
+            'trade_contract_size': info.trade_contract_size
+        }
+        self._specs[symbol] = {'spec': spec, 'fetched_at': time.monotonic()}
+
+        # symbol_info carries the current quote as well, seed the tick tier with it
+        self._store_tick(symbol, info.bid, info.ask, info.time)
+
+        return spec
+
+    def get_tick(self, symbol: str, max_age: Optional[float] = None) -> Optional[Dict]:
+        """Get a bid/ask snapshot no older than max_age seconds"""
+        max_age = self.tick_ttl if max_age is None else max_age
+
+        entry = self._ticks.get(symbol)
+        if entry and time.monotonic() - entry['fetched_at'] < max_age:
+            self.stats['tick_hits'] += 1
+            return entry
+
+        self.stats['tick_misses'] += 1
+        self.stats['terminal_calls'] += 1
+        tick = self.mt5.symbol_info_tick(symbol)
+        if not tick:
+            return None
+
+        return self._store_tick(symbol, tick.bid, tick.ask, tick.time)
+
+    def peek_spec(self, symbol: str) -> Optional[Dict]:
+        """Last cached spec of any age, without a terminal call"""
+        entry = self._specs.get(symbol)
+        return entry['spec'] if entry else None
+
+    def peek_tick(self, symbol: str) -> Optional[Dict]:
+        """Last cached quote of any age, without a terminal call"""
+        return self._ticks.get(symbol)
+
+    def has_spec(self, symbol: str) -> bool:
+        """Whether the symbol already resolved to a spec, without a terminal call"""
+        return symbol in self._specs
+
+    def symbols(self) -> List[str]:
+        """Symbols with cached specs"""
+        return list(self._specs)
+
+    def get_stats(self) -> Dict:
+        """Get cache hit/miss counters"""
+        stats = dict(self.stats)
+        stats['symbols'] = len(self._specs)
+        return stats
+
+    def _store_tick(self, symbol: str, bid: float, ask: float, tick_time: int) -> Dict:
+        entry = {'bid': bid, 'ask': ask, 'time': tick_time, 'fetched_at': time.monotonic()}
+        self._ticks[symbol] = entry
+        return entry
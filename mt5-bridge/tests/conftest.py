@@ -0,0 +1,91 @@
+"""
+Shared fixtures for the bridge tests
+Everything runs against mt5_simulator, with data and logs in a temporary directory.
+The environment is set here, before app is first imported, because app reads it at
+import time and when the bridge is created.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import pytest
+
+BRIDGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Flat bridge modules, and the repository root for the backtest package
+sys.path[:0] = [BRIDGE_DIR, os.path.dirname(BRIDGE_DIR)]
+
+DATA_DIR = tempfile.mkdtemp(prefix='mt5-bridge-tests-')
+os.environ.update({
+    'MT5_BACKEND': 'simulator',
+    'SIM_SEED': '7',
+    'LOG_DIR': os.path.join(DATA_DIR, 'logs'),
+    'LOG_CONSOLE': 'false',
+    'TRADE_JOURNAL_PATH': os.path.join(DATA_DIR, 'trade_journal'),
+    'DEALS_JOURNAL_PATH': os.path.join(DATA_DIR, 'deals.sqlite'),
+    'HISTORY_STORE_PATH': os.path.join(DATA_DIR, 'history'),
+    'SIGNAL_ENGINE_CHECKPOINT': os.path.join(DATA_DIR, 'signal_engine.json'),
+    'SIGNAL_ENGINE_STRATEGIES': '',
+    'HISTORY_SYNC_SERIES': '',
+    'ACCOUNTS_FILE': '',
+    'WEBHOOK_SECRET': '',
+    'N8N_NOTIFY_URL': '',
+    'IDEMPOTENCY_BACKEND': 'memory',
+    'ACCEPT_THEN_EXECUTE': 'false',
+    'STATE_MIRROR_INTERVAL': '0.1',
+    # Supervisor tests drive their own instance, the shared bridge never trips on its own
+    'MT5_HEALTH_CHECK_INTERVAL': '0',
+    'RISK_REFRESH_INTERVAL': '0',
+})
+
+import mt5_simulator
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(DATA_DIR, ignore_errors=True)
+
+
+@pytest.fixture(scope='session')
+def bridge():
+    """The process-wide bridge, connected to the simulator"""
+    import app
+    app.create_app()
+    return app.mt5_bridge
+
+
+@pytest.fixture
+def client(bridge):
+    """Test client on a flat simulator account with no injected dealer failures"""
+    import app
+    terminal = mt5_simulator._terminal
+    with terminal.lock:
+        terminal.positions.clear()
+        terminal.requote_rate = terminal.reject_rate = 0.0
+    bridge.state_mirror.refresh()
+    flask_app = app.create_app(bridge)
+    flask_app.config['PROPAGATE_EXCEPTIONS'] = False
+    return flask_app.test_client()
+
+
+@pytest.fixture
+def simulator():
+    """The simulator module, connected, on a flat account"""
+    mt5_simulator.initialize()
+    with mt5_simulator._terminal.lock:
+        mt5_simulator._terminal.positions.clear()
+        mt5_simulator._terminal.requote_rate = mt5_simulator._terminal.reject_rate = 0.0
+    return mt5_simulator
+
+
+@pytest.fixture
+def wait_for():
+    """Poll a condition set by a background thread, e.g. an order's done callbacks"""
+    def wait(condition, timeout=5.0):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            if time.monotonic() > deadline:
+                raise AssertionError('condition not met within the timeout')
+            time.sleep(0.01)
+    return wait
@@ -0,0 +1,127 @@
+"""
+Multi-account routing: which workers a signal goes to, and the router endpoints against
+two real worker processes on the simulator
+"""
+
+import json
+import os
+import socket
+
+import pytest
+
+from account_pool import AccountPool
+
+ACCOUNTS = [
+    {'name': 'alpha', 'login': 1, 'server': 'Sim', 'tags': ['primary'], 'symbols': ['EURUSD']},
+    {'name': 'beta', 'login': 2, 'server': 'Sim', 'tags': ['prop'], 'env': {'LOT_SIZE': '0.05'}},
+]
+
+
+def names(workers):
+    return [w.name for w in workers]
+
+
+def test_route_by_symbol_and_targets():
+    pool = AccountPool(ACCOUNTS)
+    assert names(pool.route('EURUSD')) == ['alpha', 'beta']
+    assert names(pool.route('XAUUSD')) == ['beta']
+    assert names(pool.route('XAUUSD', 'alpha')) == ['alpha']
+    assert names(pool.route('EURUSD', ['PROP'])) == ['beta']
+    assert names(pool.route('EURUSD', 'primary, prop')) == ['alpha', 'beta']
+    assert names(pool.route('EURUSD', 'all')) == ['alpha', 'beta']
+    assert pool.route('EURUSD', 'nobody') == []
+    assert pool.worker('BETA').name == 'beta'
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture(scope='module')
+def router(bridge, tmp_path_factory):
+    """A router bridge with one worker process per account, each on its own simulator"""
+    import app
+    workdir = tmp_path_factory.mktemp('router')
+    accounts_file = workdir / 'accounts.json'
+    accounts_file.write_text(json.dumps([dict(a, port=free_port()) for a in ACCOUNTS]))
+
+    # Workers keep their journals and logs under the working directory they start in
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    os.environ['ACCOUNTS_FILE'] = str(accounts_file)
+    try:
+        router = app.MT5Bridge()
+    finally:
+        os.environ['ACCOUNTS_FILE'] = ''
+        os.chdir(cwd)
+    yield router
+    router.account_pool.stop()
+    app.create_app(bridge)
+
+
+@pytest.fixture
+def router_client(router):
+    import app
+    return app.create_app(router).test_client()
+
+
+def by_account(body):
+    return {r['account']: r for r in body['results']}
+
+
+def test_router_stays_off_the_terminal(router):
+    assert not router.mt5_initialized
+    assert router.trade_journal is None and router.state_mirror is None and router.supervisor is None
+
+
+def test_signal_goes_to_every_account_trading_the_symbol(router_client):
+    response = router_client.post('/webhook/tradingview', json={'signal': 'BUY', 'symbol': 'EURUSD'})
+    results = by_account(response.get_json())
+
+    assert response.status_code == 200 and set(results) == {'alpha', 'beta'}
+    # Each worker applies its own default lot size to a signal that left it out
+    assert results['alpha']['result']['volume'] == 0.01
+    assert results['beta']['result']['volume'] == 0.05
+
+
+def test_signal_targets_and_unrouted_symbols(router_client):
+    response = router_client.post('/webhook/tradingview', json={'signal': 'BUY', 'symbol': 'GBPUSD'})
+    assert set(by_account(response.get_json())) == {'beta'}
+
+    response = router_client.post('/webhook/tradingview', json={'signal': 'BUY', 'symbol': 'EURUSD',
+                                                                'accounts': 'primary', 'lot_size': 0.02})
+    results = by_account(response.get_json())
+    assert set(results) == {'alpha'} and results['alpha']['result']['volume'] == 0.02
+
+    response = router_client.post('/webhook/tradingview', json={'signal': 'BUY', 'symbol': 'EURUSD',
+                                                                'accounts': 'nobody'})
+    assert response.status_code == 400
+
+
+def test_reads_fan_out_and_order_lookups_go_back_to_their_account(router_client, wait_for):
+    response = router_client.post('/webhook/tradingview?async=true', json={'signal': 'SELL', 'symbol': 'XAUUSD'})
+    beta = by_account(response.get_json())['beta']['result']
+    assert beta['status_url'] == f"/orders/{beta['order_id']}?account=beta"
+
+    order = router_client.get(beta['status_url'])
+    assert order.status_code == 200 and order.get_json()['order_id'] == beta['order_id']
+
+    def beta_holds_xauusd():
+        positions = by_account(router_client.get('/positions').get_json())
+        assert set(positions) == {'alpha', 'beta'}
+        return any(p['symbol'] == 'XAUUSD' for p in positions['beta']['result']['positions'])
+    wait_for(beta_holds_xauusd)
+
+    assert router_client.get('/symbol/NOPE').status_code == 404
+
+
+def test_close_all_is_broadcast(router_client, wait_for):
+    response = router_client.post('/positions/close_all')
+    assert response.status_code == 200 and set(by_account(response.get_json())) == {'alpha', 'beta'}
+
+    def flat():
+        positions = by_account(router_client.get('/positions').get_json())
+        return all(r['result']['positions'] == [] for r in positions.values())
+    wait_for(flat)
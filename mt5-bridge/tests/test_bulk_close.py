@@ -0,0 +1,65 @@
+"""
+Bulk close: CLOSE_BY netting of opposite positions on hedging accounts, market closes for the rest
+"""
+
+import pytest
+
+from bulk_close import BulkCloser
+from order_sender import OrderSender
+from symbol_cache import SymbolCache
+
+
+@pytest.fixture
+def closer(simulator):
+    cache = SymbolCache(simulator)
+    return BulkCloser(simulator, cache, 123456, OrderSender(simulator, cache))
+
+
+def open_position(mt5, symbol, order_type, volume):
+    tick = mt5.symbol_info_tick(symbol)
+    result = mt5.order_send({
+        'action': mt5.TRADE_ACTION_DEAL, 'symbol': symbol, 'volume': volume, 'type': order_type,
+        'price': tick.ask if order_type == mt5.ORDER_TYPE_BUY else tick.bid, 'deviation': 10,
+        'magic': 123456, 'type_filling': mt5.ORDER_FILLING_FOK,
+    })
+    assert result.retcode == mt5.TRADE_RETCODE_DONE
+    return result.order
+
+
+def test_opposite_positions_are_netted_with_close_by(simulator, closer):
+    buy = open_position(simulator, 'EURUSD', simulator.ORDER_TYPE_BUY, 0.03)
+    sell = open_position(simulator, 'EURUSD', simulator.ORDER_TYPE_SELL, 0.01)
+    other = open_position(simulator, 'GBPUSD', simulator.ORDER_TYPE_SELL, 0.02)
+
+    result = closer.close(simulator.positions_get(), allow_close_by=True)
+
+    assert result['success']
+    assert sorted(result['closed_tickets']) == sorted([buy, sell, other])
+    methods = {(r['ticket'], r['method']) for r in result['results']}
+    # The smaller sell is closed against the buy, which keeps 0.02 lots for a market close
+    assert (sell, 'close_by') in methods and (buy, 'deal') in methods and (other, 'deal') in methods
+    assert simulator.positions_get() == ()
+
+
+def test_without_close_by_every_position_is_closed_at_market(simulator, closer):
+    open_position(simulator, 'EURUSD', simulator.ORDER_TYPE_BUY, 0.01)
+    open_position(simulator, 'EURUSD', simulator.ORDER_TYPE_SELL, 0.01)
+
+    result = closer.close(simulator.positions_get(), allow_close_by=False)
+
+    assert result['success'] and len(result['closed_tickets']) == 2
+    assert {r['method'] for r in result['results']} == {'deal'}
+    assert simulator.positions_get() == ()
+
+
+def test_close_all_endpoint_nets_and_journals(client, bridge, simulator, wait_for):
+    open_position(simulator, 'EURUSD', simulator.ORDER_TYPE_BUY, 0.02)
+    open_position(simulator, 'EURUSD', simulator.ORDER_TYPE_SELL, 0.02)
+
+    response = client.post('/positions/close_all')
+    body = response.get_json()
+
+    assert response.status_code == 200 and body['success']
+    assert {r['method'] for r in body['results']} == {'close_by'}
+    wait_for(lambda: body['order_id'] not in bridge.trade_journal.open_orders)
+    assert bridge.executor.get_order(body['order_id'])['status'] == 'done'
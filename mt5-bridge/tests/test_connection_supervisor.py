@@ -0,0 +1,135 @@
+"""
+Connection supervisor: breaker trip on failed health checks, reconnect and re-warm, and
+health checks that hang in the terminal or wait on a busy queue
+"""
+
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from connection_supervisor import BREAKER_CLOSED, BREAKER_OPEN, CircuitOpenError, ConnectionSupervisor
+from execution import ExecutionEngine
+
+
+class FakeTerminal:
+    """Answers health checks as connected, disconnected or hung"""
+
+    def __init__(self):
+        self.connected = True
+        self.hang = None
+
+    def terminal_info(self):
+        if self.hang:
+            self.hang.wait(5)
+        return SimpleNamespace(connected=self.connected)
+
+    def account_info(self):
+        return SimpleNamespace(login=1) if self.connected else None
+
+    def last_error(self):
+        return (-10004, 'No connection')
+
+    def shutdown(self):
+        pass
+
+
+@pytest.fixture
+def terminal():
+    return FakeTerminal()
+
+
+@pytest.fixture
+def supervisor(terminal):
+    executor = ExecutionEngine()
+    executor.start()
+    rewarmed = []
+    bridge = SimpleNamespace(mt5_initialized=True, executor=executor, reconnect_ok=True, rewarmed=rewarmed)
+    bridge.initialize_mt5 = lambda: bridge.reconnect_ok
+    bridge.order_sender = SimpleNamespace(invalidate=lambda: rewarmed.append('filling modes'))
+    bridge.state_mirror = SimpleNamespace(refresh=lambda: rewarmed.append('state mirror'))
+    bridge.reconciler = SimpleNamespace(reconcile=lambda: rewarmed.append('trade journal'))
+    bridge.deals_syncer = SimpleNamespace(wake=lambda: rewarmed.append('deals journal'))
+    bridge.risk_engine = SimpleNamespace(refresh=lambda: rewarmed.append('risk table'))
+
+    supervisor = ConnectionSupervisor(bridge, terminal, interval=5, backoff_initial=1, backoff_max=8,
+                                      failure_threshold=2, check_timeout=0.2)
+    yield supervisor
+    if terminal.hang:
+        terminal.hang.set()
+    executor.stop()
+
+
+def test_breaker_trips_after_consecutive_failures(terminal, supervisor):
+    terminal.connected = False
+    supervisor._check()
+    assert supervisor.breaker == BREAKER_CLOSED
+    supervisor._check()
+
+    assert supervisor.breaker == BREAKER_OPEN
+    assert not supervisor.bridge.mt5_initialized
+    with pytest.raises(CircuitOpenError):
+        supervisor.guard()
+    assert supervisor.rejected_orders == 1
+
+
+def test_single_failure_does_not_trip(terminal, supervisor):
+    terminal.connected = False
+    supervisor._check()
+    terminal.connected = True
+    supervisor._check()
+    assert supervisor.breaker == BREAKER_CLOSED and supervisor.consecutive_failures == 0
+
+
+def test_reconnect_rewarms_and_closes_the_breaker(terminal, supervisor):
+    terminal.connected = False
+    supervisor._check()
+    supervisor._check()
+
+    supervisor.bridge.reconnect_ok = False
+    supervisor._attempt_reconnect()
+    assert supervisor.breaker == BREAKER_OPEN and supervisor._backoff == 2
+
+    supervisor._next_attempt = 0
+    supervisor.bridge.reconnect_ok = True
+    supervisor._attempt_reconnect()
+
+    assert supervisor.breaker == BREAKER_CLOSED
+    assert supervisor.reconnect_count == 1 and supervisor.reconnect_attempts == 2
+    assert supervisor.bridge.rewarmed == ['filling modes', 'state mirror', 'trade journal', 'deals journal',
+                                          'risk table']
+    supervisor.guard()
+
+
+def test_check_waiting_on_a_busy_queue_is_skipped(supervisor):
+    started, release = threading.Event(), threading.Event()
+    supervisor.bridge.executor.submit(lambda: started.set() or release.wait(5))
+    started.wait(5)
+    try:
+        supervisor._check()
+    finally:
+        release.set()
+    assert supervisor.skipped_checks == 1 and supervisor.consecutive_failures == 0
+
+
+def test_check_hung_in_the_terminal_counts_as_failed(terminal, supervisor):
+    terminal.hang = threading.Event()
+    supervisor._check()
+    assert supervisor.consecutive_failures == 1 and 'timed out' in supervisor.last_error
+
+    # Still blocked: the next check fails without queueing another one
+    supervisor._check()
+    assert supervisor.breaker == BREAKER_OPEN
+    assert supervisor.last_error == 'health check still blocked in a terminal call'
+
+
+def test_open_breaker_refuses_webhook_orders(client, bridge, simulator, monkeypatch):
+    supervisor = ConnectionSupervisor(bridge, simulator, interval=5)
+    monkeypatch.setattr(bridge, 'supervisor', supervisor)
+    monkeypatch.setattr(bridge, 'mt5_initialized', True)
+    supervisor._trip()
+
+    response = client.post('/webhook/tradingview', json={'signal': 'BUY', 'symbol': 'EURUSD'})
+
+    assert response.status_code == 503 and response.get_json()['mt5_status'] == 'disconnected'
+    assert simulator.positions_get() == ()
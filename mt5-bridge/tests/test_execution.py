@@ -0,0 +1,97 @@
+"""
+Execution engine: priority order, bounded queue, order tracking and cancellation
+"""
+
+import threading
+
+import pytest
+
+from execution import PRIORITY_CLOSE, PRIORITY_OPEN, PRIORITY_QUERY, ExecutionEngine, QueueFullError
+
+
+@pytest.fixture
+def engine():
+    engine = ExecutionEngine(max_queue_size=8)
+    engine.start()
+    yield engine
+    engine.stop()
+
+
+def block(engine):
+    """Occupy the execution thread until the returned event is set"""
+    release, started = threading.Event(), threading.Event()
+
+    def wait():
+        started.set()
+        release.wait(5)
+
+    engine.submit(wait)
+    started.wait(5)
+    return release
+
+
+def test_closes_run_before_opens_before_queries(engine):
+    release = block(engine)
+    ran = []
+    futures = [engine.submit(ran.append, name, priority=priority)
+               for name, priority in [('query', PRIORITY_QUERY), ('open', PRIORITY_OPEN),
+                                      ('close', PRIORITY_CLOSE), ('open2', PRIORITY_OPEN)]]
+    release.set()
+    for future in futures:
+        future.result(5)
+    assert ran == ['close', 'open', 'open2', 'query']
+
+
+def test_full_queue_rejects_instead_of_waiting(engine):
+    release = block(engine)
+    for _ in range(engine.max_queue_size):
+        engine.submit(lambda: None)
+    with pytest.raises(QueueFullError):
+        engine.submit(lambda: None)
+    release.set()
+    assert engine.get_stats()['rejected'] == 1
+
+
+def test_submit_order_tracks_outcome(engine):
+    order_id, future = engine.submit_order(lambda: {'success': True, 'ticket': 1}, order_id='abc')
+    assert order_id == 'abc'
+    assert future.result(5)['ticket'] == 1
+    record = engine.get_order('abc')
+    assert record['status'] == 'done' and record['result']['ticket'] == 1
+
+    order_id, future = engine.submit_order(lambda: {'success': False, 'error': 'no money'})
+    future.result(5)
+    assert engine.get_order(order_id)['status'] == 'failed'
+
+
+def test_legs_are_numbered_per_order(engine):
+    def legs():
+        return {'success': True, 'legs': [engine.next_leg() for _ in range(3)]}
+
+    assert engine.submit_order(legs)[1].result(5)['legs'] == [0, 1, 2]
+    assert engine.submit_order(legs)[1].result(5)['legs'] == [0, 1, 2]
+
+
+def test_cancelled_task_never_runs(engine):
+    release = block(engine)
+    ran = []
+    future = engine.submit(ran.append, 'late')
+    assert future.cancel()
+    release.set()
+    engine.submit(lambda: None).result(5)
+    assert ran == []
+
+
+def test_batch_fails_every_leg_when_before_raises(engine):
+    def before():
+        raise RuntimeError('symbol missing')
+
+    legs = engine.submit_orders([(lambda: {'success': True}, ()), (lambda: {'success': True}, ())], before=before)
+    for order_id, future in legs:
+        with pytest.raises(RuntimeError):
+            future.result(5)
+        assert engine.get_order(order_id)['status'] == 'failed'
+
+
+def test_calls_from_the_execution_thread_run_inline(engine):
+    assert engine.call(lambda: engine.call(lambda: 42, timeout=1), timeout=5) == 42
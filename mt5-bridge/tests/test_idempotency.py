@@ -0,0 +1,40 @@
+"""
+Duplicate webhook signals: a retry gets the original outcome instead of a second order
+"""
+
+
+def signal(strategy_time, **fields):
+    return dict({'signal': 'BUY', 'symbol': 'EURUSD', 'lot_size': 0.01, 'strategy_time': strategy_time}, **fields)
+
+
+def test_retry_returns_the_original_order(client, simulator):
+    first = client.post('/webhook/tradingview', json=signal(1700000000))
+    retry = client.post('/webhook/tradingview', json=signal(1700000000))
+
+    assert first.status_code == 200 and first.get_json()['success']
+    body = retry.get_json()
+    assert body['duplicate'] and body['order_id'] == first.get_json()['order_id']
+    assert len(simulator.positions_get()) == 1
+
+
+def test_signals_without_bar_time_or_client_id_are_not_deduplicated(client, simulator):
+    client.post('/webhook/tradingview', json={'signal': 'BUY', 'symbol': 'EURUSD'})
+    client.post('/webhook/tradingview', json={'signal': 'BUY', 'symbol': 'EURUSD'})
+    assert len(simulator.positions_get()) == 2
+
+
+def test_client_id_separates_signals_on_the_same_bar(client, simulator):
+    client.post('/webhook/tradingview', json=signal(1700000100, client_id='a'))
+    client.post('/webhook/tradingview', json=signal(1700000100, client_id='b'))
+    assert len(simulator.positions_get()) == 2
+
+
+def test_rejected_signal_can_be_retried(client, bridge, simulator, monkeypatch):
+    monkeypatch.setattr(bridge.risk_engine, 'max_symbol_lots', 0.01)
+    rejected = client.post('/webhook/tradingview', json=signal(1700000200, lot_size=0.05))
+    assert rejected.status_code == 400 and 'exposure limit' in rejected.get_json()['error']
+
+    monkeypatch.setattr(bridge.risk_engine, 'max_symbol_lots', 0.0)
+    retry = client.post('/webhook/tradingview', json=signal(1700000200, lot_size=0.05))
+    assert retry.status_code == 200 and not retry.get_json().get('duplicate')
+    assert len(simulator.positions_get()) == 1
@@ -0,0 +1,81 @@
+"""
+Order sender: filling mode detection and fallback, and requote retries within the budget
+"""
+
+import pytest
+
+from order_sender import OrderSender
+from symbol_cache import SymbolCache
+
+
+@pytest.fixture
+def sender(simulator):
+    return OrderSender(simulator, SymbolCache(simulator), deviation=10, retry_budget=1.0, max_retries=3)
+
+
+def market_request(mt5, sender, symbol, price=None):
+    tick = sender.symbol_cache.get_tick(symbol, max_age=0)
+    return {
+        'action': mt5.TRADE_ACTION_DEAL,
+        'symbol': symbol,
+        'volume': 0.01,
+        'type': mt5.ORDER_TYPE_BUY,
+        'price': tick['ask'] if price is None else price,
+        'deviation': sender.deviation,
+        'type_time': mt5.ORDER_TIME_GTC,
+        'type_filling': sender.filling_type(symbol),
+    }
+
+
+def test_filling_mode_follows_symbol_spec(simulator, sender):
+    # XAUUSD is FOK only, and market execution rules out RETURN
+    assert sender.filling_type('EURUSD') == simulator.ORDER_FILLING_IOC
+    assert sender.filling_type('XAUUSD') == simulator.ORDER_FILLING_FOK
+    result, retries = sender.send(market_request(simulator, sender, 'XAUUSD'), 'XAUUSD', 'BUY')
+    assert result.retcode == simulator.TRADE_RETCODE_DONE and retries == 0
+
+
+def test_refused_filling_mode_falls_back_to_the_next(simulator, sender):
+    # The spec claims IOC as well, but the server only accepts FOK
+    spec = sender.symbol_cache.get_spec('XAUUSD')
+    spec['filling_mode'] |= simulator.SYMBOL_FILLING_IOC
+    assert sender.filling_type('XAUUSD') == simulator.ORDER_FILLING_IOC
+
+    result, retries = sender.send(market_request(simulator, sender, 'XAUUSD'), 'XAUUSD', 'BUY')
+    assert result.retcode == simulator.TRADE_RETCODE_DONE and retries == 1
+    assert sender.filling_type('XAUUSD') == simulator.ORDER_FILLING_FOK
+    assert sender.get_stats()['retries'] == {'invalid_fill': 1}
+
+
+def test_requote_is_retried_at_a_fresh_price(simulator, sender):
+    stale = sender.symbol_cache.get_tick('EURUSD', max_age=0)['ask'] - 0.01
+    result, retries = sender.send(market_request(simulator, sender, 'EURUSD', price=stale), 'EURUSD', 'BUY')
+    assert result.retcode == simulator.TRADE_RETCODE_DONE and retries == 1
+    assert sender.recovered_orders == 1
+
+
+def test_requotes_stop_at_max_retries(simulator, sender):
+    simulator._terminal.requote_rate = 1.0
+    result, retries = sender.send(market_request(simulator, sender, 'EURUSD'), 'EURUSD', 'BUY')
+    assert result.retcode == simulator.TRADE_RETCODE_REQUOTE and retries == sender.max_retries
+    assert sender.recovered_orders == 0
+
+
+def test_no_retry_without_a_budget(simulator, sender):
+    sender.retry_budget = 0
+    simulator._terminal.requote_rate = 1.0
+    result, retries = sender.send(market_request(simulator, sender, 'EURUSD'), 'EURUSD', 'BUY')
+    assert result.retcode == simulator.TRADE_RETCODE_REQUOTE and retries == 0
+
+
+def test_retries_stop_when_the_budget_is_spent(simulator, sender):
+    simulator._terminal.requote_rate = 1.0
+    simulator._terminal.latency = 0.05
+    sender.retry_budget = 0.12
+    try:
+        result, retries = sender.send(market_request(simulator, sender, 'EURUSD'), 'EURUSD', 'BUY')
+    finally:
+        simulator._terminal.latency = 0.0
+    # Each attempt takes 50ms, so a retry is only started while another one still fits in 120ms
+    assert retries == 1
+    assert sender.budget_exhausted == 1
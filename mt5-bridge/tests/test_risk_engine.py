@@ -0,0 +1,103 @@
+"""
+Pre-trade risk: sizing, exposure and margin limits, holds on in-flight orders, and symbols
+the margin table has not loaded yet
+"""
+
+import pytest
+
+from risk_engine import RiskEngine, RiskRejected
+
+
+@pytest.fixture
+def risk(bridge, simulator):
+    """A risk engine with its own holds, over the shared bridge's account and symbol cache"""
+    def create(**limits):
+        engine = RiskEngine(bridge, simulator, refresh_interval=0, **limits)
+        engine.start()
+        return engine
+    return create
+
+
+def test_in_flight_orders_count_against_the_symbol_limit(risk, bridge):
+    engine = risk(max_symbol_lots=0.03)
+    first = engine.check('BUY', 'EURUSD', 0.02, 1.0)
+    assert first['lot_size'] == 0.02
+
+    with pytest.raises(RiskRejected, match='EURUSD exposure limit'):
+        engine.check('SELL', 'EURUSD', 0.02, 1.0)
+
+    # Released, and a mirror read taken afterwards is published: the hold lapses
+    engine.release(first)
+    bridge.state_mirror.refresh()
+    assert engine.check('BUY', 'EURUSD', 0.02, 1.0)['lot_size'] == 0.02
+
+
+def test_resize_shrinks_to_what_the_limits_leave(risk):
+    engine = risk(max_symbol_lots=0.05, max_account_lots=0.04, resize=True)
+    engine.check('BUY', 'EURUSD', 0.03, 1.0)
+    decision = engine.check('SELL', 'EURUSD', 0.05, 1.0)
+
+    assert decision['requested_lot_size'] == 0.05 and decision['lot_size'] == 0.01
+    assert decision['adjustments'] == ['resized to 0.02 for the EURUSD exposure limit of 0.05 lots',
+                                       'resized to 0.01 for the account exposure limit of 0.04 lots']
+    assert engine.resized_count == 1
+
+
+def test_margin_limit(risk, bridge):
+    engine = risk(margin_buffer_percent=50)
+    free = bridge.state_mirror.get_snapshot().account['margin_free']
+    with pytest.raises(RiskRejected, match='free margin'):
+        engine.check('BUY', 'EURUSD', 10.0, 1.0)
+
+    engine.resize = True
+    decision = engine.check('BUY', 'EURUSD', 10.0, 1.0)
+    assert 0 < decision['margin'] <= free * 0.5
+
+
+def test_risk_percent_sizing(risk, bridge):
+    engine = risk(risk_percent=1.0)
+    equity = bridge.state_mirror.get_snapshot().account['equity']
+    decision = engine.check('BUY', 'EURUSD', 0.01, 1.0)
+
+    # Loss at the stop of 1% on the price, over 100,000 units per lot
+    price = bridge.symbol_cache.peek_tick('EURUSD')['bid']
+    assert decision['lot_size'] == pytest.approx(equity * 0.01 / (price * 0.01 * 100000), abs=0.01)
+
+    with pytest.raises(RiskRejected, match='positive sl_percent'):
+        engine.check('BUY', 'EURUSD', 0.01, 0.0)
+
+
+def loaded(engine, symbol):
+    """Whether the background load of a symbol has been stored, found or not"""
+    return symbol in engine._table or symbol in engine._unavailable
+
+
+def test_unknown_symbol_is_not_loaded_inline(risk, wait_for):
+    engine = risk()
+    # Nothing known about it yet: passed on for execution to look up, with the load queued
+    assert engine.check('BUY', 'NOPE', 0.01, 1.0) is None
+    wait_for(lambda: loaded(engine, 'NOPE'))
+
+    with pytest.raises(RiskRejected, match='Symbol NOPE not available'):
+        engine.check('BUY', 'NOPE', 0.01, 1.0)
+
+
+def test_risk_sizing_waits_for_a_new_symbol_to_load(risk, bridge, wait_for):
+    bridge.symbol_cache.invalidate('USDJPY')
+    engine = risk(risk_percent=1.0)
+    with pytest.raises(RiskRejected, match='No margin data for USDJPY yet'):
+        engine.check('BUY', 'USDJPY', 0.01, 1.0)
+    wait_for(lambda: loaded(engine, 'USDJPY'))
+
+    assert engine.check('BUY', 'USDJPY', 0.01, 1.0)['risk_percent'] == 1.0
+
+
+def test_webhook_reports_resizing_and_unknown_symbols(client, bridge, risk, monkeypatch):
+    monkeypatch.setattr(bridge, 'risk_engine', risk(max_symbol_lots=0.02, resize=True))
+    response = client.post('/webhook/tradingview', json={'signal': 'BUY', 'symbol': 'EURUSD', 'lot_size': 0.05})
+    body = response.get_json()
+    assert response.status_code == 200 and body['volume'] == 0.02
+    assert body['risk']['requested_lot_size'] == 0.05
+
+    response = client.post('/webhook/tradingview', json={'signal': 'BUY', 'symbol': 'NOPE'})
+    assert response.status_code == 400 and response.get_json()['error'] == 'Symbol NOPE not available'
@@ -0,0 +1,60 @@
+"""
+Signal engine moving averages against the backtest engine: the incremental classes must give
+the same values and cross on the same bars as backtest/indicators.py, or live signals and the
+backtests they were tuned on disagree
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+from backtest.engine import load_bars, strategy_signals
+from backtest.indicators import MA_TYPES, ma
+from signal_engine import StrategyStream, create_ma
+
+EXPORT = os.path.join(os.path.dirname(__file__), '..', '..', 'backtest', 'tests', 'fixtures',
+                      'eurusd_h1_sma5_ema10.csv')
+
+
+def random_walk(count=600, seed=11):
+    rng = np.random.default_rng(seed)
+    return 1.08 * np.exp(np.cumsum(rng.normal(0, 0.0015, count)))
+
+
+SERIES = {'export': load_bars(EXPORT).close, 'random_walk': random_walk()}
+
+
+def incremental(ma_type, length, close):
+    average = create_ma(ma_type, length)
+    return np.array([average.update(float(c)) for c in close])
+
+
+@pytest.mark.parametrize('series', sorted(SERIES))
+@pytest.mark.parametrize('length', [2, 5, 14, 21])
+@pytest.mark.parametrize('ma_type', MA_TYPES)
+def test_values_match_the_backtest(ma_type, length, series):
+    close = SERIES[series]
+    expected = ma(close, length, ma_type)
+    actual = incremental(ma_type, length, close)
+
+    # Same warm-up, then the same value on every bar
+    np.testing.assert_array_equal(np.isnan(actual), np.isnan(expected))
+    assert np.isfinite(expected).any()
+    np.testing.assert_allclose(actual, expected, rtol=1e-9, equal_nan=True)
+
+
+@pytest.mark.parametrize('series', sorted(SERIES))
+@pytest.mark.parametrize('ma_type', MA_TYPES)
+def test_crossovers_on_the_same_bars(ma_type, series):
+    close = SERIES[series]
+    # Each type as the fast line against the next type as the slow one, and the other way round
+    other = MA_TYPES[(MA_TYPES.index(ma_type) + 1) % len(MA_TYPES)]
+    for pair in [(ma_type, 7, other, 16), (other, 9, ma_type, 20)]:
+        _, _, long_signal, short_signal = strategy_signals(close, *pair)
+        stream = StrategyStream('EURUSD', 'H1', *pair, sl_percent=1.0, tp_percent=2.0, lot_size=0.01)
+        signals = [stream.on_bar(i, float(c)) for i, c in enumerate(close)]
+
+        assert [i for i, s in enumerate(signals) if s == 'BUY'] == np.flatnonzero(long_signal).tolist()
+        assert [i for i, s in enumerate(signals) if s == 'SELL'] == np.flatnonzero(short_signal).tolist()
+        assert long_signal.any() and short_signal.any()
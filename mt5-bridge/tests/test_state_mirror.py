@@ -0,0 +1,92 @@
+"""
+State mirror: snapshot versions that ignore moving prices, and ETag / 304 on the read endpoints
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from execution import ExecutionEngine
+from state_mirror import StateMirror
+
+
+class FakeTerminalState:
+    """Account, positions and orders a test sets directly"""
+
+    def __init__(self):
+        self.account = {'login': 1, 'balance': 10000.0, 'equity': 10000.0, 'margin': 0.0,
+                        'margin_free': 10000.0, 'margin_level': 0.0, 'profit': 0.0}
+        self.positions = []
+        self.orders = []
+
+
+@pytest.fixture
+def mirror():
+    state = FakeTerminalState()
+    executor = ExecutionEngine()
+    executor.start()
+    bridge = SimpleNamespace(
+        executor=executor,
+        get_account_info=lambda: dict(state.account),
+        get_positions=lambda: [dict(p) for p in state.positions],
+        get_orders=lambda: [dict(o) for o in state.orders]
+    )
+    mirror = StateMirror(bridge, interval=0)
+    mirror.state = state
+    yield mirror
+    executor.stop()
+
+
+def test_moving_prices_keep_the_version(mirror):
+    mirror.state.positions = [{'ticket': 1, 'symbol': 'EURUSD', 'type': 'BUY', 'volume': 0.1,
+                               'price_open': 1.085, 'price_current': 1.085, 'profit': 0.0, 'sl': 0, 'tp': 0}]
+    first = mirror.refresh()
+
+    mirror.state.positions[0].update(price_current=1.086, profit=10.0)
+    mirror.state.account.update(equity=10010.0, margin_free=10010.0, profit=10.0)
+    moved = mirror.refresh()
+
+    assert moved.version == first.version
+    assert moved.account_version == first.account_version + 1
+    assert moved.positions[0]['profit'] == 10.0
+
+
+def test_position_and_balance_changes_bump_the_version(mirror):
+    first = mirror.refresh()
+    mirror.state.positions = [{'ticket': 2, 'symbol': 'EURUSD', 'type': 'SELL', 'volume': 0.1,
+                               'price_open': 1.085, 'price_current': 1.085, 'profit': 0.0, 'sl': 0, 'tp': 0}]
+    opened = mirror.refresh()
+    mirror.state.positions[0]['sl'] = 1.09
+    modified = mirror.refresh()
+    mirror.state.positions = []
+    mirror.state.account['balance'] = 10005.0
+    closed = mirror.refresh()
+
+    assert first.version < opened.version < modified.version < closed.version
+
+
+def test_unchanged_poll_keeps_the_snapshot(mirror):
+    first = mirror.refresh()
+    second = mirror.refresh()
+    assert (second.version, second.account_version) == (first.version, first.account_version)
+    assert second.collected > first.collected
+
+
+def test_positions_etag_answers_304_until_positions_change(client, bridge):
+    response = client.get('/positions')
+    etag = response.headers['ETag']
+    assert response.status_code == 200 and etag.startswith('W/')
+
+    assert client.get('/positions', headers={'If-None-Match': etag}).status_code == 304
+
+    assert client.post('/webhook/tradingview', json={'signal': 'BUY', 'symbol': 'EURUSD'}).status_code == 200
+    bridge.state_mirror.refresh()
+    changed = client.get('/positions', headers={'If-None-Match': etag})
+    assert changed.status_code == 200 and len(changed.get_json()['positions']) == 1
+
+
+def test_account_answers_304_while_unchanged(client):
+    response = client.get('/account')
+    etag = response.headers['ETag']
+    assert response.status_code == 200 and not etag.startswith('W/')
+    assert client.get('/account', headers={'If-None-Match': etag}).status_code == 304
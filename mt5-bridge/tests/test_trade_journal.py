@@ -0,0 +1,157 @@
+"""
+Trade journal: crash replay of open orders, per-leg records, torn tails, and reconciliation
+of orders a previous run left without a result
+"""
+
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from execution import ExecutionEngine
+from idempotency import create_deduplicator
+from trade_journal import (STATE_RECEIVED, STATE_RESULT, STATE_SENT, STATE_SUBMITTED, TradeJournal,
+                           TradeReconciler, journal_tag)
+
+
+def order_id(n):
+    # Deals are matched on the first six characters, as with uuid4 hex ids
+    return f'{n:06x}'.ljust(32, '0')
+
+
+def reopen(journal):
+    journal.close()
+    return TradeJournal(journal.path)
+
+
+@pytest.fixture
+def journal(tmp_path):
+    journal = TradeJournal(str(tmp_path / 'journal'))
+    yield journal
+    journal.close()
+
+
+def test_replay_keeps_only_orders_without_a_result(journal):
+    journal.append(order_id(1), STATE_RECEIVED, signal='BUY', symbol='EURUSD')
+    journal.append(order_id(1), STATE_SUBMITTED, leg=0, request={'symbol': 'EURUSD'})
+    journal.append(order_id(2), STATE_RECEIVED, signal='SELL', symbol='EURUSD')
+    journal.append(order_id(2), STATE_RESULT, wait=True, success=True)
+
+    journal = reopen(journal)
+    try:
+        assert list(journal.open_orders) == [order_id(1)]
+        entry = journal.open_orders[order_id(1)]
+        assert entry['states'][STATE_RECEIVED]['signal'] == 'BUY'
+        assert entry['legs'][0][STATE_SUBMITTED]['request'] == {'symbol': 'EURUSD'}
+    finally:
+        journal.close()
+
+
+def test_each_leg_keeps_its_own_records(journal):
+    for leg in range(3):
+        journal.append(order_id(3), STATE_SUBMITTED, leg=leg, request={'symbol': 'EURUSD', 'position': leg})
+        journal.append(order_id(3), STATE_SENT, leg=leg, retcode=10009, order=100 + leg)
+    journal.checkpoint()
+
+    journal = reopen(journal)
+    try:
+        legs = journal.open_orders[order_id(3)]['legs']
+        assert sorted(legs) == [0, 1, 2]
+        assert [legs[leg][STATE_SENT]['order'] for leg in range(3)] == [100, 101, 102]
+    finally:
+        journal.close()
+
+
+def test_torn_tail_is_skipped(journal):
+    journal.append(order_id(4), STATE_RECEIVED, wait=True, signal='BUY')
+    segment = sorted(os.listdir(journal.path))[-1]
+    journal.close()
+    with open(os.path.join(journal.path, segment), 'a') as f:
+        f.write('0badc0de {"order_id": "torn')
+
+    journal = TradeJournal(journal.path)
+    try:
+        assert journal.corrupt_records == 1
+        assert list(journal.open_orders) == [order_id(4)]
+    finally:
+        journal.close()
+
+
+def test_checkpoint_drops_old_segments(journal):
+    journal.append(order_id(5), STATE_RECEIVED, signal='BUY')
+    for n in range(6, 20):
+        journal.append(order_id(n), STATE_RECEIVED)
+        journal.append(order_id(n), STATE_RESULT, success=True)
+    journal.append(order_id(20), STATE_RECEIVED, wait=True)
+    journal.checkpoint()
+
+    assert len([n for n in os.listdir(journal.path) if n.endswith('.log')]) == 1
+    journal = reopen(journal)
+    try:
+        assert sorted(journal.open_orders) == [order_id(5), order_id(20)]
+    finally:
+        journal.close()
+
+
+@pytest.fixture
+def reconciler(simulator, journal):
+    executor = ExecutionEngine()
+    executor.start()
+    bridge = SimpleNamespace(mt5_initialized=True, executor=executor, idempotency=create_deduplicator('memory'))
+    yield TradeReconciler(bridge, simulator, journal)
+    executor.stop()
+
+
+def fill(mt5, comment):
+    """A deal in the terminal history, as if order_send went through but its reply was lost"""
+    tick = mt5.symbol_info_tick('EURUSD')
+    return mt5.order_send({'action': mt5.TRADE_ACTION_DEAL, 'symbol': 'EURUSD', 'volume': 0.01,
+                           'type': mt5.ORDER_TYPE_BUY, 'price': tick.ask, 'deviation': 10,
+                           'type_filling': mt5.ORDER_FILLING_FOK, 'comment': comment})
+
+
+def outcomes(reconciler):
+    return {o['order_id']: o for o in reconciler.reconcile()}
+
+
+def test_reconcile_resolves_every_kind_of_open_order(simulator, journal, reconciler):
+    request = {'symbol': 'EURUSD'}
+    # Reply recorded
+    journal.append(order_id(30), STATE_SUBMITTED, leg=0, request=request)
+    journal.append(order_id(30), STATE_SENT, leg=0, retcode=simulator.TRADE_RETCODE_DONE, order=7)
+    # Reply lost, deal in the history
+    journal.append(order_id(31), STATE_SUBMITTED, leg=0, request=request)
+    sent = fill(simulator, f'TV-BUY-{journal_tag(order_id(31))}')
+    # Reply lost, no deal
+    journal.append(order_id(32), STATE_SUBMITTED, leg=0, request=request)
+    # Never sent
+    fingerprint = reconciler.bridge.idempotency.fingerprint('BUY', 'EURUSD', {'strategy_time': 1})
+    reconciler.bridge.idempotency.reserve(fingerprint)
+    journal.append(order_id(33), STATE_RECEIVED, wait=True, fingerprint=fingerprint)
+
+    resolved = outcomes(reconciler)
+
+    assert resolved[order_id(30)]['reconciled'] == 'sent' and resolved[order_id(30)]['success']
+    assert resolved[order_id(31)]['reconciled'] == 'filled' and resolved[order_id(31)]['ticket'] == sent.order
+    assert resolved[order_id(32)]['reconciled'] == 'not_found' and not resolved[order_id(32)]['success']
+    assert resolved[order_id(33)]['reconciled'] == 'not_sent'
+    # The signal never reached the terminal, so its retry may execute
+    assert reconciler.bridge.idempotency.reserve(fingerprint) is None
+    assert journal.open_orders == {}
+    assert reconciler.bridge.executor.get_order(order_id(31))['status'] == 'done'
+
+
+def test_reconcile_resolves_each_leg(simulator, journal, reconciler):
+    request = {'symbol': 'EURUSD'}
+    journal.append(order_id(40), STATE_RECEIVED, signal='CLOSE_ALL')
+    journal.append(order_id(40), STATE_SUBMITTED, leg=0, request=request)
+    journal.append(order_id(40), STATE_SENT, leg=0, retcode=simulator.TRADE_RETCODE_DONE, order=8)
+    journal.append(order_id(40), STATE_SUBMITTED, leg=1, request=request)
+    fill(simulator, f'Close position-{journal_tag(order_id(40), 1)}')
+    journal.append(order_id(40), STATE_SUBMITTED, leg=2, request=request, wait=True)
+
+    result = outcomes(reconciler)[order_id(40)]
+
+    assert [leg['reconciled'] for leg in result['legs']] == ['sent', 'filled', 'not_found']
+    assert result['reconciled'] == 'not_found' and not result['success']
+    assert result['error'] == '1 of 3 order legs failed or could not be found'
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+In-memory time series for the MT5 Bridge monitor
+Every series keeps its recent raw samples plus 1-minute and 1-hour buckets in
+fixed-size ring buffers, so memory stays constant however long the monitor runs.
+Buckets are filled as samples arrive; a bucket is closed when the first sample of
+the next one is recorded.
+"""
+
+import math
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+RESOLUTIONS = {'raw': 0, '1m': 60, '1h': 3600}
+
+
+class _Bucket:
+    __slots__ = ('start', 'count', 'total', 'low', 'high', 'last')
+
+    def __init__(self, start: float, value: float):
+        self.start = start
+        self.count = 1
+        self.total = value
+        self.low = value
+        self.high = value
+        self.last = value
+
+    def add(self, value: float):
+        self.count += 1
+        self.total += value
+        self.low = min(self.low, value)
+        self.high = max(self.high, value)
+        self.last = value
+
+    def as_dict(self) -> Dict:
+        return {'time': self.start, 'count': self.count, 'mean': self.total / self.count,
+                'min': self.low, 'max': self.high, 'last': self.last}
+
+
+class Series:
+    """One metric at raw, 1-minute and 1-hour resolution"""
+
+    def __init__(self, raw_size: int = 3600, minute_size: int = 1440, hour_size: int = 720):
+        self.raw = deque(maxlen=raw_size)
+        self._buckets = {'1m': deque(maxlen=minute_size), '1h': deque(maxlen=hour_size)}
+        self._open: Dict[str, Optional[_Bucket]] = {'1m': None, '1h': None}
+        self._lock = threading.Lock()
+
+    def add(self, value: float, timestamp: Optional[float] = None):
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock:
+            self.raw.append((timestamp, value))
+            for resolution, buckets in self._buckets.items():
+                width = RESOLUTIONS[resolution]
+                start = timestamp // width * width
+                current = self._open[resolution]
+                if current is not None and current.start == start:
+                    current.add(value)
+                    continue
+                if current is not None:
+                    buckets.append(current)
+                self._open[resolution] = _Bucket(start, value)
+
+    def last(self) -> Optional[float]:
+        with self._lock:
+            return self.raw[-1][1] if self.raw else None
+
+    def values(self, seconds: float, now: Optional[float] = None) -> List[float]:
+        """Raw samples from the last `seconds`"""
+        since = (time.time() if now is None else now) - seconds
+        with self._lock:
+            return [value for timestamp, value in self.raw if timestamp >= since]
+
+    def percentile(self, q: float, seconds: float, now: Optional[float] = None) -> Optional[float]:
+        """Nearest-rank percentile of the raw samples in the window"""
+        values = sorted(self.values(seconds, now))
+        if not values:
+            return None
+        return values[max(0, math.ceil(q / 100 * len(values)) - 1)]
+
+    def peak(self, seconds: float, now: Optional[float] = None) -> Optional[float]:
+        """Highest value in the window, reaching back past the raw samples through the buckets"""
+        since = (time.time() if now is None else now) - seconds
+        with self._lock:
+            highs = [value for timestamp, value in self.raw if timestamp >= since]
+            for resolution, buckets in self._buckets.items():
+                highs.extend(b.high for b in buckets if b.start >= since)
+                current = self._open[resolution]
+                if current is not None and current.start >= since:
+                    highs.append(current.high)
+        return max(highs) if highs else None
+
+    def points(self, resolution: str = 'raw', since: Optional[float] = None) -> List[Dict]:
+        """Samples or buckets at a resolution, oldest first, including the open bucket"""
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"Unknown resolution: {resolution} (use {', '.join(RESOLUTIONS)})")
+        since = since or 0
+        with self._lock:
+            if resolution == 'raw':
+                return [{'time': t, 'value': v} for t, v in self.raw if t >= since]
+            buckets = list(self._buckets[resolution])
+            if self._open[resolution] is not None:
+                buckets.append(self._open[resolution])
+            return [b.as_dict() for b in buckets if b.start >= since]
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                'raw': len(self.raw),
+                '1m': len(self._buckets['1m']) + (self._open['1m'] is not None),
+                '1h': len(self._buckets['1h']) + (self._open['1h'] is not None),
+                'first': self.raw[0][0] if self.raw else None,
+                'last': self.raw[-1][0] if self.raw else None
+            }
+
+
+class TimeSeriesStore:
+    """Named series created on first use, all with the same ring buffer sizes"""
+
+    def __init__(self, raw_size: int = 3600, minute_size: int = 1440, hour_size: int = 720):
+        self.sizes = (raw_size, minute_size, hour_size)
+        self.series: Dict[str, Series] = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, value: float, timestamp: Optional[float] = None):
+        if value is None:
+            return
+        self.get(name).add(float(value), timestamp)
+
+    def get(self, name: str) -> Series:
+        series = self.series.get(name)
+        if series is None:
+            with self._lock:
+                series = self.series.setdefault(name, Series(*self.sizes))
+        return series
+
+    def dump(self, resolution: str = 'raw', names: Optional[List[str]] = None,
+             since: Optional[float] = None) -> Dict[str, List[Dict]]:
+        return {name: series.points(resolution, since) for name, series in list(self.series.items())
+                if not names or name in names}
+
+    def get_stats(self) -> Dict:
+        return {name: series.get_stats() for name, series in list(self.series.items())}
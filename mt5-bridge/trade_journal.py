@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+Write-ahead trade journal for the MT5 Bridge
+Every order is recorded as received, as submitted (before order_send is called),
+as sent (with the terminal's reply) and with its final result. An order that sends
+several requests, such as a CLOSE netting or closing many positions, journals each one
+as its own numbered leg, and every leg is reconciled on its own. After a restart, orders
+that never reached a result are reconciled against the terminal's deals and positions,
+so a crash between order_send and its reply never leaves an order in an unknown state.
+
+Records are CRC-checked JSON lines appended to numbered segment files. A single writer
+thread fsyncs every record queued while the previous fsync was running in one go
+(group commit), so concurrent orders share fsyncs instead of paying one each.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+from typing import Dict, List
+
+from execution import PRIORITY_CLOSE
+from log_pipeline import audit
+from metrics import timed
+
+logger = logging.getLogger(__name__)
+
+STATE_RECEIVED = 'received'
+STATE_SUBMITTED = 'submitted'
+STATE_SENT = 'sent'
+STATE_RESULT = 'result'
+
+# Broker server time can be offset from UTC by up to a day
+SERVER_TIME_MARGIN = 86400
+
+
+def journal_tag(order_id: str, leg: int = 0) -> str:
+    """Order comment suffix that identifies one leg's deals in the terminal history"""
+    return f"{order_id[:6]}{leg % 256:02x}"
+
+
+def _utc(timestamp: float) -> datetime:
+    return datetime.fromtimestamp(timestamp, timezone.utc)
+
+
+class TradeJournal:
+    """Append-only, group-committed journal of order lifecycle records"""
+
+    def __init__(self, path: str, segment_bytes: int = 64 * 1024 * 1024, commit_delay: float = 0.0):
+        self.path = path
+        self.segment_bytes = segment_bytes
+        # Optional wait before each commit so more records can join the batch
+        self.commit_delay = commit_delay
+
+        self._cond = threading.Condition()
+        # Held while the current segment is written to or replaced
+        self._io_lock = threading.Lock()
+        self._pending: List[str] = []
+        self._appended_seq = 0
+        self._synced_seq = 0
+        self._stopping = False
+        self._error = None
+
+        # Orders without a result record: order-level states, and the states of each leg
+        self.open_orders: Dict[str, Dict] = {}
+
+        self.record_count = 0
+        self.fsync_count = 0
+        self.corrupt_records = 0
+
+        os.makedirs(path, exist_ok=True)
+        self._load()
+        self._segment = 0
+        self._file = None
+        with self._io_lock:
+            self._roll()
+
+        self._thread = threading.Thread(target=self._run, name='trade-journal', daemon=True)
+        self._thread.start()
+
+    def append(self, order_id: str, state: str, wait: bool = False, **fields):
+        """Append a record; with wait, return only once it is durable on disk"""
+        record = dict(fields, order_id=order_id, state=state, time=time.time())
+        payload = json.dumps(record, separators=(',', ':'), default=str)
+        line = f"{zlib.crc32(payload.encode()):08x} {payload}\n"
+
+        with self._cond:
+            if self._stopping:
+                raise RuntimeError('Trade journal is closed')
+            self._track(record)
+            self._pending.append(line)
+            self._appended_seq += 1
+            seq = self._appended_seq
+            self._cond.notify_all()
+
+            if wait:
+                while self._synced_seq < seq and self._error is None:
+                    self._cond.wait()
+                if self._error is not None:
+                    raise RuntimeError(f"Trade journal write failed: {self._error}")
+
+    def close(self):
+        """Commit queued records and stop the writer"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        self._thread.join(5)
+        if self._file:
+            self._file.close()
+
+    def checkpoint(self):
+        """Start a new segment holding only the open orders, then drop the older segments"""
+        with self._io_lock:
+            self._roll()
+
+    def get_stats(self) -> Dict:
+        return {
+            'segment': self._segment,
+            'records': self.record_count,
+            'fsyncs': self.fsync_count,
+            'records_per_fsync': round(self.record_count / self.fsync_count, 2) if self.fsync_count else None,
+            'open_orders': len(self.open_orders),
+            'corrupt_records': self.corrupt_records,
+            'error': self._error
+        }
+
+    def _track(self, record: Dict):
+        order_id = record['order_id']
+        if record['state'] == STATE_RESULT:
+            self.open_orders.pop(order_id, None)
+        else:
+            entry = self.open_orders.setdefault(order_id, {'order_id': order_id, 'states': {}, 'legs': {}})
+            if record['state'] == STATE_RECEIVED:
+                entry['states'][STATE_RECEIVED] = record
+            else:
+                entry['legs'].setdefault(record.get('leg', 0), {})[record['state']] = record
+
+    def _segments(self) -> List[str]:
+        names = sorted(n for n in os.listdir(self.path) if n.startswith('journal-') and n.endswith('.log'))
+        return [os.path.join(self.path, n) for n in names]
+
+    def _segment_index(self) -> int:
+        segments = self._segments()
+        return int(os.path.basename(segments[-1])[8:-4]) if segments else 0
+
+    def _load(self):
+        """Rebuild the open orders from every segment, ignoring a torn tail"""
+        for segment in self._segments():
+            with open(segment, 'rb') as f:
+                for raw in f:
+                    line = raw.decode('utf-8', errors='replace').rstrip('\n')
+                    crc, _, payload = line.partition(' ')
+                    try:
+                        valid = int(crc, 16) == zlib.crc32(payload.encode())
+                    except ValueError:
+                        valid = False
+                    if not valid or not raw.endswith(b'\n'):
+                        self.corrupt_records += 1
+                        continue
+                    self._track(json.loads(payload))
+        if self.corrupt_records:
+            logger.warning(f"Trade journal skipped {self.corrupt_records} corrupt records")
+        if self.open_orders:
+            logger.warning(f"Trade journal has {len(self.open_orders)} orders without a result")
+
+    def _roll(self):
+        """Switch to a fresh segment seeded with the open orders' records (caller holds the io lock)"""
+        old_segments = self._segments()
+        self._segment = max(self._segment, self._segment_index()) + 1
+        path = os.path.join(self.path, f'journal-{self._segment:08d}.log')
+
+        with self._cond:
+            records = [record for entry in self.open_orders.values()
+                       for states in [entry['states']] + list(entry['legs'].values()) for record in states.values()]
+        lines = []
+        for record in records:
+            payload = json.dumps(record, separators=(',', ':'), default=str)
+            lines.append(f"{zlib.crc32(payload.encode()):08x} {payload}\n")
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            f.writelines(lines)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + '.tmp', path)
+        self._fsync_dir()
+
+        if self._file:
+            self._file.close()
+        self._file = open(path, 'a', encoding='utf-8')
+        for old in old_segments:
+            os.remove(old)
+
+    def _fsync_dir(self):
+        if hasattr(os, 'O_DIRECTORY'):
+            fd = os.open(self.path, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+    def _run(self):
+        """Writer thread: one write and one fsync per batch of queued records"""
+        while True:
+            with self._cond:
+                while not self._pending and not self._stopping:
+                    self._cond.wait()
+                if not self._pending and self._stopping:
+                    return
+            if self.commit_delay:
+                time.sleep(self.commit_delay)
+
+            with self._cond:
+                batch, self._pending = self._pending, []
+                seq = self._appended_seq
+
+            try:
+                with self._io_lock:
+                    with timed('journal_commit'):
+                        self._file.write(''.join(batch))
+                        self._file.flush()
+                        os.fsync(self._file.fileno())
+                    self.record_count += len(batch)
+                    self.fsync_count += 1
+                    if self._file.tell() >= self.segment_bytes:
+                        self._roll()
+            except OSError as e:
+                logger.error(f"Trade journal write failed: {str(e)}")
+                with self._cond:
+                    self._error = str(e)
+                    self._cond.notify_all()
+                return
+
+            with self._cond:
+                self._synced_seq = seq
+                self._cond.notify_all()
+
+
+class TradeReconciler:
+    """Resolves journaled orders that have no result, using the terminal's history"""
+
+    def __init__(self, bridge, mt5, journal: TradeJournal):
+        self.bridge = bridge
+        self.mt5 = mt5
+        self.journal = journal
+        self.reconciled_count = 0
+
+    def reconcile(self) -> List[Dict]:
+        """Record an outcome for every open order left over from a previous run"""
+        bridge = self.bridge
+        # Only orders from before this process started are in doubt
+        open_orders = [e for e in list(self.journal.open_orders.values())
+                       if bridge.executor.get_order(e['order_id']) is None]
+        if not open_orders:
+            return []
+        if not bridge.mt5_initialized:
+            logger.warning(f"Cannot reconcile {len(open_orders)} journaled orders while MT5 is disconnected")
+            return []
+
+        outcomes = []
+        for entry in open_orders:
+            status, result = bridge.executor.call(self._resolve, entry, priority=PRIORITY_CLOSE)
+            order_id = entry['order_id']
+            received = entry['states'].get(STATE_RECEIVED, {})
+
+            self.journal.append(order_id, STATE_RESULT, reconciled=status, **result)
+            bridge.executor.restore_order(order_id, 'done' if result.get('success') else 'failed', result,
+                                          submitted_at=_utc(received.get('time', time.time())).isoformat())
+            fingerprint = received.get('fingerprint')
+            if fingerprint:
+                if status == 'not_sent':
+                    # Never reached the terminal, so a retry of the signal may execute
+                    bridge.idempotency.release(fingerprint)
+                else:
+                    bridge.idempotency.update(fingerprint, {'status': 'done', 'order_id': order_id, 'result': result})
+
+            audit('order_reconciled', order_id=order_id, reconciled=status, **result)
+            logger.warning(f"Reconciled journaled order {order_id}: {status}")
+            outcomes.append(dict(result, order_id=order_id, reconciled=status))
+
+        self.reconciled_count += len(outcomes)
+        self.journal.checkpoint()
+        return outcomes
+
+    def _resolve(self, entry: Dict):
+        """Work out what happened to one order from its legs (runs on the execution thread)"""
+        legs = [self._resolve_leg(entry['order_id'], leg, states) for leg, states in sorted(entry['legs'].items())]
+        if not legs:
+            return 'not_sent', {'success': False, 'error': 'Bridge restarted before the order was sent'}
+        if len(legs) == 1:
+            return legs[0]
+
+        statuses = [status for status, _ in legs]
+        status = 'not_found' if 'not_found' in statuses else 'filled' if 'filled' in statuses else 'sent'
+        result = {'success': all(r['success'] for _, r in legs),
+                  'legs': [dict(r, reconciled=s) for s, r in legs]}
+        if not result['success']:
+            failed = sum(1 for _, r in legs if not r['success'])
+            result['error'] = f"{failed} of {len(legs)} order legs failed or could not be found"
+        return status, result
+
+    def _resolve_leg(self, order_id: str, leg: int, states: Dict):
+        submitted = states.get(STATE_SUBMITTED)
+        sent = states.get(STATE_SENT)
+
+        if sent:
+            success = sent.get('retcode') == self.mt5.TRADE_RETCODE_DONE
+            result = {'success': success, 'retcode': sent.get('retcode'), 'ticket': sent.get('order'),
+                      'price': sent.get('price'), 'volume': sent.get('volume')}
+            if not success:
+                result['error'] = f"Order failed: {sent.get('retcode')}"
+            return 'sent', result
+
+        # order_send was called but its reply was lost: look for the leg's deal
+        request = submitted.get('request', {})
+        tag = journal_tag(order_id, leg)
+        deals = self.mt5.history_deals_get(_utc(submitted['time'] - SERVER_TIME_MARGIN),
+                                           _utc(time.time() + SERVER_TIME_MARGIN)) or ()
+        for deal in deals:
+            if deal.comment.endswith(tag) and deal.symbol == request.get('symbol'):
+                return 'filled', {'success': True, 'ticket': deal.order, 'deal': deal.ticket,
+                                  'price': deal.price, 'volume': deal.volume}
+
+        return 'not_found', {
+            'success': False,
+            'error': 'order_send reply lost and no matching deal found, check the terminal'
+        }